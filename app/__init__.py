@@ -1,6 +1,10 @@
 from flask import Flask
 from flask_login import LoginManager
 from app.database import MongoDB
+from app import date_utils
+from app.media import resized_url
+from app.templating import configure_template_cache
+from app.cli import register_commands
 from .models import User
 import os
 from datetime import datetime
@@ -13,6 +17,13 @@ def create_app():
     app.config['MONGODB_URI'] = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/disha_db')
     app.config['DEBUG'] = os.getenv('DEBUG', 'True').lower() == 'true'
     
+    # Let the web server stream resource downloads (X-Sendfile or nginx X-Accel-Redirect)
+    app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'False').lower() == 'true'
+    app.config['RESOURCE_ACCEL_PREFIX'] = os.getenv('RESOURCE_ACCEL_PREFIX', '')
+    
+    # Persist compiled templates across workers (before jinja_env is created)
+    configure_template_cache(app)
+    
     # Initialize database
     db = MongoDB()
     
@@ -34,31 +45,13 @@ def create_app():
             print(f"Error loading user: {e}")
         return None
 
-    # Add custom Jinja2 filter for date formatting
+    # Add custom Jinja2 filter for date formatting (cached parsing, compiled formats)
     @app.template_filter('format_date')
     def format_date(date_string, fmt=None):
-        if fmt is None:
-            fmt = '%d %b %Y'
-        
-        if isinstance(date_string, str):
-            # Try to parse the string to datetime
-            try:
-                # Try different date formats
-                for date_format in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y']:
-                    try:
-                        date_obj = datetime.strptime(date_string, date_format)
-                        return date_obj.strftime(fmt)
-                    except ValueError:
-                        continue
-                # If all parsing fails, return original string
-                return date_string
-            except (ValueError, TypeError):
-                return date_string
-        elif hasattr(date_string, 'strftime'):
-            # It's already a datetime object
-            return date_string.strftime(fmt)
-        else:
-            return str(date_string)
+        return date_utils.format_date(date_string, fmt or date_utils.DISPLAY_FORMAT)
+    
+    # Resized, long-cached image URLs: {{ resized_url(image.image_path, 640) }}
+    app.add_template_global(resized_url)
     
     # Register blueprints
     from app.routes.main import main
@@ -90,4 +83,7 @@ def create_app():
     def inject_db_status():
         return {'db_connected': db.is_connected()}
     
+    # CLI commands (flask precompile-templates, ...)
+    register_commands(app)
+    
     return app
\ No newline at end of file
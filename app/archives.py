@@ -0,0 +1,286 @@
+"""
+Program Archives
+ZIP downloads of the photos, achievement files and reports of a toli's
+programs (or of one program), for coordinators submitting a session's work.
+
+    archive, error = toli_archive(db, toli_id, static_dir, renderer)
+    return archive_response(archive, 'toli.zip')
+
+send_archive() wraps that for routes: on an error it flashes the reason and
+redirects to a fallback URL.
+
+The archive is written while it is sent: ZipFile writes into a sink that
+the response drains after every chunk, so neither the archive nor any
+whole file is held on disk or in memory. Photos, PDFs and other formats
+that are already compressed are stored (ZIP_STORED); reports are deflated.
+
+    <toli>/<program_no>_<title>/report.html
+    <toli>/<program_no>_<title>/report.pdf       (if already rendered)
+    <toli>/<program_no>_<title>/photos/01_<name>.jpg
+    <toli>/<program_no>_<title>/<achievements file>
+
+Programs come from one projected cursor and their reports from batched
+lookups; only the list of entries (names, paths, sizes) is built before
+streaming starts. ArchiveStream counts the bytes it has sent, and
+archive_response() reports the size of the files going in, so a client can
+show progress.
+"""
+
+import os
+import time
+import zipfile
+from collections import namedtuple
+
+from bson import ObjectId
+from flask import Response, flash, redirect, stream_with_context
+from werkzeug.utils import secure_filename
+
+from app.report_documents import render_document
+
+# Fields an archive reads from a program
+PROGRAM_PROJECTION = {'title': 1, 'program_no': 1, 'student_id': 1, 'toli_id': 1,
+                      'images': 1, 'achievements_file': 1}
+
+# Programs per report lookup
+REPORT_BATCH_SIZE = 100
+
+# Read size while copying files into the archive
+CHUNK_SIZE = 64 * 1024
+
+# Already compressed; deflating these costs CPU and saves nothing
+STORED_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp', 'pdf', 'docx', 'xlsx', 'pptx', 'zip', 'mp4')
+
+ARCHIVE_ERRORS = {
+    'not_connected': ('Database not connected', 503),
+    'not_found': ('No programs found', 404),
+    'empty': ('These programs have no photos or reports yet', 404)
+}
+
+# name: path inside the archive; path/size: a file under static/ (or a
+# rendered report); build: callable returning the bytes of a generated entry
+ArchiveEntry = namedtuple('ArchiveEntry', 'name path size build')
+
+
+def _id_values(value):
+    """A stored id may be an ObjectId or its string; match both"""
+    value = str(value)
+    return [value, ObjectId(value)] if ObjectId.is_valid(value) else [value]
+
+
+def _resolve(static_dir, path):
+    """Absolute path of a stored file under static/, or None"""
+    if not path or not isinstance(path, str):
+        return None
+    base_dir = os.path.realpath(static_dir)
+    full_path = os.path.realpath(os.path.join(base_dir, os.path.normpath(path.replace('\\', '/').lstrip('/'))))
+    if os.path.commonpath([base_dir, full_path]) != base_dir or not os.path.isfile(full_path):
+        return None
+    return full_path
+
+
+def _folder_name(program):
+    title = secure_filename(program.get('title') or '') or str(program['_id'])
+    number = secure_filename(str(program.get('program_no') or ''))
+    return f"{number}_{title}" if number else title
+
+
+def _file_entry(name, full_path):
+    return ArchiveEntry(name, full_path, os.path.getsize(full_path), None)
+
+
+def _program_entries(program, report, folder, static_dir, renderer):
+    images = [path for path in (program.get('images') or []) if isinstance(path, str)]
+    if report:
+        yield ArchiveEntry(f"{folder}/report.html", None, None,
+                           lambda: render_document(report).encode('utf-8'))
+        pdf_path = renderer.cached(report, images, 'pdf') if renderer else None
+        if pdf_path:
+            yield _file_entry(f"{folder}/report.pdf", pdf_path)
+
+    for index, path in enumerate(images, 1):
+        full_path = _resolve(static_dir, path)
+        if full_path:
+            yield _file_entry(f"{folder}/photos/{index:02d}_{os.path.basename(full_path)}", full_path)
+
+    full_path = _resolve(static_dir, program.get('achievements_file'))
+    if full_path:
+        yield _file_entry(f"{folder}/{os.path.basename(full_path)}", full_path)
+
+
+def _entries(db, query, root, static_dir, renderer):
+    """
+    Entries of every program matching `query`, in program order.
+
+    Returns:
+        (entries, whether any program matched)
+    """
+    cursor = db.db.programs.find(query, PROGRAM_PROJECTION).sort('created_at', 1)
+    entries = []
+    folders = set()
+
+    def add(batch):
+        program_ids = [value for program in batch for value in _id_values(program['_id'])]
+        reports = {str(report['program_id']): report
+                   for report in db.db.reports.find({'program_id': {'$in': program_ids}})}
+        for program in batch:
+            folder = f"{root}/{_folder_name(program)}"
+            if folder in folders:
+                folder = f"{folder}_{program['_id']}"
+            folders.add(folder)
+            entries.extend(_program_entries(program, reports.get(str(program['_id'])), folder,
+                                            static_dir, renderer))
+
+    batch = []
+    for program in cursor:
+        batch.append(program)
+        if len(batch) >= REPORT_BATCH_SIZE:
+            add(batch)
+            batch = []
+    if batch:
+        add(batch)
+    return entries, bool(folders)
+
+
+def _archive(db, query, root, static_dir, renderer):
+    entries, found = _entries(db, query, root, static_dir, renderer)
+    if not found:
+        return None, 'not_found'
+    if not entries:
+        return None, 'empty'
+    return ArchiveStream(entries), None
+
+
+def toli_archive(db, toli_id, static_dir, renderer=None):
+    """
+    Archive of all programs of a toli.
+
+    Args:
+        renderer: ReportRenderer whose cached PDFs are included (optional)
+
+    Returns:
+        (ArchiveStream, error)
+    """
+    if not db.is_connected():
+        return None, 'not_connected'
+    toli = db.get_toli_by_id(toli_id)
+    if not toli:
+        return None, 'not_found'
+    root = secure_filename(toli.get('name') or '') or str(toli['_id'])
+    return _archive(db, {'toli_id': {'$in': _id_values(toli['_id'])}}, root, static_dir, renderer)
+
+
+def program_archive(db, program_id, static_dir, renderer=None):
+    """
+    Archive of a single program.
+
+    Returns:
+        (ArchiveStream, error)
+    """
+    if not db.is_connected():
+        return None, 'not_connected'
+    if not ObjectId.is_valid(str(program_id)):
+        return None, 'not_found'
+    return _archive(db, {'_id': ObjectId(str(program_id))}, 'program', static_dir, renderer)
+
+
+class _Sink:
+    """Write-only file ZipFile writes into; the stream drains it after each chunk"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ArchiveStream:
+    """ZIP archive of a list of entries, generated as it is iterated"""
+
+    def __init__(self, entries, progress=None):
+        self.entries = entries
+        self.progress = progress
+        self.bytes_sent = 0
+        self.files_written = 0
+
+    @property
+    def source_bytes(self):
+        """Size of the files going into the archive (generated entries excluded)"""
+        return sum(entry.size for entry in self.entries if entry.size is not None)
+
+    def _chunk(self, sink):
+        data = sink.drain()
+        self.bytes_sent += len(data)
+        return data
+
+    @staticmethod
+    def _compress_type(name):
+        return zipfile.ZIP_STORED if name.rsplit('.', 1)[-1].lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+    def __iter__(self):
+        sink = _Sink()
+        # A sink without seek/tell makes ZipFile write data descriptors after each file
+        with zipfile.ZipFile(sink, 'w') as archive:
+            for entry in self.entries:
+                if entry.build is not None:
+                    try:
+                        content = entry.build()
+                    except Exception as e:
+                        print(f"⚠️ Skipping {entry.name} in archive: {e}")
+                        continue
+                    info = zipfile.ZipInfo(entry.name, time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(info, content)
+                else:
+                    try:
+                        source = open(entry.path, 'rb')
+                    except OSError as e:
+                        print(f"⚠️ Skipping {entry.name} in archive: {e}")
+                        continue
+                    with source:
+                        info = zipfile.ZipInfo.from_file(entry.path, entry.name, strict_timestamps=False)
+                        info.compress_type = self._compress_type(entry.name)
+                        with archive.open(info, 'w') as dest:
+                            while True:
+                                data = source.read(CHUNK_SIZE)
+                                if not data:
+                                    break
+                                dest.write(data)
+                                if sink.chunks:
+                                    yield self._chunk(sink)
+                self.files_written += 1
+                data = self._chunk(sink)
+                if data:
+                    yield data
+                if self.progress:
+                    self.progress(self)
+        # Central directory, written when the ZipFile closes
+        data = self._chunk(sink)
+        if data:
+            yield data
+
+
+def archive_response(archive, filename):
+    """Streamed download of an archive"""
+    return Response(stream_with_context(iter(archive)),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Archive-Files': str(len(archive.entries)),
+                             'X-Archive-Source-Bytes': str(archive.source_bytes),
+                             'X-Accel-Buffering': 'no'})
+
+
+def send_archive(archive, error, filename, fallback):
+    """Streamed ZIP download, or a redirect with the reason it can't be built"""
+    if error:
+        flash(ARCHIVE_ERRORS.get(error, ('Archive failed', 400))[0], 'warning')
+        return redirect(fallback)
+    return archive_response(archive, filename)
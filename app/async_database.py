@@ -0,0 +1,293 @@
+"""
+Async Data Access
+Async counterpart of the MongoDB class on PyMongo's AsyncMongoClient, for
+pages that issue several independent reads.
+
+    results = fetch_concurrently({
+        'toli': async_db.get_toli_by_id(toli_id),
+        'resources': async_db.get_all_resources()
+    }, fallbacks={'resources': []})
+
+Sync (Flask) callers use fetch_concurrently/run_sync, which run the reads on
+one background event loop, so a page waits for its slowest query instead of
+the sum of all of them.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+
+from app.database import MongoDB, CONNECT_RETRY_BACKOFF, MONGO_MAX_POOL_SIZE, PING_CACHE_TTL
+
+# Seconds fetch_concurrently waits for all reads before giving up
+FETCH_TIMEOUT = float(os.getenv('ASYNC_FETCH_TIMEOUT', '15'))
+
+
+class AsyncMongoDB:
+    """
+    Async data access layer with the same method names as MongoDB.
+
+    Reads used by dashboards run natively on the async driver. Any other
+    MongoDB method is available too: it runs the sync implementation in a
+    worker thread, so writes keep their counter and denormalization updates.
+    """
+
+    # (uri, database, event loop) -> connection state; async clients are bound to a loop
+    _shared = {}
+
+    def __init__(self):
+        self._key = (os.getenv('MONGODB_URI'), os.getenv('DATABASE_NAME', 'disha_db'))
+        self._sync = MongoDB()
+
+    def __getattr__(self, name):
+        method = getattr(MongoDB, name, None)
+        if not callable(method) or name.startswith('_'):
+            raise AttributeError(name)
+
+        async def delegate(*args, **kwargs):
+            return await asyncio.to_thread(getattr(self._sync, name), *args, **kwargs)
+
+        delegate.__name__ = name
+        delegate.__doc__ = method.__doc__
+        return delegate
+
+    @property
+    def _state(self):
+        key = self._key + (asyncio.get_running_loop(),)
+        state = AsyncMongoDB._shared.get(key)
+        if state is None:
+            state = AsyncMongoDB._shared.setdefault(key, {
+                'client': None, 'db': None, 'failed_at': None, 'checked_at': None
+            })
+        return state
+
+    @property
+    def db(self):
+        state = self._state
+        if state['client'] is None:
+            mongodb_uri, database_name = self._key
+            state['client'] = AsyncMongoClient(
+                mongodb_uri or 'mongodb://localhost:27017/',
+                connectTimeoutMS=10000,
+                socketTimeoutMS=10000,
+                serverSelectionTimeoutMS=10000,
+                retryWrites=True,
+                maxPoolSize=MONGO_MAX_POOL_SIZE
+            )
+            state['db'] = state['client'][database_name]
+        return state['db']
+
+    async def is_connected(self):
+        """Check the async connection (pings are cached, failures back off)"""
+        state = self._state
+        now = time.monotonic()
+        if state['failed_at'] is not None and now - state['failed_at'] < CONNECT_RETRY_BACKOFF:
+            return False
+        if state['checked_at'] is not None and now - state['checked_at'] < PING_CACHE_TTL:
+            return True
+        try:
+            await self.db.client.admin.command('ping')
+            state.update(checked_at=time.monotonic(), failed_at=None)
+            return True
+        except Exception as e:
+            print(f"❌ Async MongoDB ping failed: {e}")
+            state.update(checked_at=None, failed_at=time.monotonic())
+            return False
+
+    async def close_connection(self):
+        """Close the client bound to the current event loop"""
+        state = AsyncMongoDB._shared.pop(self._key + (asyncio.get_running_loop(),), None)
+        if state and state['client']:
+            await state['client'].close()
+
+    # User methods
+    async def get_user_by_id(self, user_id):
+        if not await self.is_connected():
+            return None
+        return await self.db.users.find_one({'_id': ObjectId(user_id)})
+
+    async def count_users_by_role(self, role):
+        if not await self.is_connected():
+            return 0
+        return await self.db.users.count_documents({'role': role})
+
+    # Toli methods
+    async def get_toli_by_id(self, toli_id):
+        if not await self.is_connected():
+            return None
+        return await self.db.tolis.find_one({'_id': ObjectId(toli_id)})
+
+    async def count_tolis(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.tolis.count_documents({})
+
+    async def count_active_tolis(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.tolis.count_documents({'status': 'active'})
+
+    # Program methods
+    async def get_programs_by_student(self, student_id):
+        """Get all programs for a specific student with error handling"""
+        if not await self.is_connected():
+            print("❌ Database not connected")
+            return []
+        try:
+            return await self.db.programs.find({'student_id': student_id}).sort('created_at', -1).to_list()
+        except Exception as e:
+            print(f"❌ Error fetching programs: {e}")
+            return []
+
+    async def count_programs(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.programs.count_documents({})
+
+    async def count_pending_programs(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.programs.count_documents({'status': 'pending'})
+
+    # Resource methods
+    async def get_all_resources(self):
+        if not await self.is_connected():
+            return []
+        return await self.db.resources.find().sort('created_at', -1).to_list()
+
+    async def count_resources(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.resources.count_documents({})
+
+    # Message methods
+    async def get_messages_for_user(self, user_id):
+        """Get messages for a specific user (both direct and broadcast messages)"""
+        if not await self.is_connected():
+            return []
+        return await self.db.messages.find({
+            '$or': [
+                {'receiver_id': user_id},
+                {'receiver_id': None},
+                {'receiver_id': 'all'}
+            ]
+        }).sort('created_at', -1).to_list()
+
+    async def count_unread_messages(self, user_id):
+        """Count unread messages for a user (direct messages come from the user's counter)"""
+        if not await self.is_connected():
+            return 0
+        user, broadcast = await asyncio.gather(
+            self.db.users.find_one({'_id': ObjectId(user_id)}, {'unread_messages': 1}),
+            self.db.messages.count_documents({'receiver_id': {'$in': [None, 'all']}, 'is_read': False})
+        )
+        user = user or {}
+        if 'unread_messages' in user:
+            direct = user['unread_messages']
+        else:
+            direct = await self.db.messages.count_documents({'receiver_id': user_id, 'is_read': False})
+        return direct + broadcast
+
+    async def count_messages(self):
+        if not await self.is_connected():
+            return 0
+        return await self.db.messages.count_documents({})
+
+    # Recent activity
+    async def _find_recent(self, collection, query, limit, hours, label):
+        if not await self.is_connected():
+            return []
+        try:
+            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+            query = dict(query, created_at={'$gte': cutoff_time})
+            return await self.db[collection].find(query).sort('created_at', -1).limit(limit).to_list()
+        except Exception as e:
+            print(f"Error getting recent {label}: {e}")
+            return []
+
+    async def get_recent_tolis(self, limit=5, hours=24):
+        """Get recent tolis created within specified hours"""
+        return await self._find_recent('tolis', {}, limit, hours, 'tolis')
+
+    async def get_recent_students(self, limit=5, hours=24):
+        """Get recent students registered within specified hours"""
+        return await self._find_recent('users', {'role': 'student'}, limit, hours, 'students')
+
+    async def get_recent_programs(self, limit=5, hours=24):
+        """Get recent programs created within specified hours"""
+        return await self._find_recent('programs', {}, limit, hours, 'programs')
+
+
+async def gather_reads(reads, fallbacks=None):
+    """
+    Await independent reads concurrently.
+
+    Args:
+        reads: Dictionary of name -> awaitable (plain values are passed through)
+        fallbacks: Dictionary of name -> value returned when that read fails
+
+    Returns:
+        Dictionary of name -> result
+    """
+    fallbacks = fallbacks or {}
+    names = list(reads)
+
+    async def resolve(value):
+        if asyncio.iscoroutine(value) or isinstance(value, asyncio.Future):
+            return await value
+        return value
+
+    outcomes = await asyncio.gather(*(resolve(reads[name]) for name in names), return_exceptions=True)
+
+    results = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ Error loading {name}: {outcome}")
+            outcome = fallbacks.get(name)
+        results[name] = outcome
+    return results
+
+
+# Background event loop shared by sync callers
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-db-loop', daemon=True)
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=FETCH_TIMEOUT):
+    """Run a coroutine on the background loop and wait for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def fetch_concurrently(reads, fallbacks=None, timeout=FETCH_TIMEOUT):
+    """
+    Run independent AsyncMongoDB reads concurrently from sync code.
+
+    If the batch times out or the loop fails, every read gets its fallback.
+    """
+    try:
+        return run_sync(gather_reads(reads, fallbacks), timeout)
+    except Exception as e:
+        print(f"❌ Concurrent fetch failed: {e!r}")
+        fallbacks = fallbacks or {}
+        return {name: fallbacks.get(name) for name in reads}
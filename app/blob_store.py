@@ -0,0 +1,258 @@
+"""
+Blob Store
+Content-addressed storage for uploaded files.
+
+Each distinct file is stored once, under its SHA-256:
+
+    static/blobs/<aa>/<bb>/<sha256>.<ext>
+
+and tracked in the `blobs` collection with a reference count. Upload helpers
+return the blob's path relative to static/ (what documents already store), so
+uploading the same photo twice costs one file. `flask gc-blobs` recounts the
+references from the documents that hold blob paths and deletes blobs nothing
+points at any more.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from pymongo import ReturnDocument, UpdateOne
+
+from app.database import MongoDB
+
+BLOB_COLLECTION = 'blobs'
+
+# Directory under static/ holding blobs (also the prefix of stored paths)
+BLOB_DIR = 'blobs'
+
+# Read size while hashing uploads
+CHUNK_SIZE = 256 * 1024
+
+# Document fields that hold stored file paths: (collection, field). A field
+# may be a dotted path into an array of subdocuments; every copy of a path
+# counts, so a blob stays while any document still shows it.
+REFERENCES = [
+    ('users', 'profile_photo'),
+    ('users', 'passport_photo'),
+    ('tolis', 'members.profile_photo'),
+    ('programs', 'images'),
+    ('programs', 'achievements_file'),
+    ('reports', 'images'),
+    ('newsletters', 'images'),
+    ('resources', 'file_path')
+]
+
+
+def get_blob_store(db=None):
+    """Blob store under the current app's static folder"""
+    return BlobStore(db or MongoDB(), os.path.join(current_app.root_path, 'static'))
+
+
+class BlobStore:
+    """Deduplicating, reference-counted file storage"""
+
+    def __init__(self, db, static_dir):
+        self.db = db
+        self.static_dir = static_dir
+        self.root = os.path.join(static_dir, BLOB_DIR)
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+
+    @property
+    def blobs(self):
+        return self.db.db[BLOB_COLLECTION]
+
+    @staticmethod
+    def blob_path(digest, extension=''):
+        """Path of a blob relative to static/"""
+        suffix = f".{extension}" if extension else ''
+        return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+    @staticmethod
+    def digest_of(path):
+        """SHA-256 of a stored blob path, or None for paths outside the blob store"""
+        if not path or not str(path).startswith(BLOB_DIR + '/'):
+            return None
+        digest = str(path).rsplit('/', 1)[-1].split('.', 1)[0]
+        return digest if len(digest) == 64 else None
+
+    def absolute_path(self, path):
+        return os.path.join(self.static_dir, *str(path).split('/'))
+
+    @staticmethod
+    def _extension(filename):
+        if not filename or '.' not in filename:
+            return ''
+        extension = filename.rsplit('.', 1)[1].lower()
+        return extension if extension.isalnum() and len(extension) <= 8 else ''
+
+    def put(self, file, filename=None, max_size=None):
+        """
+        Store an uploaded file, reusing the existing blob for identical content.
+
+        Args:
+            file: FileStorage or binary file object
+            filename: Original name (for the extension); defaults to file.filename
+            max_size: Reject files larger than this many bytes
+
+        Returns:
+            Path relative to static/, or None if the file was empty or too large
+        """
+        filename = filename or getattr(file, 'filename', None)
+        stream = getattr(file, 'stream', file)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False) as tmp:
+            try:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except Exception:
+                os.remove(tmp.name)
+                raise
+
+        if size == 0 or (max_size is not None and size > max_size):
+            os.remove(tmp.name)
+            return None
+        return self.put_file(tmp.name, self._extension(filename), digest.hexdigest(), size)
+
+    def put_file(self, path, extension='', digest=None, size=None):
+        """
+        Move an existing file into the store (or drop it if the content is already stored).
+
+        Returns:
+            Path relative to static/
+        """
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+        if size is None:
+            size = os.path.getsize(path)
+
+        relative = self.blob_path(digest, extension)
+        now = datetime.utcnow()
+        try:
+            doc = self.blobs.find_one_and_update(
+                {'_id': digest},
+                {'$inc': {'refcount': 1},
+                 '$set': {'referenced_at': now},
+                 '$setOnInsert': {'path': relative, 'size': size, 'created_at': now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            relative = doc['path']
+        except Exception as e:
+            # Stored anyway; gc-blobs recounts references from the documents
+            print(f"⚠️ Could not record blob {digest}: {e}")
+
+        target = self.absolute_path(relative)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        return relative
+
+    def release(self, path):
+        """Drop one reference to a stored path (no-op for paths outside the store)"""
+        digest = self.digest_of(path)
+        if not digest or not self.db.is_connected():
+            return
+        try:
+            self.blobs.update_one(
+                {'_id': digest},
+                {'$inc': {'refcount': -1}, '$set': {'referenced_at': datetime.utcnow()}}
+            )
+        except Exception as e:
+            print(f"⚠️ Could not release blob {digest}: {e}")
+
+    def recount(self):
+        """
+        Recompute every blob's reference count from the documents that hold blob paths.
+
+        Returns:
+            Dictionary of digest -> references
+        """
+        counts = {}
+        paths = {}
+        prefix = {'$regex': f'^{BLOB_DIR}/'}
+        for collection, field in REFERENCES:
+            pipeline = [
+                {'$match': {field: prefix}},
+                {'$project': {'path': f'${field}'}},
+                {'$unwind': '$path'},
+                {'$match': {'path': prefix}},
+                {'$group': {'_id': '$path', 'count': {'$sum': 1}}}
+            ]
+            for row in self.db.db[collection].aggregate(pipeline):
+                digest = self.digest_of(row['_id'])
+                if digest:
+                    counts[digest] = counts.get(digest, 0) + row['count']
+                    paths.setdefault(digest, row['_id'])
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({'_id': digest},
+                      {'$set': {'refcount': count},
+                       '$setOnInsert': {'path': paths[digest], 'created_at': now, 'referenced_at': now}},
+                      upsert=True)
+            for digest, count in counts.items()
+        ]
+        if operations:
+            self.blobs.bulk_write(operations, ordered=False)
+        self.blobs.update_many({'_id': {'$nin': list(counts)}, 'refcount': {'$ne': 0}},
+                               {'$set': {'refcount': 0, 'referenced_at': now}})
+        return counts
+
+    def collect_garbage(self, grace_hours=1, recount=True):
+        """
+        Delete blobs without references (and stale temp files).
+
+        Blobs are only deleted once they have been unreferenced for
+        `grace_hours` (a blob the recount finds unreferenced is deleted by
+        a later run), so an upload that is still being saved is never
+        collected.
+
+        Returns:
+            Dictionary with removed count and bytes freed
+        """
+        result = {'removed': 0, 'bytes_freed': 0}
+        if not self.db.is_connected():
+            result['error'] = 'Database not connected'
+            return result
+        if recount:
+            self.recount()
+
+        cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+        for blob in self.blobs.find({'refcount': {'$lte': 0}, 'referenced_at': {'$lt': cutoff}}):
+            deleted = self.blobs.delete_one({
+                '_id': blob['_id'], 'refcount': {'$lte': 0}, 'referenced_at': {'$lt': cutoff}
+            })
+            if not deleted.deleted_count:
+                continue
+            try:
+                os.remove(self.absolute_path(blob['path']))
+                result['bytes_freed'] += blob.get('size', 0)
+            except FileNotFoundError:
+                pass
+            result['removed'] += 1
+
+        # Temp files left behind by interrupted uploads
+        if os.path.isdir(self.tmp_dir):
+            oldest = time.time() - grace_hours * 3600
+            for name in os.listdir(self.tmp_dir):
+                path = os.path.join(self.tmp_dir, name)
+                if os.path.getmtime(path) < oldest:
+                    os.remove(path)
+        return result
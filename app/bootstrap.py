@@ -0,0 +1,155 @@
+"""
+One-shot Bootstrap
+Creates upload directories, the admin user and database indexes, and
+brings existing documents up to date with fields newer code relies on.
+
+Run once per deploy rather than at import time:
+    python -m app.bootstrap
+    flask --app wsgi bootstrap
+"""
+
+import os
+from datetime import datetime
+
+from app import denormalization
+from app.database import MongoDB
+from app.messaging import MessageDelivery
+from app.models import User
+
+UPLOAD_DIRS = [
+    'static/uploads/profile_photos',
+    'static/uploads/programs',
+    'static/uploads/passport_photos',
+    'static/resources',
+    'static/blobs'
+]
+
+
+def setup_directories():
+    """Create necessary upload directories"""
+    for dir_path in UPLOAD_DIRS:
+        os.makedirs(dir_path, exist_ok=True)
+        print(f"✅ Created directory: {dir_path}")
+
+
+def create_admin_user(db):
+    """Create admin user if doesn't exist"""
+    try:
+        # Check if database connection is successful
+        if not db.is_connected():
+            print("❌ Cannot create admin user: Database connection failed!")
+            print("💡 The app will run in limited mode")
+            return False
+
+        # Admin configuration (can be overridden via environment)
+        admin_email = os.getenv('ADMIN_EMAIL', 'admin@disha.com')
+        admin_password = os.getenv('ADMIN_PASSWORD')
+
+        # Check if admin already exists
+        admin_data = db.get_user_by_email(admin_email)
+        if not admin_data:
+            admin_user = User({
+                'name': 'Admin',
+                'email': admin_email,
+                'role': 'admin',
+                'created_at': datetime.utcnow()
+            })
+            # Set password only if provided via environment variable
+            if admin_password:
+                admin_user.set_password(admin_password)
+            result = db.create_user(admin_user.to_dict())
+            if result:
+                if admin_password:
+                    print("✅ Admin user created")
+                else:
+                    print("✅ Admin user created (no password set)")
+            else:
+                print("❌ Failed to create admin user")
+                return False
+        else:
+            print("ℹ️ Admin user already exists")
+        return True
+    except Exception as e:
+        print(f"⚠️ Admin creation skipped: {e}")
+        return False
+
+
+def ensure_indexes(db):
+    """Create database indexes if they don't exist"""
+    try:
+        if db.ensure_indexes():
+            print("✅ Database indexes ready")
+            return True
+    except Exception as e:
+        print(f"⚠️ Index creation skipped: {e}")
+    return False
+
+
+def backfill_member_counts(db):
+    """Set member_count on tolis created before it existed (the open-toli queries filter on it)"""
+    try:
+        if not db.is_connected():
+            return False
+        updated = db.backfill_member_counts(only_missing=True)
+        if updated:
+            print(f"✅ Backfilled member_count on {updated} tolis")
+        return True
+    except Exception as e:
+        print(f"⚠️ member_count backfill skipped: {e}")
+        return False
+
+
+def repair_denormalized(db):
+    """
+    Fill embedded copies (leader_name, toli_name, ...) that are missing or stale.
+
+    List pages read only the copies, so documents written before an
+    embedding existed would otherwise show blanks until repaired.
+    """
+    try:
+        if not db.is_connected():
+            return False
+        drifted = [name for name, item in denormalization.verify(db.db).items() if item['count']]
+        if drifted:
+            report = denormalization.repair(db.db, drifted)
+            db.touch_collections(*{denormalization.EMBEDDINGS[name]['target'] for name in drifted})
+            remaining = sum(item['count'] for item in report.values())
+            print(f"✅ Repaired embedded copies ({', '.join(drifted)}), {remaining} still drifted")
+        return True
+    except Exception as e:
+        print(f"⚠️ Denormalized field repair skipped: {e}")
+        return False
+
+
+def initialise_unread_counters(db):
+    """Give users created before the unread counter existed an exact one"""
+    try:
+        if not db.is_connected():
+            return False
+        created = MessageDelivery(db).initialise_unread_counters()
+        if created:
+            print(f"✅ Initialised unread message counters for {created} users")
+        return True
+    except Exception as e:
+        print(f"⚠️ Unread counter initialisation skipped: {e}")
+        return False
+
+
+def run_bootstrap():
+    """Run all one-shot startup tasks"""
+    print("🚀 Initializing DISHA Application...")
+    print("📍 Checking system requirements...")
+    setup_directories()
+
+    db = MongoDB()
+    ok = create_admin_user(db)
+    ok = ensure_indexes(db) and ok
+    ok = backfill_member_counts(db) and ok
+    ok = repair_denormalized(db) and ok
+    ok = initialise_unread_counters(db) and ok
+    db.close_connection()
+    return ok
+
+
+if __name__ == '__main__':
+    run_bootstrap()
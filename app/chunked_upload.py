@@ -0,0 +1,389 @@
+"""
+Chunked Uploads
+Resumable uploads for large resources.
+
+Protocol (all under /admin/api/uploads):
+    POST   /                 init: filename, size, resource_type, title, ...
+    GET    /<id>             status: the offset to resume from
+    PUT    /<id>             append: raw chunk body, Upload-Offset header
+    POST   /<id>/complete    verify size/type/hash, publish, create Resource
+    DELETE /<id>             abort
+
+Chunks are streamed straight into a staging file (never buffered whole in
+memory) and hashed as they arrive. A chunk is only accepted at the offset the
+server last acknowledged, so a client that lost its connection asks for the
+status and continues from there. The running hash of recent uploads is
+cached per process (an LRU of HASHER_CACHE_SIZE entries); an upload whose
+hash isn't cached is rehashed from its staging file. On completion the staging file is moved into
+the blob store with os.replace, so a resource never points at a partial file.
+"""
+
+import fcntl
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.models import Resource
+from app.utils import allowed_file, get_file_extension
+
+SESSION_COLLECTION = 'upload_sessions'
+
+# Largest accepted upload and largest single chunk, in bytes
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', str(2 * 1024 ** 3)))
+MAX_CHUNK_SIZE = int(os.getenv('MAX_CHUNK_SIZE', str(8 * 1024 ** 2)))
+
+# Chunk size suggested to clients
+DEFAULT_CHUNK_SIZE = 4 * 1024 ** 2
+
+# Read size when streaming a chunk from the request
+STREAM_BUFFER = 256 * 1024
+
+# Leading bytes of each file type, checked on completion (types not listed are not checked)
+SIGNATURES = {
+    'pdf': [(0, b'%PDF')],
+    'epub': [(0, b'PK\x03\x04')],
+    'docx': [(0, b'PK\x03\x04')],
+    'pptx': [(0, b'PK\x03\x04')],
+    'xlsx': [(0, b'PK\x03\x04')],
+    'zip': [(0, b'PK\x03\x04')],
+    'doc': [(0, b'\xd0\xcf\x11\xe0')],
+    'ppt': [(0, b'\xd0\xcf\x11\xe0')],
+    'xls': [(0, b'\xd0\xcf\x11\xe0')],
+    'rar': [(0, b'Rar!')],
+    'mp4': [(4, b'ftyp')],
+    'mov': [(4, b'ftyp'), (4, b'moov'), (4, b'wide'), (4, b'mdat')],
+    'm4a': [(4, b'ftyp')],
+    'avi': [(8, b'AVI ')],
+    'wav': [(8, b'WAVE')],
+    'mkv': [(0, b'\x1a\x45\xdf\xa3')],
+    'webm': [(0, b'\x1a\x45\xdf\xa3')],
+    'ogg': [(0, b'OggS')],
+    'mp3': [(0, b'ID3'), (0, b'\xff\xfb'), (0, b'\xff\xf3'), (0, b'\xff\xf2')]
+}
+
+UPLOAD_ERRORS = {
+    'not_connected': ('Database not connected', 503),
+    'not_found': ('Upload not found', 404),
+    'invalid_type': ('File type not allowed for this resource type', 400),
+    'invalid_size': ('File size is missing or too large', 413),
+    'chunk_too_large': ('Chunk is larger than the maximum chunk size', 413),
+    'offset_mismatch': ('Chunk offset does not match the uploaded size', 409),
+    'too_much_data': ('Chunk would exceed the declared file size', 400),
+    'incomplete': ('Upload is not complete yet', 409),
+    'size_mismatch': ('Uploaded file size does not match', 400),
+    'type_mismatch': ('File content does not match its type', 400),
+    'hash_mismatch': ('Uploaded file hash does not match', 400),
+    'already_complete': ('Upload was already completed', 409)
+}
+
+# Uploads whose running hash a process keeps; others are rehashed from disk
+HASHER_CACHE_SIZE = 64
+
+# upload_id -> (offset, sha256 object) for uploads recently appended by this process
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+def _cache_hasher(upload_id, offset, hasher):
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, hasher)
+        _hashers.move_to_end(upload_id)
+        while len(_hashers) > HASHER_CACHE_SIZE:
+            _hashers.popitem(last=False)
+
+
+def _drop_hasher(upload_id):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+
+
+def staging_dir(app):
+    """Directory holding partial uploads (UPLOAD_STAGING_DIR overrides it)"""
+    return os.getenv('UPLOAD_STAGING_DIR') or os.path.join(app.instance_path, 'upload_staging')
+
+
+def matches_signature(path, extension):
+    """Check a file's leading bytes against the signatures for its extension"""
+    signatures = SIGNATURES.get(extension)
+    if not signatures:
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in signatures)
+
+
+class ChunkedUpload:
+    """Resumable upload sessions backed by staging files"""
+
+    def __init__(self, db, staging_dir, blob_store):
+        self.db = db
+        self.staging_dir = staging_dir
+        self.blob_store = blob_store
+
+    @property
+    def sessions(self):
+        return self.db.db[SESSION_COLLECTION]
+
+    def _staging_path(self, upload_id):
+        return os.path.join(self.staging_dir, f"{upload_id}.part")
+
+    def _get_session(self, upload_id):
+        if not ObjectId.is_valid(str(upload_id)):
+            return None
+        return self.sessions.find_one({'_id': ObjectId(str(upload_id))})
+
+    @staticmethod
+    def _status(session):
+        return {
+            'upload_id': str(session['_id']),
+            'offset': session['received'],
+            'size': session['size'],
+            'status': session['status'],
+            'chunk_size': DEFAULT_CHUNK_SIZE,
+            'resource_id': session.get('resource_id')
+        }
+
+    def init(self, filename, size, resource_type, title, description='', created_by=None, sha256=None):
+        """
+        Start an upload.
+
+        Returns:
+            Tuple of (status dictionary, error code or None)
+        """
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        if not filename or not allowed_file(filename, resource_type):
+            return None, 'invalid_type'
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return None, 'invalid_size'
+        if size <= 0 or size > MAX_UPLOAD_SIZE:
+            return None, 'invalid_size'
+
+        now = datetime.utcnow()
+        session = {
+            'filename': filename,
+            'size': size,
+            'received': 0,
+            'resource_type': resource_type,
+            'title': title or filename,
+            'description': description or '',
+            'expected_sha256': (sha256 or '').lower() or None,
+            'created_by': created_by,
+            'status': 'uploading',
+            'created_at': now,
+            'updated_at': now
+        }
+        session['_id'] = self.sessions.insert_one(session).inserted_id
+
+        os.makedirs(self.staging_dir, exist_ok=True)
+        open(self._staging_path(session['_id']), 'wb').close()
+        _cache_hasher(str(session['_id']), 0, hashlib.sha256())
+        return self._status(session), None
+
+    def status(self, upload_id):
+        """Current offset of an upload (where the client should resume)"""
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        session = self._get_session(upload_id)
+        if not session:
+            return None, 'not_found'
+        return self._status(session), None
+
+    def _hasher_at(self, upload_id, offset):
+        """SHA-256 state after the first `offset` bytes of the staging file"""
+        with _hashers_lock:
+            cached = _hashers.get(upload_id)
+        if cached and cached[0] == offset:
+            return cached[1]
+        # Another worker appended the previous chunks: rebuild from disk
+        hasher = hashlib.sha256()
+        remaining = offset
+        with open(self._staging_path(upload_id), 'rb') as f:
+            while remaining:
+                block = f.read(min(STREAM_BUFFER * 4, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    def append(self, upload_id, offset, stream, length):
+        """
+        Write one chunk at `offset`, streaming it from `stream`.
+
+        Returns:
+            Tuple of (status dictionary, error code or None)
+        """
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        session = self._get_session(upload_id)
+        if not session:
+            return None, 'not_found'
+        if session['status'] != 'uploading':
+            return self._status(session), 'already_complete'
+        if length is None or length > MAX_CHUNK_SIZE:
+            return self._status(session), 'chunk_too_large'
+
+        upload_id = str(session['_id'])
+        path = self._staging_path(upload_id)
+        with open(path, 'r+b') as f:
+            # One writer per upload; a duplicate retry waits and then sees the new offset
+            fcntl.flock(f, fcntl.LOCK_EX)
+            session = self._get_session(upload_id)
+            if offset != session['received']:
+                return self._status(session), 'offset_mismatch'
+            if offset + length > session['size']:
+                return self._status(session), 'too_much_data'
+
+            hasher = self._hasher_at(upload_id, offset)
+            f.seek(offset)
+            f.truncate()
+            written = 0
+            while written < length:
+                block = stream.read(min(STREAM_BUFFER, length - written))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+            f.flush()
+            os.fsync(f.fileno())
+
+            if written != length:
+                # Connection dropped mid-chunk: discard the partial chunk
+                f.truncate(offset)
+                _drop_hasher(upload_id)
+                return self._status(session), 'offset_mismatch'
+
+            new_offset = offset + written
+            self.sessions.update_one(
+                {'_id': session['_id'], 'received': offset},
+                {'$set': {'received': new_offset, 'updated_at': datetime.utcnow()}}
+            )
+            _cache_hasher(upload_id, new_offset, hasher)
+            session['received'] = new_offset
+        return self._status(session), None
+
+    def complete(self, upload_id):
+        """
+        Verify a finished upload, publish it to the blob store and create
+        its Resource.
+
+        Returns:
+            Tuple of (status dictionary with resource_id, error code or None)
+        """
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        session = self._get_session(upload_id)
+        if not session:
+            return None, 'not_found'
+        if session['status'] == 'complete':
+            return self._status(session), None
+        if session['received'] != session['size']:
+            return self._status(session), 'incomplete'
+
+        upload_id = str(session['_id'])
+        path = self._staging_path(upload_id)
+        if os.path.getsize(path) != session['size']:
+            return self._status(session), 'size_mismatch'
+        extension = get_file_extension(session['filename'])
+        if not matches_signature(path, extension):
+            return self._status(session), 'type_mismatch'
+        digest = self._hasher_at(upload_id, session['size']).hexdigest()
+        if session.get('expected_sha256') and session['expected_sha256'] != digest:
+            return self._status(session), 'hash_mismatch'
+
+        # Claim the session so a repeated complete cannot publish twice
+        claimed = self.sessions.find_one_and_update(
+            {'_id': session['_id'], 'status': 'uploading'},
+            {'$set': {'status': 'publishing', 'updated_at': datetime.utcnow()}}
+        )
+        if not claimed:
+            return self._status(self._get_session(upload_id)), 'already_complete'
+
+        try:
+            # Identical content already in the store is reused, not duplicated
+            filename = self.blob_store.put_file(path, extension, digest, session['size'])
+        except Exception as e:
+            print(f"❌ Error publishing upload {upload_id}: {e}")
+            self.sessions.update_one({'_id': session['_id']}, {'$set': {'status': 'uploading'}})
+            raise
+        _drop_hasher(upload_id)
+
+        resource = Resource({
+            'title': session['title'],
+            'description': session['description'],
+            'resource_type': session['resource_type'],
+            'created_by': session['created_by'],
+            'created_at': datetime.utcnow(),
+            'file_path': filename,
+            'file_name': session['filename'],
+            'file_size': session['size'],
+            'content_hash': digest,
+            'file_mtime': int(os.path.getmtime(self.blob_store.absolute_path(filename))),
+            'external_link': ''
+        })
+        resource_id = self.db.create_resource(resource.to_dict())
+
+        self.sessions.update_one({'_id': session['_id']}, {'$set': {
+            'status': 'complete',
+            'resource_id': str(resource_id),
+            'sha256': digest,
+            'completed_at': datetime.utcnow()
+        }})
+        session.update(status='complete', resource_id=str(resource_id))
+        return self._status(session), None
+
+    def abort(self, upload_id):
+        """Drop an unfinished upload and its staging file"""
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        session = self._get_session(upload_id)
+        if not session:
+            return None, 'not_found'
+        if session['status'] == 'complete':
+            return self._status(session), 'already_complete'
+        self._discard(session)
+        return {'upload_id': str(session['_id']), 'status': 'aborted'}, None
+
+    def _discard(self, session):
+        upload_id = str(session['_id'])
+        try:
+            os.remove(self._staging_path(upload_id))
+        except FileNotFoundError:
+            pass
+        _drop_hasher(upload_id)
+        self.sessions.delete_one({'_id': session['_id']})
+
+    def cleanup_stale(self, max_age_hours=24):
+        """
+        Remove uploads that have not received data for `max_age_hours`, and
+        drop cached hashes of uploads that are no longer in progress (for
+        example removed by another process).
+
+        Returns:
+            Number of uploads removed
+        """
+        if not self.db.is_connected():
+            return 0
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        removed = 0
+        for session in self.sessions.find({'status': 'uploading', 'updated_at': {'$lt': cutoff}}):
+            self._discard(session)
+            removed += 1
+
+        with _hashers_lock:
+            cached = list(_hashers)
+        active = {str(session['_id']) for session in self.sessions.find(
+            {'_id': {'$in': [ObjectId(upload_id) for upload_id in cached]}, 'status': 'uploading'},
+            {'_id': 1})}
+        for upload_id in cached:
+            if upload_id not in active:
+                _drop_hasher(upload_id)
+        return removed
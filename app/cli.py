@@ -0,0 +1,91 @@
+"""
+Flask CLI Commands
+Maintenance commands registered on the app (run with `flask --app wsgi <command>`).
+
+create_app() registers these in every process, so each command imports what
+it needs when it runs; importing this module adds nothing to worker startup.
+"""
+
+import os
+
+import click
+
+
+def register_commands(app):
+    """Register the app's CLI commands"""
+
+    @app.cli.command('precompile-templates')
+    def precompile_templates_command():
+        """Compile all templates into the bytecode cache."""
+        from app.templating import precompile_templates
+        result = precompile_templates(app)
+        for name, error in result['errors'].items():
+            click.echo(f"❌ {name}: {error}", err=True)
+        click.echo(f"✅ Compiled {result['compiled']} templates in {result['elapsed_ms']} ms")
+        if result['errors']:
+            raise SystemExit(1)
+
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Create upload directories, the admin user and indexes."""
+        from app.bootstrap import run_bootstrap
+        if not run_bootstrap():
+            raise SystemExit(1)
+
+    @app.cli.command('cleanup-uploads')
+    @click.option('--max-age-hours', default=24, show_default=True, help='Idle time before an upload is dropped.')
+    def cleanup_uploads_command(max_age_hours):
+        """Remove chunked uploads that stopped receiving data."""
+        from app.blob_store import BlobStore
+        from app.chunked_upload import ChunkedUpload, staging_dir
+        from app.database import MongoDB
+        db = MongoDB()
+        uploads = ChunkedUpload(db, staging_dir(app), BlobStore(db, os.path.join(app.root_path, 'static')))
+        click.echo(f"✅ Removed {uploads.cleanup_stale(max_age_hours)} stale uploads")
+
+    @app.cli.command('gc-blobs')
+    @click.option('--grace-hours', default=1.0, show_default=True, help='Time a blob must be unreferenced.')
+    @click.option('--no-recount', is_flag=True, help='Trust the stored reference counts.')
+    def gc_blobs_command(grace_hours, no_recount):
+        """Delete stored files that no document references."""
+        from app.blob_store import BlobStore
+        from app.database import MongoDB
+        store = BlobStore(MongoDB(), os.path.join(app.root_path, 'static'))
+        result = store.collect_garbage(grace_hours=grace_hours, recount=not no_recount)
+        if result.get('error'):
+            click.echo(f"❌ {result['error']}", err=True)
+            raise SystemExit(1)
+        click.echo(f"✅ Removed {result['removed']} blobs, freed {result['bytes_freed']} bytes")
+
+    @app.cli.command('prune-media-cache')
+    @click.option('--max-mb', default=None, type=float, help='Size to trim to (defaults to MEDIA_CACHE_MAX_BYTES).')
+    def prune_media_cache_command(max_mb):
+        """Evict least recently used resized images."""
+        from app.media import MediaCache, cache_dir
+        cache = MediaCache(os.path.join(app.root_path, 'static'), cache_dir(app))
+        result = cache.evict() if max_mb is None else cache.evict(int(max_mb * 1024 ** 2))
+        click.echo(f"✅ Removed {result['removed']} variants, freed {result['bytes_freed']} bytes "
+                   f"({result['bytes_kept']} bytes kept)")
+
+    @app.cli.command('prune-report-cache')
+    @click.option('--max-age-days', default=None, type=float,
+                  help='Time since last download (defaults to report_rendering.MAX_AGE_DAYS).')
+    def prune_report_cache_command(max_age_days):
+        """Delete rendered PDF/Word reports that haven't been downloaded recently."""
+        from app.media import MediaCache, cache_dir
+        from app.report_rendering import MAX_AGE_DAYS, ReportRenderer, cache_dir as report_cache_dir
+        static_dir = os.path.join(app.root_path, 'static')
+        renderer = ReportRenderer(MediaCache(static_dir, cache_dir(app)), report_cache_dir(app))
+        result = renderer.prune(MAX_AGE_DAYS if max_age_days is None else max_age_days)
+        click.echo(f"✅ Removed {result['removed']} rendered reports, freed {result['bytes_freed']} bytes")
+
+    @app.cli.command('cleanup-exports')
+    @click.option('--max-age-hours', default=None, type=float,
+                  help='Age before an export is deleted (defaults to exports.JOB_TTL_HOURS).')
+    def cleanup_exports_command(max_age_hours):
+        """Delete finished export files and their jobs."""
+        from app.database import MongoDB
+        from app.exports import JOB_TTL_HOURS, ExportJobs, exports_dir
+        removed = ExportJobs(MongoDB(), exports_dir(app)).cleanup(
+            JOB_TTL_HOURS if max_age_hours is None else max_age_hours)
+        click.echo(f"✅ Removed {removed} export jobs")
@@ -0,0 +1,87 @@
+"""
+Concurrency Helpers
+Support for running under gunicorn's gevent worker: verifies that blocking
+I/O has been made cooperative and keeps CPU-bound work (Pillow) off the
+event loop.
+"""
+
+import sys
+
+# Modules that must be patched for pymongo/socket I/O to yield to other greenlets
+REQUIRED_PATCHES = ('socket', 'ssl', 'select', 'threading', 'time')
+
+
+def gevent_active():
+    """True when gevent has monkey-patched the standard library"""
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('socket'))
+
+
+def run_blocking(func, *args, **kwargs):
+    """
+    Run CPU-bound or non-cooperative work.
+
+    Under gevent the call runs on the hub's native threadpool so other
+    greenlets keep serving requests (Pillow releases the GIL while decoding
+    and resampling); otherwise it is called directly.
+    """
+    if gevent_active():
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+
+def start_blocking(func, *args, name=None):
+    """
+    Start CPU-bound work in the background without waiting for it.
+
+    Under gevent a patched threading.Thread is a greenlet, and CPU-bound work
+    in it would stall the loop, so the call goes to the hub's native
+    threadpool instead; otherwise it runs on a daemon thread.
+    """
+    if gevent_active():
+        import gevent
+        gevent.get_hub().threadpool.spawn(func, *args)
+        return
+    import threading
+    threading.Thread(target=func, args=args, name=name, daemon=True).start()
+
+
+def verify_cooperative_io():
+    """
+    Check the gevent setup this app relies on.
+
+    Returns:
+        Dictionary of check name -> (ok, detail)
+    """
+    checks = {}
+    if not gevent_active():
+        checks['gevent'] = (False, 'gevent monkey-patching is not active')
+        return checks
+
+    from gevent import monkey
+    for module in REQUIRED_PATCHES:
+        patched = monkey.is_module_patched(module)
+        checks[f'patched:{module}'] = (patched, 'patched' if patched else 'NOT patched')
+
+    # Flask's request context lives in contextvars, which greenlet >= 1.0
+    # keeps separate per greenlet
+    import greenlet
+    per_greenlet = hasattr(greenlet.getcurrent(), 'gr_context')
+    checks['request_context'] = (per_greenlet, f'greenlet {greenlet.__version__}')
+
+    # pymongo resolves socket/threading at call time, so a patched stdlib
+    # makes its connection pool and server monitors cooperative
+    import socket
+    from gevent import socket as gevent_socket
+    cooperative = socket.socket is gevent_socket.socket
+    checks['pymongo_socket'] = (cooperative, 'gevent socket' if cooperative else 'blocking socket')
+
+    try:
+        from PIL import Image
+        size = run_blocking(lambda: Image.new('RGB', (64, 64)).resize((16, 16)).size)
+        checks['pillow_threadpool'] = (size == (16, 16), 'Pillow work runs on the hub threadpool')
+    except Exception as e:
+        checks['pillow_threadpool'] = (False, str(e))
+
+    return checks
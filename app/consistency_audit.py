@@ -0,0 +1,349 @@
+"""
+Consistency Audit Engine
+Runs data consistency checks as server-side aggregations ($lookup anti-joins)
+instead of per-document lookups, and caches the last audit result.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+MAX_TOLI_MEMBERS = 4
+AUDIT_RESULT_ID = 'consistency'
+STALE_RUN_AFTER = timedelta(minutes=30)
+
+
+def _to_object_id(field):
+    """Aggregation expression converting a string/ObjectId reference to ObjectId (or null)"""
+    return {'$convert': {'input': f'${field}', 'to': 'objectId', 'onError': None, 'onNull': None}}
+
+
+def _exists_lookup(from_collection, local_field, foreign_field, as_field):
+    """$lookup that only carries the matched _id (used for anti-joins)"""
+    return {'$lookup': {
+        'from': from_collection,
+        'localField': local_field,
+        'foreignField': foreign_field,
+        'pipeline': [{'$project': {'_id': 1}}],
+        'as': as_field
+    }}
+
+
+def _orphan_programs():
+    return [
+        {'$addFields': {
+            '_toli_oid': _to_object_id('toli_id'),
+            '_student_oid': _to_object_id('student_id')
+        }},
+        _exists_lookup('tolis', '_toli_oid', '_id', '_toli'),
+        _exists_lookup('users', '_student_oid', '_id', '_student'),
+        {'$match': {'$or': [{'_toli': {'$size': 0}}, {'_student': {'$size': 0}}]}},
+        {'$project': {
+            'title': 1,
+            'toli_id': 1,
+            'student_id': 1,
+            'missing_toli': {'$eq': [{'$size': '$_toli'}, 0]},
+            'missing_student': {'$eq': [{'$size': '$_student'}, 0]}
+        }}
+    ]
+
+
+def _missing_member_users():
+    return [
+        {'$project': {'name': 1, 'members.scholar_no': 1}},
+        {'$unwind': '$members'},
+        {'$match': {'members.scholar_no': {'$nin': [None, '']}}},
+        _exists_lookup('users', 'members.scholar_no', 'scholar_no', '_user'),
+        {'$match': {'_user': {'$size': 0}}},
+        {'$project': {'name': 1, 'scholar_no': '$members.scholar_no'}}
+    ]
+
+
+def _user_toli_mismatch():
+    return [
+        {'$match': {'role': 'student', 'toli_id': {'$nin': [None, '']}}},
+        {'$project': {'name': 1, 'scholar_no': 1, 'toli_id': 1, '_toli_oid': _to_object_id('toli_id')}},
+        {'$lookup': {
+            'from': 'tolis',
+            'localField': '_toli_oid',
+            'foreignField': '_id',
+            'pipeline': [{'$project': {'name': 1, 'members.scholar_no': 1}}],
+            'as': '_toli'
+        }},
+        {'$addFields': {'_toli': {'$first': '$_toli'}}},
+        {'$match': {'$expr': {'$not': {'$in': [
+            '$scholar_no', {'$ifNull': ['$_toli.members.scholar_no', []]}
+        ]}}}},
+        {'$project': {
+            'name': 1,
+            'scholar_no': 1,
+            'toli_id': 1,
+            'toli_name': '$_toli.name',
+            'toli_exists': {'$ne': [{'$type': '$_toli'}, 'missing']}
+        }}
+    ]
+
+
+def _member_toli_mismatch():
+    return [
+        {'$project': {'name': 1, 'members.scholar_no': 1}},
+        {'$unwind': '$members'},
+        {'$match': {'members.scholar_no': {'$nin': [None, '']}}},
+        {'$lookup': {
+            'from': 'users',
+            'localField': 'members.scholar_no',
+            'foreignField': 'scholar_no',
+            'pipeline': [{'$project': {'toli_id': 1}}],
+            'as': '_user'
+        }},
+        {'$unwind': '$_user'},
+        {'$match': {'$expr': {'$ne': [{'$toString': '$_user.toli_id'}, {'$toString': '$_id'}]}}},
+        {'$project': {
+            'name': 1,
+            'scholar_no': '$members.scholar_no',
+            'user_toli_id': {'$toString': '$_user.toli_id'}
+        }}
+    ]
+
+
+def _oversized_tolis():
+    return [
+        {'$match': {f'members.{MAX_TOLI_MEMBERS}': {'$exists': True}}},
+        {'$project': {'name': 1, 'member_count': {'$size': '$members'}}}
+    ]
+
+
+def _member_count_drift():
+    return [
+        {'$project': {
+            'name': 1,
+            'member_count': 1,
+            'actual': {'$size': {'$ifNull': ['$members', []]}}
+        }},
+        {'$match': {'$expr': {'$ne': ['$member_count', '$actual']}}}
+    ]
+
+
+def _duplicate_leaders():
+    return [
+        {'$match': {'members.1': {'$exists': True}}},
+        {'$project': {
+            'name': 1,
+            'leaders': {'$filter': {
+                'input': '$members',
+                'cond': {'$eq': ['$$this.is_leader', True]}
+            }}
+        }},
+        {'$match': {'leaders.1': {'$exists': True}}},
+        {'$project': {'name': 1, 'leaders': '$leaders.scholar_no'}}
+    ]
+
+
+def _multi_toli_leaders():
+    return [
+        {'$match': {'leader_id': {'$nin': [None, '']}}},
+        {'$group': {
+            '_id': {'$toString': '$leader_id'},
+            'tolis': {'$push': '$name'},
+            'count': {'$sum': 1}
+        }},
+        {'$match': {'count': {'$gt': 1}}}
+    ]
+
+
+def _describe_orphan_program(finding):
+    missing = []
+    if finding.get('missing_toli'):
+        missing.append('toli')
+    if finding.get('missing_student'):
+        missing.append('student')
+    return f"Program '{finding.get('title')}' has no valid {' or '.join(missing)} reference"
+
+
+# name -> (collection, title, pipeline builder, message formatter)
+CHECKS = {
+    'orphan_programs': (
+        'programs', 'Programs with missing toli or student',
+        _orphan_programs,
+        _describe_orphan_program
+    ),
+    'missing_member_users': (
+        'tolis', 'Toli members without a user account',
+        _missing_member_users,
+        lambda d: f"Toli '{d.get('name')}' has invalid member: {d.get('scholar_no')}"
+    ),
+    'user_toli_mismatch': (
+        'users', "Students whose toli_id disagrees with toli membership",
+        _user_toli_mismatch,
+        lambda d: (f"Student {d.get('scholar_no')} points to toli '{d.get('toli_name')}' but is not a member"
+                   if d.get('toli_exists') else
+                   f"Student {d.get('scholar_no')} points to missing toli {d.get('toli_id')}")
+    ),
+    'member_toli_mismatch': (
+        'tolis', "Toli members whose toli_id points elsewhere",
+        _member_toli_mismatch,
+        lambda d: f"Toli '{d.get('name')}' lists {d.get('scholar_no')} whose toli_id is {d.get('user_toli_id')}"
+    ),
+    'oversized_tolis': (
+        'tolis', f'Tolis with more than {MAX_TOLI_MEMBERS} members',
+        _oversized_tolis,
+        lambda d: f"Toli '{d.get('name')}' has {d.get('member_count')} members (max {MAX_TOLI_MEMBERS})"
+    ),
+    'member_count_drift': (
+        'tolis', 'Tolis whose member_count disagrees with members',
+        _member_count_drift,
+        lambda d: f"Toli '{d.get('name')}' has member_count {d.get('member_count')} but {d.get('actual')} members"
+    ),
+    'duplicate_leaders': (
+        'tolis', 'Tolis with more than one leader',
+        _duplicate_leaders,
+        lambda d: f"Toli '{d.get('name')}' has multiple leaders: {', '.join(str(s) for s in d.get('leaders', []))}"
+    ),
+    'multi_toli_leaders': (
+        'tolis', 'Students leading more than one toli',
+        _multi_toli_leaders,
+        lambda d: f"Student {d.get('_id')} leads {d.get('count')} tolis: {', '.join(str(t) for t in d.get('tolis', []))}"
+    ),
+}
+
+
+class ConsistencyAudit:
+    """Set-based consistency checks with cached results"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _collection(self, check):
+        if check not in CHECKS:
+            raise ValueError(f"Unknown consistency check: {check}")
+        return self.db.db[CHECKS[check][0]]
+
+    def pipeline(self, check, skip=0, limit=None):
+        """Build the aggregation pipeline for a check (sorted by _id for stable paging)"""
+        pipeline = [{'$sort': {'_id': 1}}] + CHECKS[check][2]()
+        if skip:
+            pipeline.append({'$skip': skip})
+        if limit:
+            pipeline.append({'$limit': limit})
+        return pipeline
+
+    def describe(self, check, finding):
+        """Human readable message for a finding"""
+        return CHECKS[check][3](finding)
+
+    def iter_findings(self, check, batch_size=500):
+        """Stream findings for a check straight from the aggregation cursor"""
+        cursor = self._collection(check).aggregate(
+            self.pipeline(check), batchSize=batch_size, allowDiskUse=True
+        )
+        with cursor:
+            for finding in cursor:
+                yield finding
+
+    def get_findings(self, check, page=1, per_page=50):
+        """Get one page of findings for a check"""
+        page = max(int(page), 1)
+        per_page = min(max(int(per_page), 1), 500)
+        # Fetch one extra row to know whether another page exists
+        rows = list(self._collection(check).aggregate(
+            self.pipeline(check, skip=(page - 1) * per_page, limit=per_page + 1),
+            allowDiskUse=True
+        ))
+        items = [{
+            'id': str(row.get('_id')),
+            'message': self.describe(check, row)
+        } for row in rows[:per_page]]
+        return {
+            'check': check,
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(rows) > per_page,
+            'items': items
+        }
+
+    def count_findings(self, check):
+        pipeline = self.pipeline(check) + [{'$count': 'count'}]
+        result = list(self._collection(check).aggregate(pipeline, allowDiskUse=True))
+        return result[0]['count'] if result else 0
+
+    def run(self, sample_size=20):
+        """
+        Run every check, store the summary and return it.
+
+        Only counts and the first few messages per check are cached; the full
+        list is available page by page through get_findings.
+        """
+        if not self.db.is_connected():
+            return {'status': 'failed', 'error': 'Database not connected'}
+
+        started = time.perf_counter()
+        checks = {}
+        for name, (_, title, _, _) in CHECKS.items():
+            check_started = time.perf_counter()
+            sample = self.get_findings(name, page=1, per_page=sample_size)
+            count = len(sample['items'])
+            if sample['has_more']:
+                count = self.count_findings(name)
+            checks[name] = {
+                'title': title,
+                'count': count,
+                'sample': [item['message'] for item in sample['items']],
+                'duration_ms': round((time.perf_counter() - check_started) * 1000, 1)
+            }
+
+        result = {
+            'status': 'completed',
+            'completed_at': datetime.utcnow(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'total_issues': sum(c['count'] for c in checks.values()),
+            'checks': checks
+        }
+        self.db.db.audit_results.update_one(
+            {'_id': AUDIT_RESULT_ID}, {'$set': result}, upsert=True
+        )
+        return result
+
+    def get_last_result(self):
+        """Return the cached result of the last audit (or None)"""
+        if not self.db.is_connected():
+            return None
+        return self.db.db.audit_results.find_one({'_id': AUDIT_RESULT_ID})
+
+    def start_background_run(self):
+        """
+        Start an audit in a background thread.
+
+        Returns False if another audit is already running.
+        """
+        if not self.db.is_connected():
+            return False
+
+        now = datetime.utcnow()
+        claimed = self.db.db.audit_results.find_one_and_update(
+            {'_id': AUDIT_RESULT_ID, '$or': [
+                {'status': {'$ne': 'running'}},
+                {'started_at': {'$lt': now - STALE_RUN_AFTER}}
+            ]},
+            {'$set': {'status': 'running', 'started_at': now}}
+        )
+        if claimed is None:
+            try:
+                self.db.db.audit_results.insert_one(
+                    {'_id': AUDIT_RESULT_ID, 'status': 'running', 'started_at': now}
+                )
+            except Exception:
+                # Another audit holds the slot
+                return False
+
+        def _run():
+            try:
+                self.run()
+            except Exception as e:
+                print(f"❌ Consistency audit failed: {e}")
+                self.db.db.audit_results.update_one(
+                    {'_id': AUDIT_RESULT_ID},
+                    {'$set': {'status': 'failed', 'error': str(e), 'completed_at': datetime.utcnow()}}
+                )
+
+        threading.Thread(target=_run, name='consistency-audit', daemon=True).start()
+        return True
@@ -1,4 +1,6 @@
 from app.database import MongoDB
+from app.consistency_audit import ConsistencyAudit, CHECKS
+from app.messaging import MessageDelivery
 from datetime import datetime
 
 class DataSync:
@@ -92,24 +94,11 @@ class DataSync:
         issues = []
         
         try:
-            # Check programs without student references
-            programs = self.db.get_all_programs()
-            for program in programs:
-                if not program.get('student_id'):
-                    issues.append(f"Program '{program.get('title')}' has no student reference")
-                
-                if not program.get('toli_id'):
-                    issues.append(f"Program '{program.get('title')}' has no toli reference")
-            
-            # Check tolis with member inconsistencies
-            tolis = self.db.get_all_tolis()
-            for toli in tolis:
-                members = toli.get('members', [])
-                for member in members:
-                    if isinstance(member, dict) and member.get('scholar_no'):
-                        user_data = self.db.get_user_by_scholar_no(member['scholar_no'])
-                        if not user_data:
-                            issues.append(f"Toli '{toli.get('name')}' has invalid member: {member['scholar_no']}")
+            # Every check runs as a single aggregation on the server
+            audit = ConsistencyAudit(self.db)
+            for check in CHECKS:
+                for finding in audit.iter_findings(check):
+                    issues.append(audit.describe(check, finding))
         
         except Exception as e:
             issues.append(f"Error during consistency check: {str(e)}")
@@ -141,6 +130,10 @@ class DataSync:
                         self.db.update_program(program_id, update_data)
                         fixed_issues.append(f"Updated program '{program.get('title')}' with student data")
             
+            # Recount unread message counters from the messages collection
+            users_with_unread = MessageDelivery(self.db).rebuild_unread_counters()
+            fixed_issues.append(f"Rebuilt unread message counters ({users_with_unread} users with unread messages)")
+            
             return {'success': True, 'fixed_issues': fixed_issues}
             
         except Exception as e:
@@ -2,51 +2,143 @@ from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime, timedelta
 import os
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import UpdateOne
 from dotenv import load_dotenv
 import urllib.parse
+from app import denormalization
 
 # Load environment variables
 load_dotenv()
 
+# Seconds a successful ping is trusted before pinging again
+PING_CACHE_TTL = float(os.getenv('MONGO_PING_TTL', '5'))
+
+# Seconds to wait before retrying after a failed connection attempt
+CONNECT_RETRY_BACKOFF = float(os.getenv('MONGO_RETRY_BACKOFF', '30'))
+
+# Connections per client; gevent workers raise this to match worker_connections
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+
+# Threads shared by parallel_fetch, and seconds each fetched call may take
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', '10'))
+
+# Maximum number of students in a toli
+MAX_TOLI_MEMBERS = 4
+
+# Tolis that still have room; matches the partial index on member_count
+OPEN_TOLI_FILTER = {'member_count': {'$lt': MAX_TOLI_MEMBERS}}
+
+# Fields copied from a user into a toli's members list
+MEMBER_PROJECTION = {'name': 1, 'scholar_no': 1, 'course': 1, 'email': 1, 'contact': 1, 'toli_id': 1, 'role': 1}
+
+# List pages never show a report's or newsletter's legacy inline HTML
+DOCUMENT_LIST_PROJECTION = {'content': 0}
+
+# Per-collection change counters, bumped by writes (used for HTTP caching)
+VERSION_COLLECTION = 'collection_versions'
+
+def touches(*collections):
+    """Bump the version counters of `collections` after a successful write method"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if result:
+                self.touch_collections(*collections)
+            return result
+        return wrapper
+    return decorator
+
 class MongoDB:
+    """
+    Data access layer.
+
+    Instances are cheap: they share one lazily created client per URI and
+    database, which connects on first use rather than at import. Ping results
+    are cached briefly and failed connections are retried only after a backoff,
+    so a database outage does not stall every request on connection timeouts.
+    """
+
+    # (uri, database) -> shared connection state
+    _shared = {}
+    _lock = threading.Lock()
+
     def __init__(self):
-        self.client = None
-        self.db = None
-        self.connect()
-    
+        self._key = (os.getenv('MONGODB_URI'), os.getenv('DATABASE_NAME', 'disha_db'))
+
+    @property
+    def _state(self):
+        state = MongoDB._shared.get(self._key)
+        if state is None:
+            with MongoDB._lock:
+                state = MongoDB._shared.setdefault(self._key, {
+                    'client': None, 'db': None, 'failed_at': None, 'checked_at': None
+                })
+        return state
+
+    @property
+    def client(self):
+        state = self._state
+        if state['client'] is None:
+            self.connect()
+        return state['client']
+
+    @property
+    def db(self):
+        if self.client is None:
+            return None
+        return self._state['db']
+
     def connect(self):
         """Connect to MongoDB with enhanced error handling"""
+        state = self._state
+        with MongoDB._lock:
+            if state['client'] is not None:
+                return
+            failed_at = state['failed_at']
+            if failed_at is not None and time.monotonic() - failed_at < CONNECT_RETRY_BACKOFF:
+                return
+            client, db = self._open_connection()
+            state.update(client=client, db=db,
+                         failed_at=None if client is not None else time.monotonic(),
+                         checked_at=time.monotonic() if client is not None else None)
+
+    def _open_connection(self):
+        mongodb_uri, database_name = self._key
         try:
             # Get MongoDB Atlas URI from environment
-            mongodb_uri = os.getenv('MONGODB_URI')
-            database_name = os.getenv('DATABASE_NAME', 'disha_db')
-            
             if not mongodb_uri:
                 print("❌ MONGODB_URI environment variable is not set")
                 print("💡 Please check your .env file")
-                return
+                return None, None
             
             print(f"🔗 Attempting to connect to MongoDB...")
             print(f"📁 Database: {database_name}")
             
             # Connect to MongoDB Atlas with enhanced settings
-            self.client = MongoClient(
+            client = MongoClient(
                 mongodb_uri,
                 # Reduced timeouts for better error handling
                 connectTimeoutMS=10000,
                 socketTimeoutMS=10000,
                 serverSelectionTimeoutMS=10000,
                 retryWrites=True,
+                # Sized per worker process (see gunicorn_config.py)
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
                 # Direct connection to avoid SRV issues
                 connect=False  # Don't connect immediately
             )
             
-            self.db = self.client[database_name]
-            
             # Test the connection with a simple command
-            self.client.admin.command('ping')
+            client.admin.command('ping')
             print("✅ Connected to MongoDB Atlas successfully!")
             print(f"✅ Database: {database_name}")
+            return client, client[database_name]
             
         except Exception as e:
             print(f"❌ Error connecting to MongoDB Atlas: {e}")
@@ -59,38 +151,79 @@ class MongoDB:
             # Fallback: Try local MongoDB if available
             try:
                 print("🔄 Attempting fallback to local MongoDB...")
-                self.client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000)
-                self.db = self.client[database_name]
-                self.client.admin.command('ping')
+                client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000,
+                                     maxPoolSize=MONGO_MAX_POOL_SIZE)
+                client.admin.command('ping')
                 print("✅ Connected to local MongoDB successfully!")
+                return client, client[database_name]
             except Exception as local_error:
                 print(f"❌ Local MongoDB also failed: {local_error}")
-                self.client = None
-                self.db = None
+                print(f"💡 Will retry in {CONNECT_RETRY_BACKOFF}s")
+                return None, None
 
     def is_connected(self):
-        """Check if database is connected"""
-        if self.client is None:
+        """Check if database is connected (successful pings are cached briefly)"""
+        client = self.client
+        if client is None:
             return False
+        state = self._state
+        checked_at = state['checked_at']
+        if checked_at is not None and time.monotonic() - checked_at < PING_CACHE_TTL:
+            return True
         try:
-            self.client.admin.command('ping')
+            client.admin.command('ping')
+            state['checked_at'] = time.monotonic()
             return True
         except:
+            state['checked_at'] = None
             return False
 
     def close_connection(self):
-        """Close the database connection"""
-        if self.client:
+        """Close the shared database connection (it reopens on next use)"""
+        with MongoDB._lock:
+            state = MongoDB._shared.pop(self._key, None)
+        if state and state['client']:
             try:
-                self.client.close()
+                state['client'].close()
                 print("✅ Database connection closed")
             except Exception as e:
                 print(f"⚠️ Error closing database connection: {e}")
 
+    # Collection versions
+    def touch_collections(self, *names):
+        """Record that data in these collections changed"""
+        if not names or not self.is_connected():
+            return
+        now = datetime.utcnow()
+        try:
+            self.db[VERSION_COLLECTION].bulk_write([
+                UpdateOne({'_id': name}, {'$inc': {'version': 1}, '$set': {'updated_at': now}}, upsert=True)
+                for name in names
+            ], ordered=False)
+        except Exception as e:
+            print(f"⚠️ Could not bump collection versions {names}: {e}")
+
+    def get_collection_versions(self, names):
+        """
+        Current version counters for collections.
+
+        Returns:
+            Dictionary of name -> (version, updated_at), or None when not connected
+        """
+        if not self.is_connected():
+            return None
+        versions = {name: (0, None) for name in names}
+        for doc in self.db[VERSION_COLLECTION].find({'_id': {'$in': list(names)}}):
+            versions[doc['_id']] = (doc.get('version', 0), doc.get('updated_at'))
+        return versions
+
     # User methods
+    @touches('users')
     def create_user(self, user_data):
         if not self.is_connected():
             return None
+        # A new user has no messages yet, so the unread counter starts out exact
+        user_data.setdefault('unread_messages', 0)
         return self.db.users.insert_one(user_data).inserted_id
 
     def get_user_by_id(self, user_id):
@@ -120,20 +253,35 @@ class MongoDB:
             return 0
         return self.db.users.count_documents({'role': role})
 
+    def count_active_students(self):
+        """Students that have logged in at least once"""
+        if not self.is_connected():
+            return 0
+        return self.db.users.count_documents({'role': 'student', 'last_login': {'$exists': True, '$nin': [None, '']}})
+
+    @touches('users')
     def update_user(self, user_id, update_data):
         if not self.is_connected():
             return None
-        return self.db.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
+        result = self.db.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
+        if result.modified_count:
+            # Refresh copies of the user's fields in tolis/programs/messages
+            updated = denormalization.propagate(self.db, 'users', user_id, update_data)
+            self.touch_collections(*[name for name, count in updated.items() if count])
+        return result
 
-    def get_students_without_toli(self):
+    def get_students_without_toli(self, projection=None):
         if not self.is_connected():
             return []
-        return list(self.db.users.find({'role': 'student', 'toli_id': None}))
+        return list(self.db.users.find({'role': 'student', 'toli_id': {'$in': [None, '']}}, projection))
 
     # Toli methods
+    @touches('tolis')
     def create_toli(self, toli_data):
         if not self.is_connected():
             return None
+        toli_data = dict(toli_data, member_count=len(toli_data.get('members') or []))
+        denormalization.embed_references(self.db, 'tolis', toli_data)
         return self.db.tolis.insert_one(toli_data).inserted_id
 
     def get_toli_by_id(self, toli_id):
@@ -156,15 +304,68 @@ class MongoDB:
             return 0
         return self.db.tolis.count_documents({'status': 'active'})
 
+    def count_pending_tolis(self):
+        if not self.is_connected():
+            return 0
+        return self.db.tolis.count_documents({'status': 'pending'})
+
+    @touches('tolis', 'programs')
     def update_toli(self, toli_id, update_data):
         if not self.is_connected():
             return None
-        return self.db.tolis.update_one({'_id': ObjectId(toli_id)}, {'$set': update_data})
+        if 'members' in update_data:
+            # Keep the denormalized count in step with a replaced members list
+            update_data = dict(update_data, member_count=len(update_data['members'] or []))
+        result = self.db.tolis.update_one({'_id': ObjectId(toli_id)}, {'$set': update_data})
+        if result.modified_count:
+            denormalization.propagate(self.db, 'tolis', toli_id, update_data)
+        return result
 
     def get_tolis_with_available_slots(self):
         if not self.is_connected():
             return []
-        return list(self.db.tolis.find({'$expr': {'$lt': [{'$size': '$members'}, 4]}}))
+        return list(self.db.tolis.find(OPEN_TOLI_FILTER))
+
+    def get_open_tolis(self):
+        """Tolis with free slots, projected to what selection lists need"""
+        if not self.is_connected():
+            return []
+        return list(self.db.tolis.find(
+            OPEN_TOLI_FILTER,
+            {'name': 1, 'location.city': 1, 'location.state': 1, 'member_count': 1}
+        ).sort('name', 1))
+
+    def ensure_indexes(self):
+        """Create the indexes the toli queries rely on (idempotent)"""
+        if not self.is_connected():
+            return False
+        try:
+            self.db.tolis.create_index(
+                [('member_count', 1)],
+                name='open_tolis',
+                partialFilterExpression=OPEN_TOLI_FILTER
+            )
+            return True
+        except Exception as e:
+            print(f"⚠️ Error creating indexes: {e}")
+            return False
+
+    @touches('tolis')
+    def backfill_member_counts(self, only_missing=False):
+        """
+        Recompute member_count from the members array server-side.
+
+        Returns:
+            Number of tolis updated
+        """
+        if not self.is_connected():
+            return 0
+        query = {'member_count': {'$exists': False}} if only_missing else {}
+        result = self.db.tolis.update_many(
+            query,
+            [{'$set': {'member_count': {'$size': {'$ifNull': ['$members', []]}}}}]
+        )
+        return result.modified_count
 
     def get_tolis_by_session(self):
         if not self.is_connected():
@@ -184,10 +385,251 @@ class MongoDB:
         result = list(self.db.tolis.aggregate(pipeline))
         return result[0]['average_members'] if result else 0
 
+    # Toli membership methods
+    # Every operation below is a fixed number of round trips regardless of how
+    # many students are involved, and capacity is enforced by the update filter
+    # so concurrent requests cannot overfill a toli.
+
+    @staticmethod
+    def build_toli_member(user_data, is_leader=False):
+        """Build the member entry stored in a toli's members list"""
+        member = {
+            'name': user_data.get('name', ''),
+            'scholar_no': user_data.get('scholar_no', ''),
+            'course': user_data.get('course', ''),
+            'email': user_data.get('email', ''),
+            'is_leader': is_leader
+        }
+        if user_data.get('_id'):
+            member['user_id'] = ObjectId(str(user_data['_id']))
+            member['contact'] = user_data.get('contact', '')
+        return member
+
+    @staticmethod
+    def _toli_id_variants(toli_id):
+        """A user's toli_id may be stored as a string or an ObjectId"""
+        toli_id_str = str(toli_id)
+        variants = [toli_id_str]
+        if ObjectId.is_valid(toli_id_str):
+            variants.append(ObjectId(toli_id_str))
+        return variants
+
+    def get_users_by_ids(self, user_ids, projection=None):
+        if not self.is_connected():
+            return []
+        object_ids = [ObjectId(str(user_id)) for user_id in user_ids]
+        return list(self.db.users.find({'_id': {'$in': object_ids}}, projection))
+
+    def get_users_by_scholar_nos(self, scholar_nos, projection=None):
+        if not self.is_connected():
+            return []
+        return list(self.db.users.find({'scholar_no': {'$in': list(scholar_nos)}}, projection))
+
+    @touches('tolis')
+    def add_toli_members(self, toli_id, members):
+        """
+        Append members to a toli in one conditional update.
+
+        The update only matches while the toli still has room for all of the
+        new members and none of them is already listed.
+
+        Returns:
+            True if the members were added
+        """
+        if not self.is_connected():
+            return False
+        if not members:
+            return True
+        if len(members) > MAX_TOLI_MEMBERS:
+            return False
+
+        result = self.db.tolis.update_one(
+            {
+                '_id': ObjectId(str(toli_id)),
+                f'members.{MAX_TOLI_MEMBERS - len(members)}': {'$exists': False},
+                'members.scholar_no': {'$nin': [m['scholar_no'] for m in members]}
+            },
+            {
+                '$push': {'members': {'$each': members}},
+                '$inc': {'member_count': len(members)},
+                '$set': {'updated_at': datetime.utcnow()}
+            }
+        )
+        return result.modified_count == 1
+
+    @touches('tolis')
+    def pull_toli_members(self, toli_id, scholar_nos):
+        """Remove members from a toli in one update"""
+        if not self.is_connected() or not scholar_nos:
+            return False
+        # Pipeline update so member_count is recomputed from the filtered list
+        result = self.db.tolis.update_one(
+            {'_id': ObjectId(str(toli_id))},
+            [
+                {'$set': {
+                    'members': {'$filter': {
+                        'input': {'$ifNull': ['$members', []]},
+                        'cond': {'$not': [{'$in': ['$$this.scholar_no', list(scholar_nos)]}]}
+                    }},
+                    'updated_at': datetime.utcnow()
+                }},
+                {'$set': {'member_count': {'$size': '$members'}}}
+            ]
+        )
+        return result.modified_count == 1
+
+    @touches('users')
+    def set_users_toli(self, user_ids, toli_ref, only_unassigned=True):
+        """
+        Set toli_id on many users with a single update_many.
+
+        Returns:
+            Number of users updated
+        """
+        if not self.is_connected() or not user_ids:
+            return 0
+        query = {'_id': {'$in': [ObjectId(str(user_id)) for user_id in user_ids]}}
+        if only_unassigned:
+            query['toli_id'] = {'$in': [None, '']}
+        result = self.db.users.update_many(
+            query, {'$set': {'toli_id': toli_ref, 'updated_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    def claim_students_for_toli(self, toli_id, users, toli_ref):
+        """
+        Point users at a toli whose members list already contains them.
+
+        If another request assigned some of the students in the meantime,
+        those students are pulled back out of this toli.
+
+        Returns:
+            List of user documents that were assigned
+        """
+        user_ids = [user['_id'] for user in users]
+        updated = self.set_users_toli(user_ids, toli_ref)
+        if updated == len(user_ids):
+            return users
+
+        # Lost a race for some students: keep only the ones that now point here
+        assigned_ids = {
+            user['_id'] for user in self.db.users.find(
+                {'_id': {'$in': user_ids}, 'toli_id': toli_ref}, {'_id': 1}
+            )
+        }
+        lost = [user['scholar_no'] for user in users if user['_id'] not in assigned_ids]
+        self.pull_toli_members(toli_id, lost)
+        return [user for user in users if user['_id'] in assigned_ids]
+
+    def assign_students_to_toli(self, toli_id, student_ids=None, scholar_nos=None, toli_ref=None):
+        """
+        Add existing students to a toli.
+
+        Args:
+            toli_id: Toli ID
+            student_ids: User IDs to add (or)
+            scholar_nos: Scholar numbers to add
+            toli_ref: Value stored in users' toli_id (defaults to the string toli_id)
+
+        Returns:
+            Tuple of (added user documents, error code or None). Error codes:
+            'not_found', 'already_assigned', 'toli_full', 'toli_not_found'
+        """
+        if not self.is_connected():
+            return [], 'not_connected'
+
+        toli_ref = str(toli_id) if toli_ref is None else toli_ref
+        if student_ids:
+            users = self.get_users_by_ids(student_ids, MEMBER_PROJECTION)
+            requested = len(set(student_ids))
+        else:
+            users = self.get_users_by_scholar_nos(scholar_nos or [], MEMBER_PROJECTION)
+            requested = len(set(scholar_nos or []))
+
+        users = [user for user in users if user.get('role') == 'student']
+        if not users or len(users) < requested:
+            return [], 'not_found'
+        if any(user.get('toli_id') for user in users):
+            return [], 'already_assigned'
+
+        members = [self.build_toli_member(user) for user in users]
+        if not self.add_toli_members(toli_id, members):
+            if not self.db.tolis.count_documents({'_id': ObjectId(str(toli_id))}, limit=1):
+                return [], 'toli_not_found'
+            return [], 'toli_full'
+
+        return self.claim_students_for_toli(toli_id, users, toli_ref), None
+
+    @touches('tolis', 'users')
+    def remove_toli_member(self, toli_id, scholar_no):
+        """
+        Remove a member from a toli and clear the student's toli_id.
+
+        Returns:
+            True if the member was found and removed
+        """
+        if not self.is_connected():
+            return False
+
+        previous = self.db.tolis.find_one_and_update(
+            {'_id': ObjectId(str(toli_id)), 'members.scholar_no': scholar_no},
+            {
+                '$pull': {'members': {'scholar_no': scholar_no}},
+                '$inc': {'member_count': -1},
+                '$set': {'updated_at': datetime.utcnow()}
+            },
+            projection={'members': {'$elemMatch': {'scholar_no': scholar_no}}}
+        )
+        if previous is None:
+            return False
+
+        removed = (previous.get('members') or [{}])[0]
+        if removed.get('is_leader'):
+            leader_fields = dict(denormalization.copied_values('toli_leader', {}), leader_id=None)
+            self.db.tolis.update_one({'_id': previous['_id']}, {'$set': leader_fields})
+
+        self.db.users.update_one(
+            {'scholar_no': scholar_no, 'toli_id': {'$in': self._toli_id_variants(toli_id)}},
+            {'$set': {'toli_id': None, 'updated_at': datetime.utcnow()}}
+        )
+        return True
+
+    @touches('tolis')
+    def set_toli_leader(self, toli_id, scholar_no, leader_id, leader=None):
+        """
+        Make one member the leader and clear the flag on everyone else.
+
+        Args:
+            leader: Leader's user document, used for the embedded leader fields
+
+        Returns:
+            True if the member exists in the toli
+        """
+        if not self.is_connected():
+            return False
+        update = denormalization.copied_values('toli_leader', leader or {})
+        update.update({
+            'members.$[leader].is_leader': True,
+            'members.$[other].is_leader': False,
+            'leader_id': leader_id,
+            'updated_at': datetime.utcnow()
+        })
+        result = self.db.tolis.update_one(
+            {'_id': ObjectId(str(toli_id)), 'members.scholar_no': scholar_no},
+            {'$set': update},
+            array_filters=[
+                {'leader.scholar_no': scholar_no},
+                {'other.scholar_no': {'$ne': scholar_no}}
+            ]
+        )
+        return result.matched_count == 1
+
     # Program methods
+    @touches('programs')
     def create_program(self, program_data):
         if not self.is_connected():
             return None
+        denormalization.embed_references(self.db, 'programs', program_data)
         return self.db.programs.insert_one(program_data).inserted_id
 
     def get_programs_by_toli(self, toli_id):
@@ -234,6 +676,7 @@ class MongoDB:
             print(f"❌ Error fetching report: {e}")
             return None
 
+    @touches('programs')
     def update_program(self, program_id, update_data):
         if not self.is_connected():
             return None
@@ -244,6 +687,24 @@ class MongoDB:
             return []
         return list(self.db.programs.find())
 
+    def get_gallery_programs(self, limit=0):
+        """Programs with images, newest first, with only the fields galleries show"""
+        if not self.is_connected():
+            return []
+        projection = {'title': 1, 'program_type': 1, 'location': 1, 'images': 1, 'toli_name': 1}
+        return list(self.db.programs.find({'images.0': {'$exists': True}}, projection)
+                    .sort('created_at', -1).limit(limit))
+
+    def count_programs_by_toli(self):
+        """Program counts for every toli in one aggregation, keyed by toli id string"""
+        if not self.is_connected():
+            return {}
+        pipeline = [
+            {'$match': {'toli_id': {'$nin': [None, '']}}},
+            {'$group': {'_id': {'$toString': '$toli_id'}, 'count': {'$sum': 1}}}
+        ]
+        return {row['_id']: row['count'] for row in self.db.programs.aggregate(pipeline)}
+
     def count_programs(self):
         if not self.is_connected():
             return 0
@@ -255,6 +716,7 @@ class MongoDB:
         return self.db.programs.count_documents({'status': 'pending'})
 
     # Resource methods
+    @touches('resources')
     def create_resource(self, resource_data):
         if not self.is_connected():
             return None
@@ -275,6 +737,21 @@ class MongoDB:
             return 0
         return self.db.resources.count_documents({})
 
+    def record_resource_download(self, resource_id, counters):
+        """Increment a resource's download metrics (not a content change, so no version bump)"""
+        if not self.is_connected():
+            return None
+        try:
+            return self.db.resources.update_one(
+                {'_id': ObjectId(resource_id)},
+                {'$inc': {f'downloads.{name}': value for name, value in counters.items()},
+                 '$set': {'downloads.last_at': datetime.utcnow()}}
+            )
+        except Exception as e:
+            print(f"⚠️ Could not record download: {e}")
+            return None
+
+    @touches('resources')
     def delete_resource(self, resource_id):
         if not self.is_connected():
             return None
@@ -285,16 +762,25 @@ class MongoDB:
             return []
         return list(self.db.resources.find({'resource_type': resource_type}).sort('created_at', -1))
 
+    @touches('resources')
     def update_resource(self, resource_id, update_data):
         if not self.is_connected():
             return None
         return self.db.resources.update_one({'_id': ObjectId(resource_id)}, {'$set': update_data})
 
     # Message methods
+    @touches('messages', 'users')
     def create_message(self, message_data):
         if not self.is_connected():
             return None
-        return self.db.messages.insert_one(message_data).inserted_id
+        denormalization.embed_references(self.db, 'messages', message_data)
+        message_id = self.db.messages.insert_one(message_data).inserted_id
+        receiver_id = message_data.get('receiver_id')
+        if receiver_id not in (None, 'all') and not message_data.get('is_read') and ObjectId.is_valid(str(receiver_id)):
+            # Only bump initialised counters; a missing one is counted from messages
+            self.db.users.update_one({'_id': ObjectId(str(receiver_id)), 'unread_messages': {'$exists': True}},
+                                     {'$inc': {'unread_messages': 1}})
+        return message_id
 
     def get_message_by_id(self, message_id):
         if not self.is_connected():
@@ -330,33 +816,78 @@ class MongoDB:
             ]
         }).sort('created_at', -1))
 
+    @touches('messages')
     def update_message(self, message_id, update_data):
         if not self.is_connected():
             return None
         return self.db.messages.update_one({'_id': ObjectId(message_id)}, {'$set': update_data})
 
+    @touches('messages', 'users')
     def mark_message_as_read(self, message_id):
         if not self.is_connected():
             return None
-        return self.db.messages.update_one({'_id': ObjectId(message_id)}, {'$set': {'is_read': True}})
-
+        message = self.db.messages.find_one_and_update(
+            {'_id': ObjectId(message_id), 'is_read': False},
+            {'$set': {'is_read': True}},
+            projection={'receiver_id': 1}
+        )
+        if message and message.get('receiver_id') not in (None, 'all'):
+            self._decrement_unread(message['receiver_id'], 1)
+        return message
+
+    @touches('messages', 'users')
+    def mark_messages_read_for_user(self, user_id, message_ids):
+        """Mark a user's messages as read and adjust the unread counter"""
+        if not self.is_connected() or not message_ids:
+            return 0
+        object_ids = [ObjectId(str(message_id)) for message_id in message_ids]
+        direct = self.db.messages.update_many(
+            {'_id': {'$in': object_ids}, 'receiver_id': user_id, 'is_read': False},
+            {'$set': {'is_read': True}}
+        )
+        self.db.messages.update_many(
+            {'_id': {'$in': object_ids}, 'receiver_id': {'$in': [None, 'all']}, 'is_read': False},
+            {'$set': {'is_read': True}}
+        )
+        if direct.modified_count:
+            self._decrement_unread(user_id, direct.modified_count)
+        return direct.modified_count
+
+    def _decrement_unread(self, user_id, count):
+        """Lower the unread counter without letting it go negative"""
+        if not ObjectId.is_valid(str(user_id)):
+            return
+        self.db.users.update_one(
+            {'_id': ObjectId(str(user_id)), 'unread_messages': {'$gt': 0}},
+            [{'$set': {'unread_messages': {'$max': [0, {'$subtract': ['$unread_messages', count]}]}}}]
+        )
+
+    @touches('messages')
     def delete_message(self, message_id):
         if not self.is_connected():
             return None
         return self.db.messages.delete_one({'_id': ObjectId(message_id)})
 
     def count_unread_messages(self, user_id):
-        """Count unread messages for a user"""
+        """
+        Count unread messages for a user.
+
+        Direct messages come from the user's counter once it has been
+        initialised (MessageDelivery.initialise_unread_counters); until then
+        they are counted from the messages collection.
+        """
         if not self.is_connected():
             return 0
-        return self.db.messages.count_documents({
-            '$or': [
-                {'receiver_id': user_id},
-                {'receiver_id': None},
-                {'receiver_id': 'all'}
-            ],
+        user = self.db.users.find_one({'_id': ObjectId(user_id)}, {'unread_messages': 1}) or {}
+        if 'unread_messages' in user:
+            direct = user['unread_messages']
+        else:
+            direct = self.db.messages.count_documents({'receiver_id': user_id, 'is_read': False})
+        broadcast = self.db.messages.count_documents({
+            'receiver_id': {'$in': [None, 'all']},
             'is_read': False
         })
+        return direct + broadcast
 
     def count_messages(self):
         if not self.is_connected():
@@ -364,6 +895,7 @@ class MongoDB:
         return self.db.messages.count_documents({})
 
     # Newsletter methods
+    @touches('newsletters')
     def create_newsletter(self, newsletter_data):
         if not self.is_connected():
             return None
@@ -377,29 +909,33 @@ class MongoDB:
     def get_all_newsletters(self):
         if not self.is_connected():
             return []
-        return list(self.db.newsletters.find({'status': 'published'}).sort('created_at', -1))
+        return list(self.db.newsletters.find({'status': 'published'}, DOCUMENT_LIST_PROJECTION).sort('created_at', -1))
 
     def get_newsletters_by_toli(self, toli_name):
         if not self.is_connected():
             return []
-        return list(self.db.newsletters.find({'toli_name': toli_name, 'status': 'published'}).sort('created_at', -1))
+        return list(self.db.newsletters.find({'toli_name': toli_name, 'status': 'published'}, DOCUMENT_LIST_PROJECTION)
+                    .sort('created_at', -1))
 
     def count_newsletters(self):
         if not self.is_connected():
             return 0
         return self.db.newsletters.count_documents({'status': 'published'})
 
+    @touches('newsletters')
     def update_newsletter(self, newsletter_id, update_data):
         if not self.is_connected():
             return None
         return self.db.newsletters.update_one({'_id': ObjectId(newsletter_id)}, {'$set': update_data})
 
+    @touches('newsletters')
     def delete_newsletter(self, newsletter_id):
         if not self.is_connected():
             return None
         return self.db.newsletters.delete_one({'_id': ObjectId(newsletter_id)})
 
     # Report methods
+    @touches('reports')
     def create_report(self, report_data):
         if not self.is_connected():
             return None
@@ -413,17 +949,17 @@ class MongoDB:
     def get_reports_by_student(self, student_id):
         if not self.is_connected():
             return []
-        return list(self.db.reports.find({'created_by': student_id}).sort('created_at', -1))
+        return list(self.db.reports.find({'created_by': student_id}, DOCUMENT_LIST_PROJECTION).sort('created_at', -1))
 
     def get_all_reports(self):
         if not self.is_connected():
             return []
-        return list(self.db.reports.find().sort('created_at', -1))
+        return list(self.db.reports.find({}, DOCUMENT_LIST_PROJECTION).sort('created_at', -1))
 
     def get_reports_by_toli(self, toli_name):
         if not self.is_connected():
             return []
-        return list(self.db.reports.find({'toli_name': toli_name}).sort('created_at', -1))
+        return list(self.db.reports.find({'toli_name': toli_name}, DOCUMENT_LIST_PROJECTION).sort('created_at', -1))
 
     def count_reports(self):
         if not self.is_connected():
@@ -439,7 +975,8 @@ class MongoDB:
     def get_recent_newsletters(self, limit=5):
         if not self.is_connected():
             return []
-        return list(self.db.newsletters.find({'status': 'published'}).sort('created_at', -1).limit(limit))
+        return list(self.db.newsletters.find({'status': 'published'}, DOCUMENT_LIST_PROJECTION)
+                    .sort('created_at', -1).limit(limit))
 
     def get_program_by_id(self, program_id):
         """Get program by ID"""
@@ -447,6 +984,7 @@ class MongoDB:
             return None
         return self.db.programs.find_one({'_id': ObjectId(program_id)})
 
+    @touches('programs')
     def delete_program(self, program_id):
         """Delete a program"""
         if not self.is_connected():
@@ -497,6 +1035,7 @@ class MongoDB:
             print(f"Error getting toli by name: {e}")
             return None
 
+    @touches('users')
     def update_user_toli(self, user_id, toli_id):
         """Update user's toli assignment with validation"""
         if not self.is_connected():
@@ -576,6 +1115,7 @@ class MongoDB:
             print(f"Error getting active instruction: {e}")
             return None
     
+    @touches('instructions')
     def create_instruction(self, instruction_data):
         """Create a new instruction"""
         if not self.is_connected():
@@ -591,6 +1131,7 @@ class MongoDB:
             print(f"Error creating instruction: {e}")
             return None
     
+    @touches('instructions')
     def update_instruction(self, instruction_id, update_data):
         """Update an instruction"""
         if not self.is_connected():
@@ -615,3 +1156,66 @@ class MongoDB:
         except Exception as e:
             print(f"Error getting instruction: {e}")
             return None
+
+
+class FetchResults(dict):
+    """Results of parallel_fetch, with per-call timings (ms) and errors"""
+
+    def __init__(self):
+        super().__init__()
+        self.timings = {}
+        self.errors = {}
+
+
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+
+def _get_fetch_executor():
+    global _fetch_executor
+    if _fetch_executor is None:
+        with _fetch_executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='db-fetch')
+    return _fetch_executor
+
+
+def parallel_fetch(calls, fallbacks=None, timeout=FETCH_TIMEOUT):
+    """
+    Run independent reads concurrently on a shared, bounded thread pool.
+
+    Do not call from inside a fetched callable: nested batches can exhaust
+    the pool.
+
+    Args:
+        calls: Dictionary of name -> zero-argument callable
+        fallbacks: Dictionary of name -> value used when that call fails or times out
+        timeout: Seconds each call may take (counted from submission)
+
+    Returns:
+        FetchResults mapping name -> result
+    """
+    fallbacks = fallbacks or {}
+    executor = _get_fetch_executor()
+    submitted = time.perf_counter()
+
+    def timed(name, func):
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            results.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    results = FetchResults()
+    futures = {name: executor.submit(timed, name, func) for name, func in calls.items()}
+    for name, future in futures.items():
+        remaining = max(0, timeout - (time.perf_counter() - submitted))
+        try:
+            results[name] = future.result(timeout=remaining)
+        except Exception as e:
+            future.cancel()
+            error = str(e) or type(e).__name__
+            print(f"❌ Error fetching {name}: {error}")
+            results.errors[name] = error
+            results[name] = fallbacks.get(name)
+    return results
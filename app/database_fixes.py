@@ -15,6 +15,8 @@ class DatabaseFixes:
             
             # Add updated_at timestamp
             update_data['updated_at'] = datetime.utcnow()
+            if 'members' in update_data:
+                update_data['member_count'] = len(update_data['members'] or [])
             
             # Update the toli
             result = self.db.tolis.update_one(
@@ -0,0 +1,98 @@
+"""
+Date Utilities
+Shared date coercion and display formatting.
+
+String inputs go through datetime.fromisoformat first (the format dates are
+stored in) and fall back to a few legacy formats; parsed strings are kept
+in a bounded LRU cache. Formatted values are cached as well, and month and
+day names come from a fixed English table so output doesn't depend on the
+process locale.
+"""
+
+import re
+from datetime import datetime, date
+from functools import lru_cache
+
+# Legacy string formats found in older documents
+FALLBACK_FORMATS = ('%Y-%m-%d %H:%M:%S', '%d-%m-%Y', '%d/%m/%Y')
+
+DISPLAY_FORMAT = '%d %b %Y'
+
+_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+           'August', 'September', 'October', 'November', 'December')
+_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Directives strftime would render in the process locale
+_NAME_DIRECTIVES = re.compile(r'%[%aAbBp]')
+
+_NAMES = {
+    '%b': lambda d: _MONTHS[d.month - 1][:3],
+    '%B': lambda d: _MONTHS[d.month - 1],
+    '%a': lambda d: _DAYS[d.weekday()][:3],
+    '%A': lambda d: _DAYS[d.weekday()],
+    '%p': lambda d: 'AM' if d.hour < 12 else 'PM',
+    '%%': lambda d: '%%'
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_string(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+        for fmt in FALLBACK_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is not None and parsed.tzinfo is not None:
+        # Stored datetimes are naive UTC
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    return parsed
+
+
+def to_datetime(value, default=None):
+    """
+    Coerce a stored or submitted date value to a naive datetime.
+
+    Args:
+        value: datetime, date, or string
+        default: Returned when the value cannot be interpreted
+
+    Returns:
+        datetime or default
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    if isinstance(value, str) and value.strip():
+        parsed = _parse_string(value.strip())
+        if parsed is not None:
+            return parsed
+    return default
+
+
+@lru_cache(maxsize=4096)
+def _strftime(value, fmt):
+    """strftime with English month/day names (rows repeat dates, so results are cached)"""
+    return value.strftime(_NAME_DIRECTIVES.sub(lambda match: _NAMES[match.group()](value), fmt))
+
+
+def format_date(value, fmt=DISPLAY_FORMAT, default=None):
+    """
+    Format a date value for display.
+
+    Args:
+        value: datetime, date, or string
+        fmt: strftime-style output format
+        default: Returned for values that are not dates (defaults to str(value))
+    """
+    parsed = to_datetime(value)
+    if parsed is None:
+        if default is not None:
+            return default
+        return value if isinstance(value, str) else str(value)
+    return _strftime(parsed, fmt)
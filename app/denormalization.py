@@ -0,0 +1,240 @@
+"""
+Denormalized Field Map
+Declares which user/toli fields are copied into other documents so list
+pages can render without per-row lookups, and keeps those copies in sync.
+
+Copies are written when a document is created (embed_references), fanned
+out with update_many whenever a source field changes (propagate), and can
+be checked or rebuilt server-side with an aggregation (verify / repair).
+"""
+
+from bson import ObjectId
+
+# name -> embedding definition
+#   source:  collection the values come from
+#   target:  collection holding the copies
+#   ref:     target field referencing the source _id       (scalar copies)
+#   array/key: target array and the source field matching its items (array copies)
+#   fields:  source field -> copied field name
+EMBEDDINGS = {
+    'toli_leader': {
+        'source': 'users',
+        'target': 'tolis',
+        'ref': 'leader_id',
+        'fields': {'name': 'leader_name', 'scholar_no': 'leader_scholar_no', 'email': 'leader_email'}
+    },
+    'toli_members': {
+        'source': 'users',
+        'target': 'tolis',
+        'array': 'members',
+        'key': 'scholar_no',
+        'fields': {'_id': 'user_id', 'name': 'name', 'scholar_no': 'scholar_no', 'course': 'course',
+                   'email': 'email', 'contact': 'contact'}
+    },
+    'program_toli': {
+        'source': 'tolis',
+        'target': 'programs',
+        'ref': 'toli_id',
+        'fields': {'name': 'toli_name', 'toli_no': 'toli_number'}
+    },
+    'program_student': {
+        'source': 'users',
+        'target': 'programs',
+        'ref': 'student_id',
+        'fields': {'name': 'student_name', 'scholar_no': 'student_scholar_no'}
+    },
+    'message_sender': {
+        'source': 'users',
+        'target': 'messages',
+        'ref': 'sender_id',
+        'fields': {'name': 'sender_name'}
+    },
+}
+
+
+def _id_variants(value):
+    """References are stored as strings or ObjectIds"""
+    value_str = str(value)
+    variants = [value_str]
+    if ObjectId.is_valid(value_str):
+        variants.append(ObjectId(value_str))
+    return variants
+
+
+def _to_object_id(value):
+    value_str = str(value) if value else ''
+    return ObjectId(value_str) if ObjectId.is_valid(value_str) else None
+
+
+def copied_values(name, source_doc):
+    """Values an embedding copies from a source document"""
+    fields = EMBEDDINGS[name]['fields']
+    return {target: source_doc.get(source) for source, target in fields.items()}
+
+
+def embed_references(db, target, document):
+    """
+    Fill the copied fields of a new target document from its scalar references.
+
+    Args:
+        db: pymongo Database
+        target: Target collection name
+        document: Document about to be inserted (updated in place)
+    """
+    for name, spec in EMBEDDINGS.items():
+        if spec['target'] != target or 'ref' not in spec:
+            continue
+        source_id = _to_object_id(document.get(spec['ref']))
+        if source_id is None:
+            continue
+        projection = {field: 1 for field in spec['fields']}
+        source_doc = db[spec['source']].find_one({'_id': source_id}, projection)
+        if source_doc:
+            document.update(copied_values(name, source_doc))
+    return document
+
+
+def propagate(db, source, source_id, changed):
+    """
+    Fan a source update out to every copy of the changed fields.
+
+    Args:
+        db: pymongo Database
+        source: Source collection name
+        source_id: _id of the updated document
+        changed: The $set data that was applied
+
+    Returns:
+        Dictionary of target collection -> number of documents updated
+    """
+    updated = {}
+    source_doc = None
+    for name, spec in EMBEDDINGS.items():
+        if spec['source'] != source:
+            continue
+        fields = {s: t for s, t in spec['fields'].items() if s in changed}
+        if not fields:
+            continue
+
+        if 'ref' in spec:
+            result = db[spec['target']].update_many(
+                {spec['ref']: {'$in': _id_variants(source_id)}},
+                {'$set': {target: changed[source] for source, target in fields.items()}}
+            )
+        else:
+            if source_doc is None:
+                source_doc = db[source].find_one({'_id': ObjectId(str(source_id))}, {spec['key']: 1}) or {}
+            array, key = spec['array'], spec['key']
+            # Match items by embedded user_id, or by key for items not yet backfilled
+            item_filter = [{f'item.{key}': source_doc.get(key)}, {'item.user_id': ObjectId(str(source_id))}]
+            result = db[spec['target']].update_many(
+                {'$or': [
+                    {f'{array}.{key}': source_doc.get(key)},
+                    {f'{array}.user_id': ObjectId(str(source_id))}
+                ]},
+                {'$set': {f'{array}.$[item].{target}': changed[source] for source, target in fields.items()}},
+                array_filters=[{'$or': item_filter}]
+            )
+        updated[spec['target']] = updated.get(spec['target'], 0) + result.modified_count
+    return updated
+
+
+def _expected_stages(name):
+    """
+    Aggregation stages adding `_expected` (the values the copies should hold)
+    to each target document that has a resolvable source.
+    """
+    spec = EMBEDDINGS[name]
+    projection = {field: 1 for field in spec['fields']}
+
+    if 'ref' in spec:
+        return [
+            {'$match': {spec['ref']: {'$nin': [None, '']}}},
+            {'$lookup': {
+                'from': spec['source'],
+                'let': {'ref': {'$convert': {'input': f"${spec['ref']}", 'to': 'objectId',
+                                             'onError': None, 'onNull': None}}},
+                'pipeline': [{'$match': {'$expr': {'$eq': ['$_id', '$$ref']}}}, {'$project': projection}],
+                'as': '_source'
+            }},
+            {'$unwind': '$_source'},
+            {'$addFields': {'_expected': {
+                target: {'$ifNull': [f'$_source.{source}', None]}
+                for source, target in spec['fields'].items()
+            }}}
+        ]
+
+    array, key = spec['array'], spec['key']
+    item_values = {target: f'$$u.{source}' for source, target in spec['fields'].items()}
+    return [
+        {'$match': {f'{array}.0': {'$exists': True}}},
+        {'$lookup': {
+            'from': spec['source'],
+            'localField': f'{array}.{key}',
+            'foreignField': key,
+            'pipeline': [{'$project': projection}],
+            'as': '_source'
+        }},
+        {'$addFields': {'_expected': {'$map': {
+            'input': f'${array}',
+            'as': 'item',
+            'in': {'$let': {
+                'vars': {'u': {'$first': {'$filter': {
+                    'input': '$_source',
+                    'cond': {'$eq': [f'$$this.{key}', f'$$item.{key}']}
+                }}}},
+                'in': {'$cond': [
+                    {'$ifNull': ['$$u', False]},
+                    {'$mergeObjects': ['$$item', item_values]},
+                    '$$item'
+                ]}
+            }}
+        }}}}
+    ]
+
+
+def _drift_condition(name):
+    spec = EMBEDDINGS[name]
+    if 'ref' in spec:
+        return {'$or': [
+            {'$ne': [{'$ifNull': [f'${target}', None]}, f'$_expected.{target}']}
+            for target in spec['fields'].values()
+        ]}
+    return {'$ne': [f"${spec['array']}", '$_expected']}
+
+
+def verify(db, names=None, sample_size=10):
+    """
+    Count target documents whose copies disagree with their source.
+
+    Returns:
+        Dictionary of name -> {'count', 'sample'} (sample holds target _ids)
+    """
+    report = {}
+    for name in names or EMBEDDINGS:
+        spec = EMBEDDINGS[name]
+        pipeline = _expected_stages(name) + [
+            {'$match': {'$expr': _drift_condition(name)}},
+            {'$project': {'_id': 1}}
+        ]
+        drifted = [doc['_id'] for doc in db[spec['target']].aggregate(pipeline, allowDiskUse=True)]
+        report[name] = {'count': len(drifted), 'sample': [str(_id) for _id in drifted[:sample_size]]}
+    return report
+
+
+def repair(db, names=None):
+    """Rewrite drifted copies from their sources with a server-side $merge"""
+    for name in names or EMBEDDINGS:
+        spec = EMBEDDINGS[name]
+        if 'ref' in spec:
+            values = {target: f'$_expected.{target}' for target in spec['fields'].values()}
+        else:
+            values = {spec['array']: '$_expected'}
+        pipeline = _expected_stages(name) + [
+            {'$match': {'$expr': _drift_condition(name)}},
+            {'$project': dict({'_id': 1}, **values)},
+            {'$merge': {'into': spec['target'], 'on': '_id',
+                        'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+        ]
+        list(db[spec['target']].aggregate(pipeline, allowDiskUse=True))
+    return verify(db, names)
@@ -0,0 +1,492 @@
+"""
+Bulk Exports
+Session-end exports of all programs (with toli, student, location and
+participants) and all tolis with their members, as CSV or XLSX.
+
+Rows come from a single aggregation cursor per export: programs are joined
+to their toli and student with $lookup, tolis are unwound into one row per
+member. Rows are written as the cursor yields them, so memory stays flat
+however many documents match:
+
+    CSV   stream_csv() yields encoded chunks for a streamed HTTP response
+    XLSX  write_xlsx() uses XlsxWriter's constant_memory mode, which flushes
+          each row to disk as soon as the next one starts
+
+Large exports run as background jobs (ExportJobs) that record their
+progress in the export_jobs collection and leave the finished file under
+instance/exports until it expires.
+"""
+
+import csv
+import io
+import os
+import re
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.concurrency import start_blocking
+from app.date_utils import to_datetime
+
+JOB_COLLECTION = 'export_jobs'
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+# Rows buffered per streamed CSV chunk
+CSV_CHUNK_ROWS = 500
+
+# Documents per cursor batch
+CURSOR_BATCH_SIZE = 1000
+
+# A running job writes its progress after this many rows
+PROGRESS_EVERY = 1000
+
+# Finished export files are removed after this long
+JOB_TTL_HOURS = 24
+
+EXPORT_ERRORS = {
+    'not_connected': ('Database not connected', 503),
+    'unknown_export': ('Unknown export', 404),
+    'invalid_format': ('Format must be csv or xlsx', 400),
+    'invalid_filter': ('Invalid filter value', 400),
+    'not_found': ('Export job not found', 404),
+    'not_ready': ('Export is not finished yet', 409),
+    'expired': ('Export file has expired', 410)
+}
+
+
+def _to_object_id(field):
+    """Expression converting a string-or-ObjectId reference to an ObjectId"""
+    return {'$convert': {'input': field, 'to': 'objectId', 'onError': None, 'onNull': None}}
+
+
+def _state_pattern(state):
+    return {'$regex': f"^{re.escape(state.strip())}$", '$options': 'i'}
+
+
+def _date_range(filters):
+    """$gte/$lt condition for the date_from/date_to filters (date_to inclusive)"""
+    condition = {}
+    if filters.get('date_from'):
+        condition['$gte'] = filters['date_from']
+    if filters.get('date_to'):
+        condition['$lt'] = filters['date_to'] + timedelta(days=1)
+    return condition
+
+
+def programs_pipeline(filters, rows_only=False):
+    """
+    One row per program, joined to its toli and student.
+
+    With rows_only, just the stages that decide which rows there are (for
+    counting).
+    """
+    match = {}
+    dates = _date_range(filters)
+    if dates:
+        match['date'] = dates
+
+    # Filters on the toli apply after the join
+    toli_match = {}
+    if filters.get('session_year'):
+        toli_match['toli.session_year'] = filters['session_year']
+    if filters.get('state'):
+        toli_match['$or'] = [{'state': _state_pattern(filters['state'])},
+                             {'toli.location.state': _state_pattern(filters['state'])}]
+
+    if rows_only and not toli_match:
+        return [{'$match': match}]
+
+    pipeline = [
+        {'$match': match},
+        {'$sort': {'date': 1, '_id': 1}},
+        {'$lookup': {
+            'from': 'tolis',
+            'let': {'toli_id': _to_object_id('$toli_id')},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', '$$toli_id']}}},
+                {'$project': {'name': 1, 'toli_no': 1, 'session_year': 1, 'location': 1}}
+            ],
+            'as': 'toli'
+        }},
+        {'$unwind': {'path': '$toli', 'preserveNullAndEmptyArrays': True}}
+    ]
+    if toli_match:
+        pipeline.append({'$match': toli_match})
+    if rows_only:
+        return [stage for stage in pipeline if '$sort' not in stage]
+    pipeline += [
+        {'$lookup': {
+            'from': 'users',
+            'let': {'student_id': _to_object_id('$student_id')},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', '$$student_id']}}},
+                {'$project': {'name': 1, 'scholar_no': 1, 'course': 1, 'email': 1}}
+            ],
+            'as': 'student'
+        }},
+        {'$unwind': {'path': '$student', 'preserveNullAndEmptyArrays': True}},
+        {'$project': {
+            'program_no': 1, 'title': 1, 'program_type': 1, 'date': 1, 'location': 1, 'district': 1,
+            'state': {'$ifNull': ['$state', '$toli.location.state']}, 'pincode': 1, 'total_persons': 1,
+            'organizer_name': 1, 'organizer_contact': 1, 'status': 1,
+            'toli_name': {'$ifNull': ['$toli.name', '$toli_name']}, 'toli_no': '$toli.toli_no',
+            'session_year': '$toli.session_year', 'toli_city': '$toli.location.city',
+            'student_name': {'$ifNull': ['$student.name', '$student_name']},
+            'student_scholar_no': {'$ifNull': ['$student.scholar_no', '$student_scholar_no']},
+            'student_course': '$student.course', 'student_email': '$student.email',
+            'image_count': {'$size': {'$ifNull': ['$images', []]}}
+        }}
+    ]
+    return pipeline
+
+
+def tolis_pipeline(filters, rows_only=False):
+    """One row per toli member (tolis without members get one empty row)"""
+    match = {}
+    if filters.get('session_year'):
+        match['session_year'] = filters['session_year']
+    if filters.get('state'):
+        match['location.state'] = _state_pattern(filters['state'])
+    dates = _date_range(filters)
+    if dates:
+        match['created_at'] = dates
+
+    if rows_only:
+        return [{'$match': match}, {'$unwind': {'path': '$members', 'preserveNullAndEmptyArrays': True}}]
+    return [
+        {'$match': match},
+        {'$sort': {'session_year': 1, 'name': 1, '_id': 1}},
+        {'$unwind': {'path': '$members', 'preserveNullAndEmptyArrays': True}},
+        {'$project': {
+            'name': 1, 'toli_no': 1, 'session_year': 1, 'status': 1,
+            'city': '$location.city', 'state': '$location.state',
+            'member_count': {'$ifNull': ['$member_count', 0]},
+            'coordinator_name': 1, 'coordinator_contact': 1,
+            'member_name': '$members.name', 'member_scholar_no': '$members.scholar_no',
+            'member_course': '$members.course', 'member_email': '$members.email',
+            'member_contact': '$members.contact',
+            'is_leader': {'$and': [
+                {'$ne': [{'$ifNull': ['$leader_id', '']}, '']},
+                {'$eq': [{'$toString': '$members.user_id'}, {'$toString': '$leader_id'}]}
+            ]}
+        }}
+    ]
+
+
+# export -> (collection, pipeline builder, [(header, field)])
+EXPORTS = {
+    'programs': ('programs', programs_pipeline, [
+        ('Program No', 'program_no'), ('Title', 'title'), ('Type', 'program_type'), ('Date', 'date'),
+        ('Venue', 'location'), ('District', 'district'), ('State', 'state'), ('Pincode', 'pincode'),
+        ('Participants', 'total_persons'), ('Organizer', 'organizer_name'),
+        ('Organizer Contact', 'organizer_contact'), ('Status', 'status'), ('Toli', 'toli_name'),
+        ('Toli No', 'toli_no'), ('Session Year', 'session_year'), ('Toli City', 'toli_city'),
+        ('Student', 'student_name'), ('Scholar No', 'student_scholar_no'), ('Course', 'student_course'),
+        ('Student Email', 'student_email'), ('Photos', 'image_count')
+    ]),
+    'tolis': ('tolis', tolis_pipeline, [
+        ('Toli', 'name'), ('Toli No', 'toli_no'), ('Session Year', 'session_year'), ('Status', 'status'),
+        ('City', 'city'), ('State', 'state'), ('Members', 'member_count'),
+        ('Coordinator', 'coordinator_name'), ('Coordinator Contact', 'coordinator_contact'),
+        ('Member', 'member_name'), ('Scholar No', 'member_scholar_no'), ('Course', 'member_course'),
+        ('Email', 'member_email'), ('Contact', 'member_contact'), ('Leader', 'is_leader')
+    ])
+}
+
+
+def parse_filters(args):
+    """
+    Export filters from request arguments.
+
+    Returns:
+        Tuple of (filters dictionary, error code or None)
+    """
+    filters = {}
+    for name in ('session_year', 'state'):
+        value = (args.get(name) or '').strip()
+        if value:
+            filters[name] = value
+    for name in ('date_from', 'date_to'):
+        value = (args.get(name) or '').strip()
+        if value:
+            parsed = to_datetime(value)
+            if parsed is None:
+                return None, 'invalid_filter'
+            filters[name] = parsed.replace(hour=0, minute=0, second=0, microsecond=0)
+    return filters, None
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return '' if value is None else value
+
+
+def headers(kind):
+    return [header for header, _ in EXPORTS[kind][2]]
+
+
+def iter_rows(db, kind, filters):
+    """Rows (lists of cell values) of an export, streamed from the cursor"""
+    collection, build_pipeline, columns = EXPORTS[kind]
+    fields = [field for _, field in columns]
+    cursor = db.db[collection].aggregate(build_pipeline(filters), allowDiskUse=True,
+                                         batchSize=CURSOR_BATCH_SIZE)
+    with cursor:
+        for doc in cursor:
+            yield [_cell(doc.get(field)) for field in fields]
+
+
+def count_rows(db, kind, filters):
+    """Number of rows an export will have (for progress)"""
+    collection, build_pipeline, _ = EXPORTS[kind]
+    pipeline = build_pipeline(filters, rows_only=True) + [{'$count': 'rows'}]
+    result = list(db.db[collection].aggregate(pipeline, allowDiskUse=True))
+    return result[0]['rows'] if result else 0
+
+
+def stream_csv(db, kind, filters):
+    """
+    CSV export as a generator of UTF-8 chunks.
+
+    Starts with a byte order mark so Excel detects the encoding.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers(kind))
+    yield '\ufeff'.encode() + buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+
+    rows = 0
+    for row in iter_rows(db, kind, filters):
+        writer.writerow(row)
+        rows += 1
+        if rows % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def write_csv(db, kind, filters, path, progress=None):
+    """
+    Write a CSV export to a file.
+
+    Returns:
+        Number of data rows written
+    """
+    with open(path, 'w', newline='', encoding='utf-8-sig') as out:
+        writer = csv.writer(out)
+        writer.writerow(headers(kind))
+        rows = 0
+        for row in iter_rows(db, kind, filters):
+            writer.writerow(row)
+            rows += 1
+            if progress and rows % PROGRESS_EVERY == 0:
+                progress(rows)
+    return rows
+
+
+def write_xlsx(db, kind, filters, path, progress=None):
+    """
+    Write an XLSX export with XlsxWriter in constant-memory mode.
+
+    Rows must be written in order in this mode, which is how the cursor
+    yields them.
+
+    Returns:
+        Number of data rows written
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_numbers': False,
+                                          'strings_to_formulas': False, 'strings_to_urls': False})
+    try:
+        worksheet = workbook.add_worksheet(kind.title())
+        bold = workbook.add_format({'bold': True})
+        columns = headers(kind)
+        worksheet.write_row(0, 0, columns, bold)
+        worksheet.freeze_panes(1, 0)
+        worksheet.set_column(0, len(columns) - 1, 18)
+
+        rows = 0
+        for row in iter_rows(db, kind, filters):
+            rows += 1
+            worksheet.write_row(rows, 0, row)
+            if progress and rows % PROGRESS_EVERY == 0:
+                progress(rows)
+        return rows
+    finally:
+        workbook.close()
+
+
+def exports_dir(app):
+    """Directory holding finished export files (EXPORT_DIR overrides it)"""
+    return os.getenv('EXPORT_DIR') or os.path.join(app.instance_path, 'exports')
+
+
+class ExportJobs:
+    """Background export jobs with progress stored in MongoDB"""
+
+    def __init__(self, db, root):
+        self.db = db
+        self.root = root
+
+    @property
+    def jobs(self):
+        return self.db.db[JOB_COLLECTION]
+
+    def _path(self, job):
+        return os.path.join(self.root, f"{job['_id']}.{FORMATS[job['format']][1]}")
+
+    def _get(self, job_id):
+        if not ObjectId.is_valid(str(job_id)):
+            return None
+        return self.jobs.find_one({'_id': ObjectId(str(job_id))})
+
+    @staticmethod
+    def _status(job):
+        total = job.get('total') or 0
+        processed = job.get('processed', 0)
+        if job['status'] == 'completed':
+            percent = 100
+        else:
+            percent = min(99, processed * 100 // total) if total else 0
+        return {
+            'job_id': str(job['_id']),
+            'export': job['export'],
+            'format': job['format'],
+            'filters': {key: _cell(value) for key, value in (job.get('filters') or {}).items()},
+            'status': job['status'],
+            'processed': processed,
+            'total': total,
+            'percent': percent,
+            'size': job.get('size'),
+            'error': job.get('error'),
+            'created_at': job['created_at'].isoformat() if job.get('created_at') else None
+        }
+
+    def start(self, kind, fmt, filters, created_by=None):
+        """
+        Queue an export and start it in the background.
+
+        Returns:
+            Tuple of (status dictionary, error code or None)
+        """
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        if kind not in EXPORTS:
+            return None, 'unknown_export'
+        if fmt not in FORMATS:
+            return None, 'invalid_format'
+
+        job = {
+            'export': kind,
+            'format': fmt,
+            'filters': filters,
+            'status': 'queued',
+            'processed': 0,
+            'total': None,
+            'created_by': created_by,
+            'created_at': datetime.utcnow()
+        }
+        job['_id'] = self.jobs.insert_one(job).inserted_id
+        start_blocking(self._run, job, name=f"export-{kind}")
+        return self._status(job), None
+
+    def _progress(self, job_id, processed):
+        self.jobs.update_one({'_id': job_id}, {'$set': {'processed': processed}})
+
+    def _run(self, job):
+        job_id = job['_id']
+        path = self._path(job)
+        tmp_path = path + '.tmp'
+        try:
+            total = count_rows(self.db, job['export'], job['filters'])
+            self.jobs.update_one({'_id': job_id}, {'$set': {'status': 'running', 'total': total,
+                                                            'started_at': datetime.utcnow()}})
+            os.makedirs(self.root, exist_ok=True)
+
+            write = write_xlsx if job['format'] == 'xlsx' else write_csv
+            rows = write(self.db, job['export'], job['filters'], tmp_path,
+                         lambda processed: self._progress(job_id, processed))
+            os.replace(tmp_path, path)
+
+            self.jobs.update_one({'_id': job_id}, {'$set': {
+                'status': 'completed', 'processed': rows, 'total': max(total, rows),
+                'size': os.path.getsize(path), 'completed_at': datetime.utcnow()
+            }})
+        except Exception as e:
+            print(f"❌ Export {job_id} failed: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.jobs.update_one({'_id': job_id}, {'$set': {
+                'status': 'failed', 'error': str(e), 'completed_at': datetime.utcnow()
+            }})
+
+    def status(self, job_id):
+        """Progress of a job"""
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        job = self._get(job_id)
+        if not job:
+            return None, 'not_found'
+        return self._status(job), None
+
+    def recent(self, limit=10):
+        """Latest jobs, newest first"""
+        if not self.db.is_connected():
+            return []
+        return [self._status(job) for job in self.jobs.find().sort('created_at', -1).limit(limit)]
+
+    def file(self, job_id):
+        """
+        Finished export file of a job.
+
+        Returns:
+            Tuple of ((path, download name, mimetype), error code or None)
+        """
+        if not self.db.is_connected():
+            return None, 'not_connected'
+        job = self._get(job_id)
+        if not job:
+            return None, 'not_found'
+        if job['status'] != 'completed':
+            return None, 'not_ready'
+        path = self._path(job)
+        if not os.path.exists(path):
+            return None, 'expired'
+        mimetype, extension = FORMATS[job['format']]
+        name = f"{job['export']}_{job['created_at'].strftime('%Y%m%d_%H%M')}.{extension}"
+        return (path, name, mimetype), None
+
+    def cleanup(self, max_age_hours=JOB_TTL_HOURS):
+        """
+        Delete jobs (and their files) older than `max_age_hours`.
+
+        Returns:
+            Number of jobs removed
+        """
+        if not self.db.is_connected():
+            return 0
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        removed = 0
+        for job in self.jobs.find({'created_at': {'$lt': cutoff}}, {'format': 1}):
+            for path in (self._path(job), self._path(job) + '.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.jobs.delete_one({'_id': job['_id']})
+            removed += 1
+        return removed
@@ -0,0 +1,78 @@
+"""
+HTTP Caching
+Conditional GET support for read-only JSON endpoints.
+
+A response's ETag is derived from the version counters of the collections it
+is built from (bumped by the data layer on every write), so an unchanged
+poll is answered with 304 Not Modified after a single indexed lookup,
+without running the endpoint's queries.
+"""
+
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import request, make_response
+from flask_login import current_user
+
+from app.database import MongoDB
+
+db = MongoDB()
+
+
+def conditional_json(*collections, max_age=0, public=False):
+    """
+    Cache a view's response with ETag/Last-Modified validators.
+
+    Place it below @login_required. The ETag includes the URL and the
+    user's role, so a 304 never stands in for a response the caller could
+    not get.
+
+    Args:
+        collections: Collections the response is built from
+        max_age: Seconds the response may be reused without revalidating
+            (0 means revalidate on every request)
+        public: Allow shared caches to store it (only for data that is the
+            same for every user)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = db.get_collection_versions(collections)
+            if versions is None:
+                return view(*args, **kwargs)
+
+            key = repr((request.full_path, getattr(current_user, 'role', None),
+                        [(name, versions[name][0]) for name in sorted(versions)]))
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            updated = [updated_at for _, updated_at in versions.values() if updated_at]
+            last_modified = max(updated).replace(microsecond=0, tzinfo=timezone.utc) if updated else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and request.if_modified_since >= last_modified)
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            if public:
+                response.cache_control.public = True
+            else:
+                response.cache_control.private = True
+            if max_age:
+                response.cache_control.max_age = max_age
+            else:
+                response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
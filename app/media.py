@@ -0,0 +1,272 @@
+"""
+Media Resizing
+Serves resized copies of static images from a disk cache.
+
+    /media/<path under static/>?w=640&fmt=webp&v=<fingerprint>
+
+Widths and formats come from fixed allow-lists, so a client can only ask
+for a small, bounded set of variants per image. A variant is generated on
+first request (JPEGs are decoded at reduced scale, see app.ml.decode) and
+stored under the source's fingerprint and the parameters; later requests
+are served from disk. The fingerprint is the blob's SHA-256 for blob-store
+paths and a hash of path, size and mtime for other files, so a changed file
+gets new URLs and variants can be cached as immutable.
+
+The cache is bounded: least recently used variants are evicted once it
+grows past MEDIA_CACHE_MAX_BYTES. Generation of a variant holds a file lock,
+so concurrent first requests (across workers) render it once.
+"""
+
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+
+from flask import current_app, send_file, url_for
+
+from app.blob_store import BlobStore
+from app.concurrency import run_blocking
+
+# Widths a client may request, in pixels
+ALLOWED_WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+
+# fmt parameter -> (Pillow format, mimetype, extension, save options)
+ALLOWED_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 80, 'method': 4})
+}
+DEFAULT_FORMAT = 'jpeg'
+
+# Directories under static/ that images may be resized from
+SOURCE_DIRS = ('uploads', 'blobs', 'images')
+
+SOURCE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_BYTES', str(512 * 1024 ** 2)))
+
+# Eviction trims the cache to this fraction of the limit, so it doesn't run on every miss
+EVICT_TARGET = 0.9
+
+# Scan the cache for eviction after this many new variants (per process)
+EVICT_EVERY = 50
+
+# Hits refresh a variant's mtime (its LRU position) at most this often
+TOUCH_INTERVAL = 3600
+
+# Number of lock files generation is striped over
+LOCK_STRIPES = 64
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Served for URLs whose fingerprint no longer matches the file
+STALE_MAX_AGE = 300
+
+# Variants generated by this process since start (drives eviction scans)
+_generated = 0
+
+
+def cache_dir(app):
+    """Directory holding resized variants (MEDIA_CACHE_DIR overrides it)"""
+    return os.getenv('MEDIA_CACHE_DIR') or os.path.join(app.instance_path, 'media_cache')
+
+
+def get_media_cache():
+    """Media cache for the current app"""
+    return MediaCache(os.path.join(current_app.root_path, 'static'), cache_dir(current_app))
+
+
+def resized_url(path, width, fmt=DEFAULT_FORMAT):
+    """
+    URL of a resized static image (template helper).
+
+    Falls back to the original static URL for paths that can't be resized.
+    """
+    if not path:
+        return ''
+    media = get_media_cache()
+    source = media.resolve_source(path)
+    if source is None or width not in ALLOWED_WIDTHS or fmt not in ALLOWED_FORMATS:
+        return url_for('static', filename=path)
+    return url_for('main.media', source=path, w=width, fmt=fmt, v=media.fingerprint(path, source)[:16])
+
+
+class MediaCache:
+    """Resized image variants stored on disk"""
+
+    def __init__(self, static_dir, root):
+        self.static_dir = static_dir
+        self.root = root
+        self.lock_dir = os.path.join(root, 'locks')
+
+    def resolve_source(self, path):
+        """Absolute path of a resizable static image, or None"""
+        path = str(path).replace('\\', '/').lstrip('/')
+        if path.split('/', 1)[0] not in SOURCE_DIRS:
+            return None
+        if path.rsplit('.', 1)[-1].lower() not in SOURCE_EXTENSIONS:
+            return None
+        base_dir = os.path.realpath(self.static_dir)
+        full_path = os.path.realpath(os.path.join(base_dir, os.path.normpath(path)))
+        if os.path.commonpath([base_dir, full_path]) != base_dir or not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    @staticmethod
+    def fingerprint(path, source):
+        """Identity of the source's content (blob digest, or path/size/mtime)"""
+        digest = BlobStore.digest_of(path)
+        if digest:
+            return digest
+        stat = os.stat(source)
+        return hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+    def variant_path(self, fingerprint, width, fmt):
+        extension = ALLOWED_FORMATS[fmt][2]
+        return os.path.join(self.root, fingerprint[:2], f"{fingerprint}_{width}.{extension}")
+
+    def send(self, path, width, fmt, version=None):
+        """
+        Response with a resized variant of a static image.
+
+        Returns:
+            Flask response, or None if the path can't be resized
+        """
+        source = self.resolve_source(path)
+        if source is None:
+            return None
+        fingerprint = self.fingerprint(path, source)
+        # Decoding and encoding are CPU-bound; keep them off the gevent loop
+        etag = f"{fingerprint[:16]}-{width}-{fmt}"
+        variant = run_blocking(self.get, source, fingerprint, width, fmt)
+        try:
+            response = send_file(variant, mimetype=ALLOWED_FORMATS[fmt][1], conditional=True, etag=etag)
+        except FileNotFoundError:
+            # Evicted by another worker in between: render it again
+            variant = run_blocking(self.get, source, fingerprint, width, fmt)
+            response = send_file(variant, mimetype=ALLOWED_FORMATS[fmt][1], conditional=True, etag=etag)
+        if version == fingerprint[:16]:
+            # The URL changes whenever the source does
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={STALE_MAX_AGE}'
+        return response
+
+    def get(self, source, fingerprint, width, fmt):
+        """
+        Path of a variant, generating it on first use.
+
+        Returns:
+            Absolute path of the cached variant
+        """
+        path = self.variant_path(fingerprint, width, fmt)
+        if self._hit(path):
+            return path
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        stripe = zlib.crc32(os.path.basename(path).encode()) % LOCK_STRIPES
+        with open(os.path.join(self.lock_dir, f"{stripe}.lock"), 'w') as lock:
+            # Requests for the same variant wait here, then find it on disk
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self._hit(path):
+                return path
+            self._render(source, path, width, fmt)
+
+        self._maybe_evict()
+        return path
+
+    def _hit(self, path):
+        try:
+            modified = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        now = time.time()
+        if now - modified > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return True
+
+    def _render(self, source, path, width, fmt):
+        from PIL import Image
+        from app.ml import decode
+
+        pil_format, _, _, options = ALLOWED_FORMATS[fmt]
+        with open(source, 'rb') as f:
+            img = decode.load_scaled(f, (width, 1))
+            if img.width > width:
+                height = max(1, round(img.height * width / img.width))
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+            if pil_format == 'JPEG' and img.mode != 'RGB':
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    # Flatten transparency onto white
+                    rgba = img.convert('RGBA')
+                    img = Image.new('RGB', rgba.size, (255, 255, 255))
+                    img.paste(rgba, mask=rgba.getchannel('A'))
+                else:
+                    img = img.convert('RGB')
+            elif img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as tmp:
+            try:
+                img.save(tmp, pil_format, **options)
+            except Exception:
+                os.remove(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+
+    def _maybe_evict(self):
+        global _generated
+        _generated += 1
+        if _generated % EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self, max_bytes=MEDIA_CACHE_MAX_BYTES):
+        """
+        Delete least recently used variants until the cache fits.
+
+        Returns:
+            Dictionary with removed count, bytes freed and bytes kept
+        """
+        entries = []
+        total = 0
+        stale_before = time.time() - TOUCH_INTERVAL
+        for directory, _, files in os.walk(self.root):
+            if directory == self.lock_dir:
+                continue
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith('.tmp'):
+                    # Being written, or left behind by a crashed render
+                    if stat.st_mtime < stale_before:
+                        os.remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        result = {'removed': 0, 'bytes_freed': 0, 'bytes_kept': total}
+        if total <= max_bytes:
+            return result
+        entries.sort()
+        target = max_bytes * EVICT_TARGET
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            result['removed'] += 1
+            result['bytes_freed'] += size
+        result['bytes_kept'] = total
+        return result
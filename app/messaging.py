@@ -0,0 +1,208 @@
+"""
+Message Delivery
+Sends one message to many recipients with a constant number of round trips
+per chunk: recipients are resolved with a single projected query, messages
+are written with insert_many and unread counters are bumped with update_many.
+"""
+
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from app import denormalization
+
+# Supported recipient selectors and what their value means
+SELECTORS = {
+    'toli': 'Toli ID',
+    'users': 'List of user IDs',
+    'course': 'Course name',
+    'session': 'Toli session year',
+    'all': 'All students'
+}
+
+UNREAD_COUNTER = 'unread_messages'
+
+
+def _id_variants(value):
+    value_str = str(value)
+    variants = [value_str]
+    if ObjectId.is_valid(value_str):
+        variants.append(ObjectId(value_str))
+    return variants
+
+
+class MessageDelivery:
+    """Deliver a message to a group of users"""
+
+    def __init__(self, db, chunk_size=1000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def recipient_query(self, selector, value=None):
+        """
+        Build the users query for a recipient selector.
+
+        Raises:
+            ValueError: For unknown selectors or missing values
+        """
+        if selector not in SELECTORS:
+            raise ValueError(f"Unknown recipient selector: {selector}")
+        if selector != 'all' and not value:
+            raise ValueError(f"{SELECTORS[selector]} is required")
+
+        if selector == 'toli':
+            return {'role': 'student', 'toli_id': {'$in': _id_variants(value)}}
+        if selector == 'users':
+            ids = value if isinstance(value, (list, tuple, set)) else [value]
+            return {'_id': {'$in': [ObjectId(str(user_id)) for user_id in ids]}}
+        if selector == 'course':
+            return {'role': 'student', 'course': value}
+        if selector == 'session':
+            toli_ids = [toli['_id'] for toli in self.db.db.tolis.find({'session_year': value}, {'_id': 1})]
+            toli_refs = [str(toli_id) for toli_id in toli_ids] + toli_ids
+            return {'role': 'student', '$or': [
+                {'toli_id': {'$in': toli_refs}},
+                {'session_year': value}
+            ]}
+        return {'role': 'student'}
+
+    def send(self, title, content, sender_id, selector, value=None, extra=None):
+        """
+        Send a message to every recipient matched by the selector.
+
+        Args:
+            title: Message title
+            content: Message body
+            sender_id: Sending user's ID
+            selector: One of SELECTORS
+            value: Selector value (toli ID, list of user IDs, course, session year)
+            extra: Additional fields stored on every message
+
+        Returns:
+            Delivery summary dictionary
+        """
+        started = time.perf_counter()
+        summary = {
+            'selector': selector,
+            'recipients': 0,
+            'delivered': 0,
+            'failed': 0,
+            'chunks': 0,
+            'elapsed_ms': 0.0
+        }
+        if not self.db.is_connected():
+            summary['error'] = 'Database not connected'
+            return summary
+
+        # Everything shared by the copies is computed once
+        template = dict(extra or {}, title=title, content=content, sender_id=sender_id, is_read=False)
+        denormalization.embed_references(self.db.db, 'messages', template)
+
+        cursor = self.db.db.users.find(self.recipient_query(selector, value), {'_id': 1}) \
+            .batch_size(self.chunk_size)
+        chunk = []
+        try:
+            for user in cursor:
+                chunk.append(user['_id'])
+                if len(chunk) >= self.chunk_size:
+                    self._deliver_chunk(template, chunk, summary)
+                    chunk = []
+            if chunk:
+                self._deliver_chunk(template, chunk, summary)
+        finally:
+            cursor.close()
+        if summary['delivered']:
+            self.db.touch_collections('messages', 'users')
+
+        summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return summary
+
+    def _deliver_chunk(self, template, user_ids, summary):
+        now = datetime.utcnow()
+        messages = [
+            dict(template, receiver_id=str(user_id), created_at=now)
+            for user_id in user_ids
+        ]
+        summary['recipients'] += len(user_ids)
+        summary['chunks'] += 1
+        try:
+            inserted = len(self.db.db.messages.insert_many(messages, ordered=False).inserted_ids)
+            delivered_ids = user_ids
+        except Exception as e:
+            # BulkWriteError carries the indexes of the messages that failed
+            details = getattr(e, 'details', None) or {}
+            failed_indexes = {err.get('index') for err in details.get('writeErrors', [])}
+            if not details:
+                failed_indexes = set(range(len(user_ids)))
+            print(f"❌ Error delivering messages: {e}")
+            delivered_ids = [uid for i, uid in enumerate(user_ids) if i not in failed_indexes]
+            inserted = len(delivered_ids)
+
+        summary['delivered'] += inserted
+        summary['failed'] += len(user_ids) - inserted
+        if delivered_ids:
+            # Users without a counter yet are counted from messages until it is initialised
+            self.db.db.users.update_many(
+                {'_id': {'$in': delivered_ids}, UNREAD_COUNTER: {'$exists': True}},
+                {'$inc': {UNREAD_COUNTER: 1}}
+            )
+
+    def initialise_unread_counters(self):
+        """
+        Create the unread counter of users that don't have one yet.
+
+        Increments skip users without a counter, so it is only trusted once
+        this has set it from their unread direct messages. Users that
+        already have a counter are left alone.
+
+        Returns:
+            Number of counters created
+        """
+        if not self.db.is_connected():
+            return 0
+        missing = self.db.db.users.count_documents({UNREAD_COUNTER: {'$exists': False}})
+        if not missing:
+            return 0
+        pipeline = [
+            {'$match': {UNREAD_COUNTER: {'$exists': False}}},
+            {'$project': {'_id': 1}},
+            {'$lookup': {
+                'from': 'messages',
+                'let': {'user_id': {'$toString': '$_id'}},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$receiver_id', '$$user_id']}, 'is_read': False}},
+                    {'$count': 'unread'}
+                ],
+                'as': 'unread'
+            }},
+            {'$project': {UNREAD_COUNTER: {'$ifNull': [{'$first': '$unread.unread'}, 0]}}},
+            {'$merge': {'into': 'users', 'on': '_id',
+                        'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+        ]
+        list(self.db.db.users.aggregate(pipeline, allowDiskUse=True))
+        self.db.touch_collections('users')
+        return missing
+
+    def rebuild_unread_counters(self):
+        """
+        Recompute every user's unread counter from the messages collection.
+
+        Returns:
+            Number of users with unread messages
+        """
+        if not self.db.is_connected():
+            return 0
+        self.db.db.users.update_many({}, {'$set': {UNREAD_COUNTER: 0}})
+        self.db.touch_collections('users')
+        pipeline = [
+            {'$match': {'is_read': False, 'receiver_id': {'$nin': [None, 'all']}}},
+            {'$group': {'_id': {'$convert': {'input': '$receiver_id', 'to': 'objectId',
+                                             'onError': None, 'onNull': None}},
+                        UNREAD_COUNTER: {'$sum': 1}}},
+            {'$match': {'_id': {'$ne': None}}},
+            {'$merge': {'into': 'users', 'on': '_id',
+                        'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+        ]
+        list(self.db.db.messages.aggregate(pipeline, allowDiskUse=True))
+        return self.db.db.users.count_documents({UNREAD_COUNTER: {'$gt': 0}})
@@ -1,70 +1,291 @@
+"""
+Collection copier for moving data between MongoDB deployments
+(local -> Atlas by default).
+
+Collections are streamed with bounded cursors, written in
+``insert_many(ordered=False)`` chunks and copied concurrently. The last
+copied ``_id`` of every collection is checkpointed in the target database,
+so an interrupted run resumes where it stopped instead of starting over, and
+a re-run after a completed copy only picks up documents added since.
+
+Usage:
+    python -m app.migrate_to_atlas                  # resume / copy everything
+    python -m app.migrate_to_atlas --fresh          # forget checkpoints, re-scan everything
+    python -m app.migrate_to_atlas --verify-only    # only compare counts/checksums
+"""
+
+import argparse
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import bson
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def migrate_data():
+# Collections to migrate
+COLLECTIONS = ['users', 'tolis', 'programs', 'resources', 'messages', 'newsletters', 'reports']
+
+CHECKPOINT_COLLECTION = 'migration_checkpoints'
+DUPLICATE_KEY_ERROR = 11000
+
+
+class CollectionCopier:
+    """Copy collections from a source database into a target database"""
+
+    def __init__(self, source_db, target_db, batch_size=1000, workers=4, log=print):
+        self.source_db = source_db
+        self.target_db = target_db
+        self.batch_size = batch_size
+        self.workers = workers
+        self.log = log
+        self._log_lock = threading.Lock()
+
+    def _print(self, message):
+        with self._log_lock:
+            self.log(message)
+
+    # ---------- checkpoints ----------
+
+    def get_checkpoint(self, collection_name):
+        """Return the stored checkpoint document for a collection (or None)"""
+        return self.target_db[CHECKPOINT_COLLECTION].find_one({'_id': collection_name})
+
+    def save_checkpoint(self, collection_name, last_id, copied, completed=False):
+        self.target_db[CHECKPOINT_COLLECTION].update_one(
+            {'_id': collection_name},
+            {'$set': {
+                'last_id': last_id,
+                'copied': copied,
+                'completed': completed,
+                'updated_at': datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    def clear_checkpoint(self, collection_name):
+        self.target_db[CHECKPOINT_COLLECTION].delete_one({'_id': collection_name})
+
+    # ---------- copying ----------
+
+    def _insert_chunk(self, target, chunk):
+        """Insert a chunk, tolerating documents that already exist in the target"""
+        try:
+            return len(target.insert_many(chunk, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            details = e.details or {}
+            errors = details.get('writeErrors', [])
+            fatal = [err for err in errors if err.get('code') != DUPLICATE_KEY_ERROR]
+            if fatal or details.get('writeConcernErrors'):
+                raise
+            # Already copied by a previous (interrupted) run
+            return details.get('nInserted', 0)
+
+    def copy_collection(self, collection_name, fresh=False):
+        """
+        Stream one collection into the target.
+
+        Returns:
+            Dictionary with copied count, bytes and elapsed seconds
+        """
+        source = self.source_db[collection_name]
+        target = self.target_db[collection_name]
+
+        if fresh:
+            # Documents already in the target are kept; re-inserting them is a no-op
+            self.clear_checkpoint(collection_name)
+
+        checkpoint = self.get_checkpoint(collection_name) or {}
+        last_id = checkpoint.get('last_id')
+        copied = checkpoint.get('copied', 0)
+        if last_id is not None:
+            state = "copying new documents" if checkpoint.get('completed') else "resuming"
+            self._print(f"🔄 {collection_name}: {state} after _id {last_id} ({copied} already copied)")
+
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        cursor = source.find(query).sort('_id', 1).batch_size(self.batch_size)
+
+        started = time.perf_counter()
+        run_copied = 0
+        run_bytes = 0
+        chunk = []
+        chunk_bytes = 0
+
+        try:
+            for document in cursor:
+                chunk.append(document)
+                chunk_bytes += len(bson.encode(document))
+                if len(chunk) >= self.batch_size:
+                    run_copied += self._insert_chunk(target, chunk)
+                    run_bytes += chunk_bytes
+                    self.save_checkpoint(collection_name, chunk[-1]['_id'], copied + run_copied)
+                    chunk = []
+                    chunk_bytes = 0
+
+            if chunk:
+                run_copied += self._insert_chunk(target, chunk)
+                run_bytes += chunk_bytes
+                last_id = chunk[-1]['_id']
+            else:
+                last_id = (self.get_checkpoint(collection_name) or {}).get('last_id', last_id)
+
+            self.save_checkpoint(collection_name, last_id, copied + run_copied, completed=True)
+        finally:
+            cursor.close()
+
+        elapsed = time.perf_counter() - started
+        rate = run_copied / elapsed if elapsed > 0 else 0
+        mb_rate = (run_bytes / (1024 * 1024)) / elapsed if elapsed > 0 else 0
+        self._print(f"✅ {collection_name}: copied {run_copied} documents in {elapsed:.2f}s "
+                    f"({rate:.0f} docs/s, {mb_rate:.2f} MB/s)")
+
+        return {'collection': collection_name, 'copied': run_copied, 'bytes': run_bytes,
+                'elapsed': elapsed}
+
+    def copy_all(self, collections=None, fresh=False):
+        """Copy collections concurrently on a bounded thread pool"""
+        collections = collections or COLLECTIONS
+        results = {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(collections)))) as pool:
+            futures = {
+                pool.submit(self.copy_collection, name, fresh): name
+                for name in collections
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    self._print(f"❌ Error migrating {name}: {e} (re-run to resume)")
+                    results[name] = {'collection': name, 'error': str(e)}
+
+        elapsed = time.perf_counter() - started
+        total_docs = sum(r.get('copied', 0) for r in results.values())
+        total_bytes = sum(r.get('bytes', 0) for r in results.values())
+        rate = total_docs / elapsed if elapsed > 0 else 0
+        self._print(f"\n🎉 Copied {total_docs} documents "
+                    f"({total_bytes / (1024 * 1024):.2f} MB) in {elapsed:.2f}s - {rate:.0f} docs/s")
+        return results
+
+    # ---------- verification ----------
+
+    def collection_checksum(self, db, collection_name):
+        """
+        Order-independent checksum of a collection.
+
+        Every document is BSON encoded and hashed; the digests are summed
+        modulo 2**64 so the result does not depend on cursor order.
+        """
+        total = 0
+        count = 0
+        cursor = db[collection_name].find({}).batch_size(self.batch_size)
+        try:
+            for document in cursor:
+                digest = hashlib.sha1(bson.encode(document)).digest()
+                total = (total + int.from_bytes(digest[:8], 'big')) % (1 << 64)
+                count += 1
+        finally:
+            cursor.close()
+        return count, f"{total:016x}"
+
+    def verify(self, collections=None):
+        """Compare document counts and checksums between source and target"""
+        collections = collections or COLLECTIONS
+        report = {}
+        self._print("\n🔍 Verifying migration...")
+
+        for name in collections:
+            source_count, source_sum = self.collection_checksum(self.source_db, name)
+            target_count, target_sum = self.collection_checksum(self.target_db, name)
+            matches = source_count == target_count and source_sum == target_sum
+            report[name] = {
+                'source_count': source_count,
+                'target_count': target_count,
+                'source_checksum': source_sum,
+                'target_checksum': target_sum,
+                'match': matches
+            }
+            status = "✅" if matches else "❌"
+            self._print(f"   {status} {name}: Local={source_count}, Atlas={target_count}, "
+                        f"checksum {source_sum} / {target_sum}")
+
+        return report
+
+
+def migrate_data(source_uri=None, target_uri=None, database_name=None, collections=None,
+                 batch_size=1000, workers=4, fresh=False, verify_only=False):
     print("🚀 Starting data migration to MongoDB Atlas...")
-    
+
+    source_uri = source_uri or os.getenv('SOURCE_MONGODB_URI', 'mongodb://localhost:27017/')
+    target_uri = target_uri or os.getenv('MONGODB_URI')
+    database_name = database_name or os.getenv('DATABASE_NAME', 'disha_db')
+
+    if not target_uri:
+        print("❌ MONGODB_URI environment variable is not set")
+        return None
+
     # Connect to local MongoDB
     try:
-        local_client = MongoClient('mongodb://localhost:27017/')
-        local_db = local_client['disha_db']
+        local_client = MongoClient(source_uri)
+        local_client.admin.command('ping')
+        local_db = local_client[database_name]
         print("✅ Connected to local MongoDB")
     except Exception as e:
         print(f"❌ Failed to connect to local MongoDB: {e}")
-        return
+        return None
 
     # Connect to MongoDB Atlas
     try:
-        atlas_uri = os.getenv('MONGODB_URI')
-        atlas_client = MongoClient(atlas_uri)
-        atlas_db = atlas_client['disha_db']
+        atlas_client = MongoClient(target_uri)
+        atlas_client.admin.command('ping')
+        atlas_db = atlas_client[database_name]
         print("✅ Connected to MongoDB Atlas")
     except Exception as e:
         print(f"❌ Failed to connect to MongoDB Atlas: {e}")
-        return
-
-    # Collections to migrate
-    collections = ['users', 'tolis', 'programs', 'resources', 'messages', 'newsletters', 'reports']
-    
-    migrated_count = 0
-    
-    for collection_name in collections:
-        try:
-            print(f"\n📦 Migrating {collection_name}...")
-            
-            # Get data from local
-            local_data = list(local_db[collection_name].find())
-            
-            if local_data:
-                # Clear existing data in Atlas (optional - remove if you want to keep existing data)
-                atlas_db[collection_name].delete_many({})
-                
-                # Insert data to Atlas
-                result = atlas_db[collection_name].insert_many(local_data)
-                print(f"✅ Migrated {len(result.inserted_ids)} documents from {collection_name}")
-                migrated_count += len(result.inserted_ids)
-            else:
-                print(f"ℹ️ No data found in {collection_name}")
-                
-        except Exception as e:
-            print(f"❌ Error migrating {collection_name}: {e}")
-    
-    print(f"\n🎉 Migration completed! Total documents migrated: {migrated_count}")
-    
-    # Verify migration
-    print("\n🔍 Verifying migration...")
-    for collection_name in collections:
-        local_count = local_db[collection_name].count_documents({})
-        atlas_count = atlas_db[collection_name].count_documents({})
-        print(f"   {collection_name}: Local={local_count}, Atlas={atlas_count}")
-    
-    # Close connections
-    local_client.close()
-    atlas_client.close()
+        local_client.close()
+        return None
+
+    copier = CollectionCopier(local_db, atlas_db, batch_size=batch_size, workers=workers)
+    try:
+        if not verify_only:
+            copier.copy_all(collections, fresh=fresh)
+        report = copier.verify(collections)
+    finally:
+        # Close connections
+        local_client.close()
+        atlas_client.close()
+
     print("\n✅ Migration verification complete!")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy DISHA collections between MongoDB deployments')
+    parser.add_argument('--source', help='Source MongoDB URI (default: SOURCE_MONGODB_URI or localhost)')
+    parser.add_argument('--target', help='Target MongoDB URI (default: MONGODB_URI)')
+    parser.add_argument('--database', help='Database name (default: DATABASE_NAME or disha_db)')
+    parser.add_argument('--collections', nargs='+', help='Collections to copy')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--fresh', action='store_true',
+                        help='Ignore checkpoints and re-scan every source document (target data is kept)')
+    parser.add_argument('--verify-only', action='store_true')
+    args = parser.parse_args()
+
+    report = migrate_data(args.source, args.target, args.database, args.collections,
+                          batch_size=args.batch_size, workers=args.workers,
+                          fresh=args.fresh, verify_only=args.verify_only)
+    if not report or not all(item['match'] for item in report.values()):
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
-    migrate_data()
\ No newline at end of file
+    main()
@@ -5,5 +5,6 @@ Provides AI-powered features for image processing and analysis
 
 from .image_processor import ImageProcessor
 from .gallery_manager import GalleryManager
+from .perceptual_hash import BKTree, MultiIndexHash, image_hashes
 
-__all__ = ['ImageProcessor', 'GalleryManager']
+__all__ = ['ImageProcessor', 'GalleryManager', 'BKTree', 'MultiIndexHash', 'image_hashes']
@@ -0,0 +1,143 @@
+"""
+Image Decode Module
+Decodes images at the smallest scale a task needs.
+
+JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding (Pillow's
+draft()), which skips most of the work and memory of a full decode. Other
+formats are decoded fully and then shrunk with reduce(), a fast integer box
+filter. The final resample to the exact size only touches the reduced image.
+
+EXIF orientation is applied once, on the small image, so callers get
+upright pixels without rotating a full-size copy. JPEG originals are stored
+without decoding at all: copy_jpeg_without_metadata() copies the compressed
+data and drops the EXIF/XMP/IPTC segments (camera details, GPS location),
+keeping only the orientation so viewers still display the photo upright.
+
+    preview = load_scaled(image_file, (512, 512))   # >= 512x512, upright
+    thumb = thumbnail(path, (300, 300))
+"""
+
+import shutil
+import struct
+
+from PIL import Image, ImageOps
+
+ORIENTATION_TAG = 0x0112
+
+# Orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Reduce-on-load keeps this much headroom over the target before the final
+# resample, so LANCZOS still has real pixels to work with
+REDUCING_GAP = 2
+
+# Modes reduce() can't handle (palette and bilevel images)
+NO_REDUCE_MODES = ('1', 'P')
+
+# JPEG markers: APP1 (EXIF, XMP) and APP13 (IPTC) carry metadata worth dropping
+JPEG_SOI = b'\xff\xd8'
+JPEG_SOS = 0xDA
+JPEG_STRIPPED_MARKERS = (0xE1, 0xED)
+JPEG_STANDALONE_MARKERS = (0x01,) + tuple(range(0xD0, 0xD8))
+
+
+def orientation(img):
+    """EXIF orientation of an opened image (1 when absent)"""
+    try:
+        return img.getexif().get(ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+
+def load_scaled(source, size, mode=None):
+    """
+    Decode an image no smaller than `size` (as displayed), upright.
+
+    Args:
+        source: Path, binary file object or an opened (not yet loaded) image
+        size: (width, height) box the caller will shrink the result to
+        mode: Optional mode to decode to ('L' decodes JPEG luma only)
+
+    Returns:
+        Loaded PIL image at least `size` in each dimension (unless the
+        original is smaller), with EXIF orientation applied
+    """
+    img = source if isinstance(source, Image.Image) else Image.open(source)
+    width, height = size
+    if orientation(img) in TRANSPOSED_ORIENTATIONS:
+        # The box applies to the displayed image; the decoder sees it sideways
+        width, height = height, width
+
+    if img.format == 'JPEG':
+        img.draft(mode, (width * REDUCING_GAP, height * REDUCING_GAP))
+    img.load()
+
+    factor = min(img.width // (width * REDUCING_GAP), img.height // (height * REDUCING_GAP))
+    if factor > 1 and img.mode not in NO_REDUCE_MODES:
+        img = img.reduce(factor)
+    if mode and img.mode != mode:
+        img = img.convert(mode)
+
+    ImageOps.exif_transpose(img, in_place=True)
+    return img
+
+
+def thumbnail(source, size, resample=Image.Resampling.LANCZOS):
+    """Decode and shrink an image to fit `size`, keeping its aspect ratio"""
+    img = load_scaled(source, size)
+    img.thumbnail(size, resample)
+    return img
+
+
+def _orientation_segment(value):
+    """APP1 segment holding an EXIF block with only the orientation tag"""
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = value
+    payload = b'Exif\x00\x00' + exif.tobytes()
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def copy_jpeg_without_metadata(source, destination, orientation=1):
+    """
+    Copy a JPEG's compressed data without its metadata segments.
+
+    Lossless and decode-free.
+
+    Args:
+        source: Binary file object positioned at the start of the JPEG
+        destination: Output path
+        orientation: EXIF orientation to keep (written as the only EXIF tag)
+    """
+    with open(destination, 'wb') as out:
+        if source.read(2) != JPEG_SOI:
+            raise ValueError('Not a JPEG file')
+        out.write(JPEG_SOI)
+        if orientation != 1:
+            out.write(_orientation_segment(orientation))
+        while True:
+            byte = source.read(1)
+            if not byte:
+                break
+            if byte != b'\xff':
+                raise ValueError('Corrupt JPEG marker')
+            marker = source.read(1)
+            while marker == b'\xff':  # fill bytes
+                marker = source.read(1)
+            if not marker:
+                raise ValueError('Truncated JPEG')
+            code = marker[0]
+            if code in JPEG_STANDALONE_MARKERS:
+                out.write(b'\xff' + marker)
+                continue
+            header = source.read(2)
+            if len(header) != 2:
+                raise ValueError('Truncated JPEG')
+            length = struct.unpack('>H', header)[0]
+            if code == JPEG_SOS:
+                # Scan data (and anything after it) is copied as is
+                out.write(b'\xff' + marker + header)
+                shutil.copyfileobj(source, out)
+                break
+            payload = source.read(length - 2)
+            if code not in JPEG_STRIPPED_MARKERS:
+                out.write(b'\xff' + marker + header + payload)
@@ -3,8 +3,19 @@ Gallery Manager Module
 Manages gallery images, auto-upload, and categorization
 """
 
+import os
+import threading
 from datetime import datetime
+from app.concurrency import run_blocking
 from .image_processor import ImageProcessor
+from .perceptual_hash import DEFAULT_MAX_DISTANCE, MultiIndexHash, to_unsigned
+
+# What auto-upload does with a near-duplicate of an existing gallery image
+DUPLICATE_POLICIES = ('flag', 'skip', 'allow')
+
+# pHash index of the gallery, rebuilt when the gallery collection version changes
+_duplicate_index = {'version': None, 'index': None}
+_duplicate_index_lock = threading.Lock()
 
 
 class GalleryManager:
@@ -14,7 +25,8 @@ class GalleryManager:
         self.db = db
         self.image_processor = ImageProcessor()
     
-    def auto_upload_program_images(self, program_id, image_files, program_data):
+    def auto_upload_program_images(self, program_id, image_files, program_data,
+                                   duplicate_policy='flag', max_distance=DEFAULT_MAX_DISTANCE):
         """
         Automatically upload program images to gallery
         
@@ -22,29 +34,48 @@ class GalleryManager:
             program_id: Program ID
             image_files: List of image files
             program_data: Program information
+            duplicate_policy: For near-duplicates of gallery images: 'flag'
+                (save with duplicate_of), 'skip' (don't save) or 'allow'
+            max_distance: pHash bits two images may differ by and still be duplicates
         
         Returns:
             List of gallery image records
         """
         try:
             gallery_images = []
+            index = self.duplicate_index() if duplicate_policy != 'allow' else None
             
             for image_file in image_files:
-                # Process image
-                image_info = self.image_processor.process_image(image_file, program_data)
+                # Process image (off the event loop under gevent workers)
+                image_info = run_blocking(self.image_processor.process_image, image_file, program_data)
                 
                 if not image_info:
                     continue
                 
                 # Only add high-quality images to gallery
                 if image_info['quality_score'] >= 60:
+                    match = None
+                    if index is not None and 'phash' in image_info:
+                        with _duplicate_index_lock:
+                            matches = self.image_processor.detect_duplicates(
+                                image_info['phash'], index, max_distance)
+                        match = matches[0] if matches else None
+                    
+                    if match and duplicate_policy == 'skip':
+                        self._remove_files(image_info)
+                        continue
+                    
                     gallery_record = {
                         'program_id': program_id,
                         'image_path': image_info['path'],
                         'thumbnail_path': image_info['thumbnail'],
                         'category': image_info['category'],
                         'quality_score': image_info['quality_score'],
+                        'quality': image_info.get('quality'),
                         'hash': image_info['hash'],
+                        'ahash': image_info.get('ahash'),
+                        'dhash': image_info.get('dhash'),
+                        'phash': image_info.get('phash'),
                         'program_type': program_data.get('program_type'),
                         'program_title': program_data.get('title'),
                         'location': program_data.get('city', 'Unknown'),
@@ -55,11 +86,22 @@ class GalleryManager:
                         'views': 0,
                         'tags': self._generate_tags(program_data)
                     }
+                    if match:
+                        gallery_record['duplicate_of'] = match[1]
+                        gallery_record['duplicate_distance'] = match[0]
                     
                     # Save to database
                     gallery_id = self.db.db.gallery.insert_one(gallery_record).inserted_id
                     gallery_record['_id'] = gallery_id
                     gallery_images.append(gallery_record)
+                    
+                    # Later images in the same batch are checked against this one too
+                    if index is not None and gallery_record['phash'] is not None:
+                        with _duplicate_index_lock:
+                            index.add(to_unsigned(gallery_record['phash']), gallery_id)
+            
+            if gallery_images:
+                self._gallery_changed(index)
             
             return gallery_images
             
@@ -67,6 +109,56 @@ class GalleryManager:
             print(f"Error auto-uploading images: {e}")
             return []
     
+    def duplicate_index(self):
+        """
+        Multi-index of the gallery's perceptual hashes (pHash -> image _id)
+        
+        Cached per process and rebuilt only when the gallery has changed.
+        """
+        versions = self.db.get_collection_versions(['gallery'])
+        version = versions['gallery'][0] if versions else None
+        
+        with _duplicate_index_lock:
+            if (_duplicate_index['index'] is not None and version is not None
+                    and _duplicate_index['version'] == version):
+                return _duplicate_index['index']
+            
+            index = MultiIndexHash()
+            try:
+                for image in self.db.db.gallery.find({'phash': {'$type': 'number'}}, {'phash': 1}):
+                    index.add(to_unsigned(image['phash']), image['_id'])
+            except Exception as e:
+                print(f"Error building duplicate index: {e}")
+                return index
+            
+            _duplicate_index.update(version=version, index=index)
+            return index
+    
+    def _gallery_changed(self, index=None):
+        """Bump the gallery version; keep the cached index if it already holds the change"""
+        with _duplicate_index_lock:
+            previous = _duplicate_index['version']
+            self.db.touch_collections('gallery')
+            versions = self.db.get_collection_versions(['gallery'])
+            if not versions:
+                return
+            version = versions['gallery'][0]
+            if index is not None and index is _duplicate_index['index'] and previous is not None \
+                    and version == previous + 1:
+                # Nobody else wrote in between: the in-memory index is current
+                _duplicate_index['version'] = version
+            else:
+                _duplicate_index['index'] = None
+    
+    def _remove_files(self, image_info):
+        """Delete the files process_image saved for an image that is not kept"""
+        for path in (image_info.get('path'), image_info.get('thumbnail')):
+            if path:
+                try:
+                    os.remove(os.path.join(self.image_processor.upload_path, os.path.relpath(path, 'uploads')))
+                except OSError:
+                    pass
+    
     def get_gallery_images(self, filters=None, limit=50, skip=0):
         """
         Get gallery images with optional filters
@@ -244,6 +336,7 @@ class GalleryManager:
                 
                 # Delete from database
                 self.db.db.gallery.delete_one({'_id': ObjectId(image_id)})
+                self._gallery_changed()
                 return True
             
             return False
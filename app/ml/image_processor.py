@@ -4,16 +4,20 @@ Handles image processing, categorization, and quality assessment
 """
 
 import os
-from PIL import Image
+from PIL import Image, ImageOps
 import hashlib
 from datetime import datetime
 
+from . import decode, quality
+from .perceptual_hash import hamming, image_hashes, to_signed, to_unsigned
+
 
 class ImageProcessor:
     """Process and analyze images"""
     
-    def __init__(self, upload_path='static/uploads'):
+    def __init__(self, upload_path='static/uploads', thumbnail_size=(300, 300)):
         self.upload_path = upload_path
+        self.thumbnail_size = thumbnail_size
         self.gallery_path = os.path.join(upload_path, 'gallery')
         self.thumbnail_path = os.path.join(upload_path, 'thumbnails')
         
@@ -44,7 +48,7 @@ class ImageProcessor:
             Dictionary with processed image information
         """
         try:
-            # Open image
+            # Open image (reads the header only)
             img = Image.open(image_file)
             
             # Get image info
@@ -53,10 +57,21 @@ class ImageProcessor:
                 'format': img.format,
                 'mode': img.mode
             }
+            orientation = decode.orientation(img)
+            
+            # Everything except the stored original works on one reduced,
+            # upright decode (JPEGs are decoded at 1/2 to 1/8 scale)
+            preview = decode.load_scaled(img, self.thumbnail_size)
             
             # Quality assessment
-            quality_score = self._assess_quality(img)
-            image_info['quality_score'] = quality_score
+            quality_report = self._assess_quality(preview, image_info['original_size'])
+            image_info['quality_score'] = quality_report.pop('score')
+            image_info['quality'] = quality_report
+            
+            # Perceptual hashes (signed int64 for MongoDB) catch re-encoded
+            # and resized copies that the file hash misses
+            for name, value in image_hashes(preview).items():
+                image_info[name] = to_signed(value)
             
             # Auto-categorize if program data provided
             if program_data:
@@ -68,13 +83,13 @@ class ImageProcessor:
             
             # Save original
             original_path = os.path.join(self.gallery_path, filename)
-            img.save(original_path, quality=95)
+            self._save_original(image_file, img, orientation, original_path)
             image_info['path'] = f'uploads/gallery/{filename}'
             
-            # Create thumbnail
+            # Create thumbnail (shrinks the preview in place)
             thumbnail_filename = f'thumb_{filename}'
             thumbnail_path = os.path.join(self.thumbnail_path, thumbnail_filename)
-            self._create_thumbnail(img, thumbnail_path)
+            self._create_thumbnail(preview, thumbnail_path)
             image_info['thumbnail'] = f'uploads/thumbnails/{thumbnail_filename}'
             
             # Calculate file hash for duplicate detection
@@ -88,53 +103,18 @@ class ImageProcessor:
             print(f"Error processing image: {e}")
             return None
     
-    def _assess_quality(self, img):
+    def _assess_quality(self, img, original_size=None):
         """
         Assess image quality (0-100)
-        Based on resolution, sharpness, and other factors
+        Based on sharpness, exposure, contrast, noise and resolution
+        
+        Returns:
+            Dictionary of measurements with the overall 'score'
         """
-        try:
-            width, height = img.size
-            pixels = width * height
-            
-            # Resolution score (max 50 points)
-            if pixels >= 1920 * 1080:  # Full HD or better
-                resolution_score = 50
-            elif pixels >= 1280 * 720:  # HD
-                resolution_score = 40
-            elif pixels >= 640 * 480:  # VGA
-                resolution_score = 30
-            else:
-                resolution_score = 20
-            
-            # Aspect ratio score (max 20 points)
-            aspect_ratio = width / height if height > 0 else 0
-            if 1.3 <= aspect_ratio <= 1.8:  # Good aspect ratio
-                aspect_score = 20
-            else:
-                aspect_score = 10
-            
-            # Format score (max 15 points)
-            if img.format in ['JPEG', 'PNG']:
-                format_score = 15
-            else:
-                format_score = 10
-            
-            # Mode score (max 15 points)
-            if img.mode == 'RGB':
-                mode_score = 15
-            elif img.mode == 'RGBA':
-                mode_score = 12
-            else:
-                mode_score = 8
-            
-            total_score = resolution_score + aspect_score + format_score + mode_score
-            
-            return min(total_score, 100)
-            
-        except Exception as e:
-            print(f"Error assessing quality: {e}")
-            return 50  # Default score
+        report = quality.assess_image(img, original_size)
+        if report is None:
+            return {'score': 50}  # Default score
+        return report
     
     def _categorize_image(self, program_data):
         """
@@ -166,17 +146,36 @@ class ImageProcessor:
             print(f"Error categorizing image: {e}")
             return 'General'
     
-    def _create_thumbnail(self, img, output_path, size=(300, 300)):
-        """Create thumbnail of image"""
+    def _save_original(self, image_file, img, orientation, output_path):
+        """
+        Store the uploaded image without camera metadata
+        
+        JPEGs are copied without decoding (keeping only their orientation).
+        Other formats were fully decoded for the preview already; `img` is
+        rotated upright and re-encoded.
+        """
+        if img.format == 'JPEG':
+            image_file.seek(0)
+            try:
+                decode.copy_jpeg_without_metadata(image_file, output_path, orientation)
+                return
+            except ValueError as e:
+                print(f"Could not copy JPEG, re-encoding: {e}")
+            # `img` was decoded at reduced scale; decode the full image
+            image_file.seek(0)
+            img = Image.open(image_file)
+        
+        ImageOps.exif_transpose(img, in_place=True)
+        img.save(output_path, quality=95)
+    
+    def _create_thumbnail(self, img, output_path, size=None):
+        """Create thumbnail of image (shrinks `img` in place, no copy)"""
         try:
-            # Create a copy
-            thumb = img.copy()
-            
             # Resize maintaining aspect ratio
-            thumb.thumbnail(size, Image.Resampling.LANCZOS)
+            img.thumbnail(size or self.thumbnail_size, Image.Resampling.LANCZOS)
             
             # Save thumbnail
-            thumb.save(output_path, quality=85)
+            img.save(output_path, quality=85)
             
         except Exception as e:
             print(f"Error creating thumbnail: {e}")
@@ -188,9 +187,32 @@ class ImageProcessor:
         unique_id = hashlib.md5(f"{original_filename}{timestamp}".encode()).hexdigest()[:8]
         return f"{timestamp}_{unique_id}{ext}"
     
-    def detect_duplicates(self, image_hash, existing_hashes):
-        """Check if image is duplicate"""
-        return image_hash in existing_hashes
+    def detect_duplicates(self, image_hash, existing_hashes, max_distance=0):
+        """
+        Find duplicates of an image
+        
+        Args:
+            image_hash: File hash (str) or perceptual hash (int, as stored)
+            existing_hashes: Index of perceptual hashes (MultiIndexHash/BKTree), or a collection of hashes
+            max_distance: Differing bits still counted as the same image
+        
+        Returns:
+            List of (distance, match), closest first (empty if none)
+        """
+        if isinstance(image_hash, str):
+            return [(0, image_hash)] if image_hash in existing_hashes else []
+        
+        image_hash = to_unsigned(image_hash)
+        if hasattr(existing_hashes, 'search'):
+            return existing_hashes.search(image_hash, max_distance)
+        
+        matches = []
+        for existing in existing_hashes:
+            distance = hamming(image_hash, to_unsigned(existing))
+            if distance <= max_distance:
+                matches.append((distance, existing))
+        matches.sort(key=lambda match: match[0])
+        return matches
     
     def enhance_image(self, image_path):
         """
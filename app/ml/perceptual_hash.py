@@ -0,0 +1,250 @@
+"""
+Perceptual Hash Module
+64-bit image fingerprints for near-duplicate detection.
+
+Unlike a hash of the file bytes, a perceptual hash survives re-encoding,
+resizing and small edits: two copies of the same photo differ in only a few
+bits. Hashes are compared by Hamming distance and searched with a
+multi-index hash table (or a BK-tree), which only looks at hashes that can
+be within the search radius instead of scanning them all.
+
+    hashes = image_hashes(img)                 # {'ahash': ..., 'dhash': ..., 'phash': ...}
+    index = MultiIndexHash()
+    index.add(hashes['phash'], image_id)
+    index.search(other_phash, max_distance=6)  # [(distance, image_id), ...]
+
+MongoDB stores signed 64-bit integers, so hashes are saved with to_signed()
+and read back with to_unsigned().
+"""
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+
+# pHash runs the DCT on a HASH_SIZE * PHASH_FACTOR square
+PHASH_FACTOR = 4
+
+# Distances up to this are treated as the same photo (for pHash)
+DEFAULT_MAX_DISTANCE = 6
+
+# MultiIndexHash splits hashes into this many 16-bit chunks
+INDEX_CHUNKS = 4
+
+_dct_matrices = {}
+
+
+def _grayscale(img, width, height):
+    """Image downscaled to width x height grayscale, as a float array"""
+    if img.mode in ('1', 'P'):
+        # reduce() doesn't support palette images
+        img = img.convert('L')
+    # Cheap integer downscale first so the final resample touches few pixels
+    factor = min(img.width // (width * 4), img.height // (height * 4))
+    if factor > 1:
+        img = img.reduce(factor)
+    small = img.convert('L').resize((width, height), Image.Resampling.BOX)
+    return np.asarray(small, dtype=np.float64)
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix (cached per size)"""
+    matrix = _dct_matrices.get(n)
+    if matrix is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrices[n] = matrix
+    return matrix
+
+
+def ahash(img, hash_size=HASH_SIZE):
+    """Average hash: pixels brighter than the mean"""
+    pixels = _grayscale(img, hash_size, hash_size)
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def dhash(img, hash_size=HASH_SIZE):
+    """Difference hash: horizontal brightness gradients"""
+    pixels = _grayscale(img, hash_size + 1, hash_size)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(img, hash_size=HASH_SIZE):
+    """DCT hash: low-frequency coefficients above their median"""
+    size = hash_size * PHASH_FACTOR
+    pixels = _grayscale(img, size, size)
+    dct = _dct_matrix(size)
+    low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    # The DC term only carries overall brightness; keep it out of the median
+    return _bits_to_int(low > np.median(low.flatten()[1:]))
+
+
+def image_hashes(img):
+    """All three hashes of an image (unsigned 64-bit ints)"""
+    return {
+        'ahash': ahash(img),
+        'dhash': dhash(img),
+        'phash': phash(img)
+    }
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> signed int64 (what MongoDB can store)"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    """Stored signed int64 -> unsigned 64-bit hash"""
+    return value & 0xFFFFFFFFFFFFFFFF
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance.
+
+    Each child edge is labelled with its distance to the parent, so a
+    search for radius r only descends edges within r of the query's
+    distance to the node (triangle inequality).
+    """
+
+    def __init__(self, items=None):
+        # Node: [hash, values, {distance: child node}]
+        self.root = None
+        self.size = 0
+        for value_hash, value in items or []:
+            self.add(value_hash, value)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value_hash, value):
+        """Index `value` under an unsigned hash"""
+        self.size += 1
+        if self.root is None:
+            self.root = [value_hash, [value], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value_hash, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value_hash, [value], {}]
+                return
+            node = child
+
+    def search(self, value_hash, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Find indexed values within `max_distance` bits.
+
+        Returns:
+            List of (distance, value), closest first
+        """
+        matches = []
+        if self.root is None:
+            return matches
+        stack = [self.root]
+        while stack:
+            node_hash, values, children = stack.pop()
+            distance = hamming(value_hash, node_hash)
+            if distance <= max_distance:
+                matches.extend((distance, value) for value in values)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in children.items() if low <= edge <= high)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, value_hash, max_distance=DEFAULT_MAX_DISTANCE):
+        """Closest (distance, value) within `max_distance`, or None"""
+        matches = self.search(value_hash, max_distance)
+        return matches[0] if matches else None
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    Each hash is split into INDEX_CHUNKS 16-bit chunks with one table per
+    chunk. Two hashes within r bits must agree to within r // INDEX_CHUNKS
+    bits on at least one chunk (pigeonhole), so a search only probes the
+    table buckets near the query's chunks and checks those candidates.
+    Much faster than a BK-tree for the radii used for photos, where a
+    BK-tree ends up visiting most of its nodes.
+    """
+
+    def __init__(self, items=None):
+        self.chunk_bits = 64 // INDEX_CHUNKS
+        self.tables = [{} for _ in range(INDEX_CHUNKS)]
+        self.entries = {}
+        self.size = 0
+        for value_hash, value in items or []:
+            self.add(value_hash, value)
+
+    def __len__(self):
+        return self.size
+
+    def _chunks(self, value_hash):
+        mask = (1 << self.chunk_bits) - 1
+        return [(value_hash >> (i * self.chunk_bits)) & mask for i in range(INDEX_CHUNKS)]
+
+    def _variants(self, chunk, radius):
+        """Chunk values within `radius` bits of `chunk`"""
+        variants = [chunk]
+        frontier = [(chunk, -1)]
+        for _ in range(radius):
+            frontier = [(value ^ (1 << bit), bit)
+                        for value, last in frontier
+                        for bit in range(last + 1, self.chunk_bits)]
+            variants.extend(value for value, _ in frontier)
+        return variants
+
+    def add(self, value_hash, value):
+        """Index `value` under an unsigned hash"""
+        self.size += 1
+        values = self.entries.get(value_hash)
+        if values is not None:
+            values.append(value)
+            return
+        self.entries[value_hash] = [value]
+        for table, chunk in zip(self.tables, self._chunks(value_hash)):
+            table.setdefault(chunk, []).append(value_hash)
+
+    def search(self, value_hash, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Find indexed values within `max_distance` bits.
+
+        Returns:
+            List of (distance, value), closest first
+        """
+        radius = max_distance // INDEX_CHUNKS
+        seen = set()
+        matches = []
+        for table, chunk in zip(self.tables, self._chunks(value_hash)):
+            for variant in self._variants(chunk, radius):
+                for candidate in table.get(variant, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = hamming(value_hash, candidate)
+                    if distance <= max_distance:
+                        matches.extend((distance, value) for value in self.entries[candidate])
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, value_hash, max_distance=DEFAULT_MAX_DISTANCE):
+        """Closest (distance, value) within `max_distance`, or None"""
+        matches = self.search(value_hash, max_distance)
+        return matches[0] if matches else None
@@ -0,0 +1,228 @@
+"""
+Image Quality Module
+Measures sharpness, exposure, contrast and noise on a small grayscale proxy.
+
+JPEGs are decoded with Pillow's draft mode, which lets the decoder scale by
+1/2, 1/4 or 1/8 while decoding, so a 12 MP photo is never decoded at full
+size. All measurements are vectorised NumPy over the proxy (at most
+PROXY_SIZE pixels on its long side).
+
+    report = assess_file(image_file)   # {'score': 0-100, 'sharpness': ..., ...}
+    reports = assess_batch(paths)      # one report (or None) per image
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Long side of the analysis proxy, in pixels
+PROXY_SIZE = 512
+
+# Points per component (sum to 100)
+WEIGHTS = {
+    'sharpness': 45,
+    'exposure': 20,
+    'contrast': 15,
+    'noise': 10,
+    'resolution': 10
+}
+
+# Laplacian variance (on the proxy) below LOW is blurry, above HIGH is crisp
+SHARPNESS_RANGE = (20.0, 500.0)
+
+# Brightness mean that needs no correction, and the 5th-95th percentile spread
+BRIGHTNESS_RANGE = (90.0, 170.0)
+CONTRAST_RANGE = (30.0, 120.0)
+
+# Estimated noise sigma (grey levels, at full resolution) that is clean / unusable
+NOISE_RANGE = (3.0, 15.0)
+
+# Median absolute deviation -> standard deviation for Gaussian noise
+NOISE_MAD_SCALE = 1.4826
+
+# Pixel values counted as crushed shadows / blown highlights
+SHADOW_LEVEL = 5
+HIGHLIGHT_LEVEL = 250
+
+# (minimum pixels, fraction of the resolution points)
+RESOLUTION_TIERS = [
+    (1920 * 1080, 1.0),
+    (1280 * 720, 0.8),
+    (640 * 480, 0.6),
+    (0, 0.4)
+]
+
+
+def load_proxy(source, max_size=PROXY_SIZE):
+    """
+    Decode an image to a small grayscale array.
+
+    Args:
+        source: Path or binary file object
+        max_size: Long side of the proxy
+
+    Returns:
+        Tuple of (uint8 array, original (width, height))
+    """
+    with Image.open(source) as img:
+        original_size = img.size
+        # JPEG: let the decoder downscale (DCT scaling) instead of decoding
+        # everything. Draft never goes below the requested size, so ask for
+        # half the proxy size to allow the largest reduction that still fits
+        img.draft('L', (max_size // 2, max_size // 2))
+        gray = img.convert('L')
+    if max(gray.size) > max_size:
+        gray.thumbnail((max_size, max_size), Image.Resampling.BOX)
+    return np.asarray(gray), original_size
+
+
+def proxy_from_image(img, max_size=PROXY_SIZE, original_size=None):
+    """Grayscale proxy of an already opened image (like load_proxy, without draft)"""
+    gray = img.convert('L')
+    if max(gray.size) > max_size:
+        gray.thumbnail((max_size, max_size), Image.Resampling.BOX)
+    return np.asarray(gray), original_size or img.size
+
+
+def _ramp(value, low, high):
+    """0 at `low`, 1 at `high`, linear in between"""
+    if high == low:
+        return 1.0
+    return float(min(max((value - low) / (high - low), 0.0), 1.0))
+
+
+def measure(pixels):
+    """
+    Raw quality measurements of a grayscale proxy.
+
+    Returns:
+        Dictionary with sharpness (Laplacian variance), brightness (mean),
+        contrast (5th-95th percentile spread), shadows/highlights (clipped
+        fractions) and noise (estimated sigma)
+    """
+    if pixels.shape[0] < 3 or pixels.shape[1] < 3:
+        return None
+
+    pixels = pixels.astype(np.int32)
+    center = pixels[1:-1, 1:-1]
+    cross = pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+    laplacian = cross - 4 * center
+
+    # Immerkaer's mask cancels image structure up to second order, so what
+    # remains is mostly noise (with std 6 * sigma); the median keeps edges out
+    diagonals = pixels[:-2, :-2] + pixels[:-2, 2:] + pixels[2:, :-2] + pixels[2:, 2:]
+    residual = np.abs(diagonals - 2 * cross + 4 * center)
+    # Integer residuals: take the median from their histogram instead of sorting
+    residual_counts = np.cumsum(np.bincount(residual.ravel()))
+    median = int(np.searchsorted(residual_counts, residual_counts[-1] / 2))
+    noise = NOISE_MAD_SCALE * median / 6
+
+    histogram = np.bincount(pixels.ravel(), minlength=256)
+    total = histogram.sum()
+    cumulative = np.cumsum(histogram) / total
+    p5 = int(np.searchsorted(cumulative, 0.05))
+    p95 = int(np.searchsorted(cumulative, 0.95))
+
+    return {
+        'sharpness': round(float(laplacian.var(dtype=np.float64)), 2),
+        'brightness': round(float(np.dot(histogram, np.arange(256)) / total), 2),
+        'contrast': p95 - p5,
+        'shadows': round(float(histogram[:SHADOW_LEVEL + 1].sum() / total), 4),
+        'highlights': round(float(histogram[HIGHLIGHT_LEVEL:].sum() / total), 4),
+        'noise': round(noise, 2)
+    }
+
+
+def score(metrics, original_size):
+    """Combine measurements into a 0-100 score"""
+    low, high = SHARPNESS_RANGE
+    sharpness = _ramp(math.log10(max(metrics['sharpness'], 1e-6)), math.log10(low), math.log10(high))
+
+    brightness = metrics['brightness']
+    dark, bright = BRIGHTNESS_RANGE
+    if brightness < dark:
+        exposure = _ramp(brightness, dark / 3, dark)
+    elif brightness > bright:
+        exposure = 1.0 - _ramp(brightness, bright, 255 - (255 - bright) / 3)
+    else:
+        exposure = 1.0
+    # Large crushed or blown areas cost up to half the exposure points
+    exposure *= 1.0 - 0.5 * _ramp(metrics['shadows'] + metrics['highlights'], 0.02, 0.25)
+
+    contrast = _ramp(metrics['contrast'], *CONTRAST_RANGE)
+    noise = 1.0 - _ramp(metrics['noise'], *NOISE_RANGE)
+
+    pixels = original_size[0] * original_size[1]
+    resolution = next(points for minimum, points in RESOLUTION_TIERS if pixels >= minimum)
+
+    components = {
+        'sharpness': sharpness,
+        'exposure': exposure,
+        'contrast': contrast,
+        'noise': noise,
+        'resolution': resolution
+    }
+    return int(round(sum(WEIGHTS[name] * value for name, value in components.items())))
+
+
+def _report(pixels, original_size):
+    metrics = measure(pixels)
+    if metrics is None:
+        return None
+    # Downscaling averages noise away; report it at the original resolution
+    metrics['noise'] = round(metrics['noise'] * max(original_size) / max(pixels.shape), 2)
+    metrics['score'] = score(metrics, original_size)
+    metrics['width'], metrics['height'] = original_size
+    return metrics
+
+
+def assess_file(source):
+    """
+    Quality report for an image file.
+
+    Returns:
+        Dictionary of measurements plus 'score' (0-100), or None if the
+        image can't be read
+    """
+    try:
+        return _report(*load_proxy(source))
+    except Exception as e:
+        print(f"Error assessing image quality: {e}")
+        return None
+
+
+def assess_image(img, original_size=None):
+    """
+    Quality report for an already decoded PIL image.
+
+    Args:
+        img: Image (ideally already downscaled, e.g. by decode.load_scaled)
+        original_size: Size of the full image, when `img` is a reduced copy
+    """
+    try:
+        return _report(*proxy_from_image(img, original_size=original_size))
+    except Exception as e:
+        print(f"Error assessing image quality: {e}")
+        return None
+
+
+def assess_batch(sources, max_workers=None):
+    """
+    Quality reports for many images.
+
+    Decoding and the NumPy work release the GIL, so images are scored on a
+    small thread pool.
+
+    Returns:
+        List of reports (None for unreadable images), in input order
+    """
+    sources = list(sources)
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+    if max_workers <= 1 or len(sources) <= 1:
+        return [assess_file(source) for source in sources]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(assess_file, sources))
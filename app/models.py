@@ -1,6 +1,7 @@
 from datetime import datetime, date
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from app.date_utils import to_datetime
 
 class User(UserMixin):
     def __init__(self, data):
@@ -61,6 +62,7 @@ class Toli:
         self.toli_no = data.get('toli_no', '')
         self.location = data.get('location', {})
         self.members = data.get('members', [])
+        self.member_count = data.get('member_count', len(self.members or []))
         self.leader_id = data.get('leader_id', '')
         self.status = data.get('status', 'draft')
         self.session_year = data.get('session_year', '')
@@ -84,6 +86,7 @@ class Toli:
             'toli_no': self.toli_no,
             'location': self.location,
             'members': members_data,
+            'member_count': len(members_data),
             'leader_id': self.leader_id,
             'status': self.status,
             'session_year': self.session_year,
@@ -106,16 +109,7 @@ class Program:
         
         # Handle date conversion safely - ensure it's always datetime
         start_date = data.get('start_date') or data.get('date')
-        if isinstance(start_date, date):
-            # Convert date to datetime
-            self.start_date = datetime.combine(start_date, datetime.min.time())
-        elif isinstance(start_date, str):
-            try:
-                self.start_date = datetime.strptime(start_date, '%Y-%m-%d')
-            except (ValueError, TypeError):
-                self.start_date = datetime.utcnow()
-        else:
-            self.start_date = start_date or datetime.utcnow()
+        self.start_date = to_datetime(start_date) or datetime.utcnow()
             
         self.end_date = data.get('end_date', '')
         self.status = data.get('status', 'completed')
@@ -164,6 +158,9 @@ class Resource:
         self.file_path = data.get('file_path', '')
         self.file_name = data.get('file_name', '')
         self.file_size = data.get('file_size', 0)
+        self.content_hash = data.get('content_hash', '')
+        self.file_mtime = data.get('file_mtime')
+        self.downloads = data.get('downloads', {})
         self.external_link = data.get('external_link', '')
         self.created_by = data.get('created_by', '')
         self.created_at = data.get('created_at', datetime.utcnow())
@@ -176,6 +173,8 @@ class Resource:
             'file_path': self.file_path,
             'file_name': self.file_name,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
+            'file_mtime': self.file_mtime,
             'external_link': self.external_link,
             'created_by': self.created_by,
             'created_at': self.created_at
@@ -199,25 +198,41 @@ class Newsletter:
         self.created_by = data.get('created_by')
         self.created_at = data.get('created_at')
         self.ai_generated = data.get('ai_generated', False)
+        # Structured newsletters (see app.report_documents); legacy ones only have content
+        self.program_title = data.get('program_title', '')
+        self.organizer_contact = data.get('organizer_contact', '')
+        self.organizer_email = data.get('organizer_email', '')
+        self.program_no = data.get('program_no', 'N/A')
+        self.template = data.get('template')
+        self.template_version = data.get('template_version')
 
     def to_dict(self):
-        return {
+        data = {
             'program_id': self.program_id,
             'title': self.title,
-            'content': self.content,
+            'program_title': self.program_title,
             'program_type': self.program_type,
             'location': self.location,
             'date': self.date,
             'participants_count': self.participants_count,
             'achievements': self.achievements,
             'organizer_name': self.organizer_name,
+            'organizer_contact': self.organizer_contact,
+            'organizer_email': self.organizer_email,
+            'program_no': self.program_no,
             'images': self.images,
             'toli_name': self.toli_name,
             'status': self.status,
             'created_by': self.created_by,
             'created_at': self.created_at,
-            'ai_generated': self.ai_generated
+            'ai_generated': self.ai_generated,
+            'template': self.template,
+            'template_version': self.template_version
         }
+        if self.content:
+            # Legacy newsletter stored as HTML
+            data['content'] = self.content
+        return data
 
 class Report:
     def __init__(self, data):
@@ -238,26 +253,48 @@ class Report:
         self.ai_generated = data.get('ai_generated', False)
         self.impact_score = data.get('impact_score', 0)
         self.recommendations = data.get('recommendations', [])
+        # Structured reports (see app.report_documents); legacy ones only have content
+        self.program_title = data.get('program_title', '')
+        self.organizer_contact = data.get('organizer_contact', '')
+        self.organizer_email = data.get('organizer_email', '')
+        self.program_no = data.get('program_no', 'N/A')
+        self.toli_city = data.get('toli_city', '')
+        self.toli_state = data.get('toli_state', '')
+        self.images = data.get('images', [])
+        self.template = data.get('template')
+        self.template_version = data.get('template_version')
 
     def to_dict(self):
-        return {
+        data = {
             'program_id': self.program_id,
             'title': self.title,
-            'content': self.content,
+            'program_title': self.program_title,
             'program_type': self.program_type,
             'location': self.location,
             'date': self.date,
             'participants_count': self.participants_count,
             'achievements': self.achievements,
             'organizer_name': self.organizer_name,
+            'organizer_contact': self.organizer_contact,
+            'organizer_email': self.organizer_email,
+            'program_no': self.program_no,
             'toli_name': self.toli_name,
+            'toli_city': self.toli_city,
+            'toli_state': self.toli_state,
+            'images': self.images,
             'status': self.status,
             'created_by': self.created_by,
             'created_at': self.created_at,
             'ai_generated': self.ai_generated,
             'impact_score': self.impact_score,
-            'recommendations': self.recommendations
+            'recommendations': self.recommendations,
+            'template': self.template,
+            'template_version': self.template_version
         }
+        if self.content:
+            # Legacy report stored as HTML
+            data['content'] = self.content
+        return data
 
 class Message:
     def __init__(self, data):
@@ -0,0 +1,157 @@
+"""
+Report Documents
+Program reports and newsletters are stored as structured fields plus the
+name and version of the template that lays them out; the HTML is rendered
+from templates/reports/ when a document is viewed.
+
+    report_id = db.create_report(program_report_document(program, toli, student, program_id, images))
+    html = render_document(db.get_report_by_id(report_id))
+
+A document keeps the template_version it was created with, so changing a
+layout means adding <template>_v2.html and bumping TEMPLATE_VERSIONS; older
+documents keep rendering with the template they were written for.
+Rendered HTML is kept in a small in-process LRU cache keyed by the
+document's id and a hash of its fields.
+
+Documents created before this scheme store their HTML in 'content' and no
+template; they are shown as stored until migrate_report_content.py
+converts them.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import render_template
+
+PROGRAM_REPORT = 'program_report'
+BASIC_REPORT = 'basic_report'
+NEWSLETTER = 'newsletter'
+
+# Current version of each template (templates/reports/<name>_v<version>.html)
+TEMPLATE_VERSIONS = {
+    PROGRAM_REPORT: 1,
+    BASIC_REPORT: 1,
+    NEWSLETTER: 1
+}
+
+# Name of the variable a template receives the document as
+TEMPLATE_CONTEXT = {
+    PROGRAM_REPORT: 'report',
+    BASIC_REPORT: 'report',
+    NEWSLETTER: 'newsletter'
+}
+
+# Photos shown in a program report
+REPORT_IMAGE_LIMIT = 6
+
+RENDER_CACHE_SIZE = 256
+
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+
+def _program_fields(program_data, toli_data, student, program_id, images):
+    """Fields reports and newsletters share"""
+    toli_data = toli_data or {}
+    toli_location = toli_data.get('location') or {}
+    return {
+        'program_id': program_id,
+        'program_title': program_data.get('title') or '',
+        'program_type': program_data.get('program_type') or '',
+        'location': program_data.get('location') or '',
+        'date': program_data.get('date'),
+        'participants_count': program_data.get('total_persons') or 0,
+        'achievements': program_data.get('achievements') or '',
+        'organizer_name': program_data.get('organizer_name') or '',
+        'organizer_contact': program_data.get('organizer_contact') or '',
+        'organizer_email': getattr(student, 'email', '') or '',
+        'program_no': program_data.get('program_no') or 'N/A',
+        'toli_city': toli_location.get('city', 'N/A') if isinstance(toli_location, dict) else 'N/A',
+        'toli_state': toli_location.get('state', '') if isinstance(toli_location, dict) else '',
+        'images': list(images or []),
+        'created_by': getattr(student, 'id', None),
+        'created_at': datetime.utcnow()
+    }
+
+
+def program_report_document(program_data, toli_data, student, program_id, images=None, template=PROGRAM_REPORT):
+    """
+    Report document for a submitted program.
+
+    Args:
+        program_data: Program fields (title, program_type, date, location,
+            total_persons, achievements, organizer_name, organizer_contact,
+            program_no)
+        toli_data: Toli document of the organizing toli
+        student: User who submitted the program
+        template: PROGRAM_REPORT or BASIC_REPORT
+    """
+    document = _program_fields(program_data, toli_data, student, program_id, images)
+    title_prefix = 'Program Report' if template == PROGRAM_REPORT else 'Report'
+    if template == PROGRAM_REPORT:
+        document['images'] = document['images'][:REPORT_IMAGE_LIMIT]
+    document.update({
+        'title': f"{title_prefix}: {document['program_title']}",
+        'toli_name': (toli_data or {}).get('name', 'Unknown Toli'),
+        'status': 'completed',
+        'ai_generated': template == PROGRAM_REPORT,
+        'template': template,
+        'template_version': TEMPLATE_VERSIONS[template]
+    })
+    return document
+
+
+def newsletter_document(program_data, toli_data, student, program_id, images=None):
+    """Newsletter document for a submitted program (shows its first photo)"""
+    document = _program_fields(program_data, toli_data, student, program_id, images)
+    document.update({
+        'title': f"Newsletter: {document['program_title']}",
+        'toli_name': (toli_data or {}).get('name', 'DISHA Program'),
+        'status': 'published',
+        'ai_generated': True,
+        'template': NEWSLETTER,
+        'template_version': TEMPLATE_VERSIONS[NEWSLETTER]
+    })
+    return document
+
+
+def template_name(template, version):
+    return f"reports/{template}_v{version}.html"
+
+
+def _fingerprint(document):
+    payload = json.dumps(document, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def render_document(document):
+    """
+    HTML of a report or newsletter document.
+
+    Structured documents are rendered with the template and version they
+    name (cached); legacy documents return their stored 'content'.
+    """
+    if not document:
+        return ''
+    template = document.get('template')
+    if template not in TEMPLATE_CONTEXT:
+        return document.get('content', '')
+
+    version = document.get('template_version') or 1
+    key = (str(document.get('_id')), template, version, _fingerprint(document))
+    with _render_cache_lock:
+        html = _render_cache.get(key)
+        if html is not None:
+            _render_cache.move_to_end(key)
+            return html
+
+    html = render_template(template_name(template, version), **{TEMPLATE_CONTEXT[template]: document})
+
+    with _render_cache_lock:
+        _render_cache[key] = html
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return html
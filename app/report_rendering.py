@@ -0,0 +1,387 @@
+"""
+Report Rendering
+Builds downloadable PDF (ReportLab) and Word (python-docx) files of program
+reports and keeps them in a disk cache.
+
+    renderer = get_report_renderer()
+    path = renderer.cached(report_data, images, 'pdf')     # None when cold
+    renderer.render_in_background(report_data, images, 'pdf')
+
+Documents are laid out from the structured report fields, not the stored
+HTML. Program photos are embedded as downscaled JPEG variants from the media
+cache (app.media), so a 12 MP photo adds tens of kilobytes to a document
+instead of megabytes. Each file is stored under the report id and a version
+hashed from the fields it shows, the photos' fingerprints and
+LAYOUT_VERSION: a changed report gets a new file, and repeat downloads are a
+plain file send. Superseded versions are left for prune() to remove.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from flask import current_app
+
+from app.concurrency import start_blocking
+from app.date_utils import format_date
+from app.media import MediaCache, cache_dir as media_cache_dir
+
+# fmt -> (mimetype, extension)
+FORMATS = {
+    'pdf': ('application/pdf', 'pdf'),
+    'docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx')
+}
+
+# Bump when the document layout changes, so cached files are rebuilt
+LAYOUT_VERSION = 1
+
+# Report fields a document shows (its version is hashed from these)
+VERSIONED_FIELDS = (
+    'title', 'program_type', 'location', 'date', 'participants_count', 'achievements',
+    'organizer_name', 'toli_name', 'status', 'created_at', 'impact_score', 'recommendations'
+)
+
+# Photos per document, and the width of the variant they are embedded from
+MAX_IMAGES = 6
+IMAGE_VARIANT_WIDTH = 960
+
+# Files not downloaded for this long are removed by prune()
+MAX_AGE_DAYS = 30
+
+# Downloads refresh a file's mtime (its age for pruning) at most this often
+TOUCH_INTERVAL = 3600
+
+LOCK_STRIPES = 16
+
+# How often the "preparing" page checks back while a render runs
+POLL_INTERVAL_MS = 2000
+
+# Renders queued or running in this process, and ones that failed
+_pending = set()
+_failed = {}
+_state_lock = threading.Lock()
+
+
+def cache_dir(app):
+    """Directory holding rendered reports (REPORT_CACHE_DIR overrides it)"""
+    return os.getenv('REPORT_CACHE_DIR') or os.path.join(app.instance_path, 'report_cache')
+
+
+def get_report_renderer():
+    """Report renderer for the current app"""
+    static_dir = os.path.join(current_app.root_path, 'static')
+    return ReportRenderer(MediaCache(static_dir, media_cache_dir(current_app)), cache_dir(current_app))
+
+
+def report_version(report_data, image_ids):
+    """
+    Version of a report's documents: changes with any field or photo they show.
+
+    Args:
+        report_data: Report document
+        image_ids: Identities of the embedded photos (path and content fingerprint)
+    """
+    fields = {name: report_data.get(name) for name in VERSIONED_FIELDS}
+    payload = json.dumps([LAYOUT_VERSION, fields, list(image_ids)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _fallback_achievements(report_data):
+    program_type = (report_data.get('program_type') or 'community').lower()
+    return (f"Successfully conducted {program_type} program with active participation from "
+            f"community members. The program created awareness about social values and provided "
+            f"valuable learning experiences to all participants.")
+
+
+def _details(report_data):
+    """(label, value) rows of the program details table"""
+    participants = report_data.get('participants_count') or 0
+    return [
+        ('Program Type', report_data.get('program_type') or 'N/A'),
+        ('Toli', report_data.get('toli_name') or 'N/A'),
+        ('Venue', report_data.get('location') or 'N/A'),
+        ('Date', format_date(report_data.get('date'), '%d %B, %Y', default='N/A')),
+        ('Participants', f"{participants}+" if participants else 'N/A'),
+        ('Coordinator', report_data.get('organizer_name') or 'N/A')
+    ]
+
+
+class ReportRenderer:
+    """PDF and Word files of program reports, cached on disk"""
+
+    def __init__(self, media, root):
+        self.media = media
+        self.root = root
+        self.lock_dir = os.path.join(root, 'locks')
+
+    def output_path(self, report_id, version, fmt):
+        return os.path.join(self.root, f"{report_id}_{version}.{FORMATS[fmt][1]}")
+
+    def _key(self, report_data, images, fmt):
+        image_ids = [self._image_identity(path) for path in images[:MAX_IMAGES]]
+        return self.output_path(str(report_data['_id']), report_version(report_data, image_ids), fmt)
+
+    def _image_identity(self, path):
+        source = self.media.resolve_source(path)
+        return f"{path}@{self.media.fingerprint(path, source)[:16]}" if source else path
+
+    def cached(self, report_data, images, fmt):
+        """Path of the rendered file if it is up to date, else None"""
+        path = self._key(report_data, images, fmt)
+        try:
+            modified = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if now - modified > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return path
+
+    def pop_failure(self, report_data, images, fmt):
+        """
+        Error of the last failed background render of this version, or None.
+
+        The error is reported once; the next request starts a new render.
+        """
+        with _state_lock:
+            return _failed.pop(self._key(report_data, images, fmt), None)
+
+    def render_in_background(self, report_data, images, fmt):
+        """
+        Queue a render of a report unless one is already running.
+
+        Returns:
+            True if a render was started
+        """
+        path = self._key(report_data, images, fmt)
+        with _state_lock:
+            if path in _pending:
+                return False
+            _pending.add(path)
+            _failed.pop(path, None)
+
+        def _run():
+            try:
+                self.render(report_data, images, fmt)
+            except Exception as e:
+                print(f"❌ Error rendering report {report_data.get('_id')} as {fmt}: {e}")
+                with _state_lock:
+                    _failed[path] = str(e)
+            finally:
+                with _state_lock:
+                    _pending.discard(path)
+
+        start_blocking(_run, name=f"report-{fmt}")
+        return True
+
+    def render(self, report_data, images, fmt):
+        """
+        Render a report unless its current version is on disk.
+
+        Returns:
+            Absolute path of the rendered file
+        """
+        path = self._key(report_data, images, fmt)
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        stripe = zlib.crc32(os.path.basename(path).encode()) % LOCK_STRIPES
+        with open(os.path.join(self.lock_dir, f"{stripe}.lock"), 'w') as lock:
+            # Another worker may be rendering the same file; wait for it
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(path):
+                return path
+
+            variants = self._image_variants(images)
+            build = self.build_pdf if fmt == 'pdf' else self.build_docx
+            with tempfile.NamedTemporaryFile(dir=self.root, suffix='.tmp', delete=False) as tmp:
+                try:
+                    build(report_data, variants, tmp)
+                except Exception:
+                    tmp.close()
+                    os.remove(tmp.name)
+                    raise
+            os.replace(tmp.name, path)
+
+        # Older versions stay until prune(): a download may still be sending one
+        return path
+
+    def _image_variants(self, images):
+        """Paths and sizes of downscaled copies of the report's photos"""
+        from PIL import Image
+
+        variants = []
+        for path in images[:MAX_IMAGES]:
+            source = self.media.resolve_source(path)
+            if source is None:
+                continue
+            try:
+                fingerprint = self.media.fingerprint(path, source)
+                variant = self.media.get(source, fingerprint, IMAGE_VARIANT_WIDTH, 'jpeg')
+                with Image.open(variant) as img:
+                    variants.append((variant, img.size))
+            except Exception as e:
+                print(f"Error preparing report image {path}: {e}")
+        return variants
+
+    def build_pdf(self, report_data, images, out):
+        """Write a report as PDF (ReportLab platypus) to a binary file object"""
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+        from reportlab.lib.units import mm
+        from reportlab.platypus import Image, ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+        accent = colors.HexColor('#1e40af')
+        styles = getSampleStyleSheet()
+        heading = ParagraphStyle('SectionHeading', parent=styles['Heading2'], textColor=accent, spaceBefore=10)
+        body = ParagraphStyle('ReportBody', parent=styles['BodyText'], leading=15)
+        centered = ParagraphStyle('Centered', parent=styles['Title'], textColor=accent)
+
+        generated = datetime.utcnow().strftime('%d %B, %Y')
+
+        def footer(canvas, doc):
+            canvas.saveState()
+            canvas.setFont('Helvetica', 8)
+            canvas.setFillColor(colors.grey)
+            canvas.drawString(doc.leftMargin, 12 * mm,
+                              f"Dev Sanskriti Vishwavidyalaya, Haridwar | DISHA Social Internship Program | Generated on {generated}")
+            canvas.drawRightString(A4[0] - doc.rightMargin, 12 * mm, f"Page {doc.page}")
+            canvas.restoreState()
+
+        doc = SimpleDocTemplate(out, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm,
+                                topMargin=18 * mm, bottomMargin=22 * mm,
+                                title=report_data.get('title') or 'Program Report', author='DISHA')
+        story = [
+            Paragraph('PROGRAM COMPLETION REPORT', centered),
+            Paragraph('DEV SANSKRITI VISHWAVIDYALAYA - DISHA Social Internship Program', styles['Heading4']),
+            Spacer(1, 4 * mm),
+            Paragraph(escape(report_data.get('title') or 'Program Report'), styles['Heading2'])
+        ]
+
+        details = Table([[Paragraph(f"<b>{label}</b>", body), Paragraph(escape(str(value)), body)]
+                         for label, value in _details(report_data)],
+                        colWidths=[45 * mm, doc.width - 45 * mm])
+        details.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#eff6ff')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE')
+        ]))
+        story += [Paragraph('Program Overview', heading), details]
+
+        achievements = report_data.get('achievements') or _fallback_achievements(report_data)
+        story += [Paragraph('Impact &amp; Achievements', heading),
+                  Paragraph(escape(achievements).replace('\n', '<br/>'), body)]
+
+        recommendations = report_data.get('recommendations') or []
+        if recommendations:
+            story += [Paragraph('Recommendations', heading),
+                      ListFlowable([ListItem(Paragraph(escape(str(item)), body)) for item in recommendations],
+                                   bulletType='bullet', start='•')]
+
+        if images:
+            # Two photos per row, scaled to the column width
+            gap = 4 * mm
+            cell_width = (doc.width - gap) / 2
+            cells = []
+            for path, (width, height) in images:
+                scale = min(cell_width / width, (cell_width * 0.75) / height)
+                cells.append(Image(path, width=width * scale, height=height * scale))
+            if len(cells) % 2:
+                cells.append('')
+            gallery = Table([cells[i:i + 2] for i in range(0, len(cells), 2)],
+                            colWidths=[cell_width + gap / 2] * 2)
+            gallery.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), gap)
+            ]))
+            story += [Paragraph('Photo Gallery', heading), gallery]
+
+        doc.build(story, onFirstPage=footer, onLaterPages=footer)
+
+    def build_docx(self, report_data, images, out):
+        """Write a report as a Word document (python-docx) to a binary file object"""
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches
+
+        document = Document()
+        document.core_properties.title = report_data.get('title') or 'Program Report'
+        document.core_properties.author = 'DISHA'
+
+        title = document.add_heading('PROGRAM COMPLETION REPORT', level=0)
+        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        subtitle = document.add_paragraph('DEV SANSKRITI VISHWAVIDYALAYA - DISHA Social Internship Program')
+        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        document.add_heading(report_data.get('title') or 'Program Report', level=1)
+
+        document.add_heading('Program Overview', level=2)
+        rows = _details(report_data)
+        details = document.add_table(rows=len(rows), cols=2)
+        details.style = 'Light Grid Accent 1'
+        for row, (label, value) in zip(details.rows, rows):
+            row.cells[0].text = label
+            row.cells[1].text = str(value)
+
+        document.add_heading('Impact & Achievements', level=2)
+        document.add_paragraph(report_data.get('achievements') or _fallback_achievements(report_data))
+
+        recommendations = report_data.get('recommendations') or []
+        if recommendations:
+            document.add_heading('Recommendations', level=2)
+            for item in recommendations:
+                document.add_paragraph(str(item), style='List Bullet')
+
+        if images:
+            document.add_heading('Photo Gallery', level=2)
+            gallery = document.add_table(rows=(len(images) + 1) // 2, cols=2)
+            for index, (path, (width, height)) in enumerate(images):
+                cell = gallery.cell(index // 2, index % 2)
+                # Landscape photos fill the column; portrait ones are capped by height
+                size = {'width': Inches(3)} if width >= height else {'height': Inches(3)}
+                cell.paragraphs[0].add_run().add_picture(path, **size)
+                cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        footer = document.sections[0].footer.paragraphs[0]
+        footer.text = (f"Dev Sanskriti Vishwavidyalaya, Haridwar | DISHA Social Internship Program | "
+                       f"Generated on {datetime.utcnow().strftime('%d %B, %Y')}")
+        document.save(out)
+
+    def prune(self, max_age_days=MAX_AGE_DAYS):
+        """
+        Delete rendered files not downloaded for `max_age_days`.
+
+        Returns:
+            Dictionary with removed count and bytes freed
+        """
+        result = {'removed': 0, 'bytes_freed': 0}
+        if not os.path.isdir(self.root):
+            return result
+        cutoff = time.time() - max_age_days * 24 * 3600
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if not os.path.isfile(path) or stat.st_mtime >= cutoff:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            result['removed'] += 1
+            result['bytes_freed'] += stat.st_size
+        return result
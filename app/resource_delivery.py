@@ -0,0 +1,150 @@
+"""
+Resource Delivery
+Serves resource files (blob store or legacy static/resources) with
+conditional and byte-range support.
+
+- Strong ETags come from a SHA-256 content hash stored on the resource
+  (computed once, refreshed when the file's size or mtime changes).
+- If-None-Match / If-Modified-Since are answered with 304 and Range
+  requests with 206, so seeks and resumed downloads only send what is
+  missing.
+- With USE_X_SENDFILE (Apache/lighttpd) or RESOURCE_ACCEL_PREFIX (nginx
+  X-Accel-Redirect, an internal location aliasing the static folder) the web
+  server streams the file instead of a worker.
+- Every response updates the resource's download metrics.
+"""
+
+import hashlib
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+
+from flask import current_app, request, send_file
+
+from app.blob_store import BLOB_DIR, BlobStore
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResourceDelivery:
+    """Send resource files and record download metrics"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def static_dir():
+        return os.path.join(current_app.root_path, 'static')
+
+    def resolve_path(self, file_path):
+        """Absolute path of a stored resource file, or None if missing or outside its directory"""
+        if not file_path:
+            return None
+        if BlobStore.digest_of(file_path):
+            # Blob paths are relative to static/
+            base_dir = os.path.realpath(self.static_dir())
+            allowed_dir = os.path.join(base_dir, BLOB_DIR)
+        else:
+            base_dir = allowed_dir = os.path.realpath(os.path.join(self.static_dir(), 'resources'))
+        full_path = os.path.realpath(os.path.join(base_dir, os.path.normpath(file_path)))
+        if os.path.commonpath([allowed_dir, full_path]) != allowed_dir:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    def file_etag(self, resource_data, path):
+        """Stored content hash, recomputed when the file on disk has changed"""
+        digest = BlobStore.digest_of(resource_data.get('file_path'))
+        if digest:
+            # Blobs are content-addressed and never change in place
+            return digest
+        stat = os.stat(path)
+        if (resource_data.get('content_hash')
+                and resource_data.get('file_size') == stat.st_size
+                and resource_data.get('file_mtime') == int(stat.st_mtime)):
+            return resource_data['content_hash']
+
+        digest = content_hash(path)
+        try:
+            self.db.update_resource(str(resource_data['_id']), {
+                'content_hash': digest,
+                'file_size': stat.st_size,
+                'file_mtime': int(stat.st_mtime)
+            })
+        except Exception as e:
+            print(f"⚠️ Could not store content hash: {e}")
+        return digest
+
+    def send(self, resource_data, path, download_name):
+        """
+        Build the download response for a resource file.
+
+        Returns:
+            Flask response (200, 206, 304 or 416)
+        """
+        etag = self.file_etag(resource_data, path)
+        accel_prefix = current_app.config.get('RESOURCE_ACCEL_PREFIX')
+
+        if accel_prefix:
+            # nginx serves the body (and ranges); the worker only sends headers
+            response = self._accel_response(path, accel_prefix, download_name, etag)
+        else:
+            # send_file answers conditional and Range requests itself and
+            # uses X-Sendfile when USE_X_SENDFILE is enabled
+            response = send_file(path, as_attachment=True, download_name=download_name,
+                                 etag=etag, conditional=True)
+
+        # Downloads sit behind a login: never in shared caches
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+
+        self.record(resource_data, response)
+        return response
+
+    def _accel_response(self, path, accel_prefix, download_name, etag):
+        mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+        response = current_app.response_class(mimetype=mimetype)
+        try:
+            download_name.encode('ascii')
+            disposition = {'filename': download_name}
+        except UnicodeEncodeError:
+            simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+            disposition = {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='')}"}
+        response.headers.set('Content-Disposition', 'attachment', **disposition)
+
+        relative = os.path.relpath(path, os.path.realpath(self.static_dir()))
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative.replace(os.sep, '/'))}"
+        response.set_etag(etag)
+        response.last_modified = int(os.stat(path).st_mtime)
+        return response.make_conditional(request)
+
+    def record(self, resource_data, response):
+        """Update download counters for a response"""
+        status = response.status_code
+        counters = {}
+        if status == 304:
+            counters['not_modified'] = 1
+        elif status == 206:
+            counters['range_requests'] = 1
+            counters['bytes_served'] = response.content_length or 0
+            # Only the first range of a download counts as a new download
+            if (request.range and request.range.ranges
+                    and request.range.ranges[0][0] == 0):
+                counters['download_count'] = 1
+        elif status == 200:
+            counters['download_count'] = 1
+            counters['bytes_served'] = response.content_length or resource_data.get('file_size') or 0
+        if counters:
+            self.db.record_resource_download(str(resource_data['_id']), counters)
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, Response, send_file, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import SelectMultipleField, SubmitField, StringField, TextAreaField, SelectField
@@ -7,10 +7,19 @@ import os
 from werkzeug.utils import secure_filename
 from app.models import User, Toli, Program, Resource, Message
 from app.forms import AdminManageToliForm, AssignLocationForm, AddStudentForm, UploadResourceForm, SendMessageForm
-from app.database import MongoDB
+from app.database import MongoDB, MEMBER_PROJECTION, parallel_fetch
 from datetime import datetime, timedelta  # Add timedelta here
 from app.data_sync import DataSync
+from app.consistency_audit import ConsistencyAudit, CHECKS as AUDIT_CHECKS
 from app.database_fixes import DatabaseFixes
+from app.toli_allocation import ToliAllocator
+from app.messaging import MessageDelivery, SELECTORS as MESSAGE_SELECTORS
+from app.http_cache import conditional_json
+from app.chunked_upload import ChunkedUpload, UPLOAD_ERRORS, staging_dir
+from app.blob_store import BlobStore, get_blob_store
+from app.exports import EXPORTS, EXPORT_ERRORS, ExportJobs, exports_dir, parse_filters, stream_csv
+from app.archives import program_archive, send_archive, toli_archive
+from app.report_rendering import get_report_renderer
 import json
 
 admin = Blueprint('admin', __name__)
@@ -18,24 +27,13 @@ db = MongoDB()
 
 def save_photo(photo):
     if photo:
-        filename = secure_filename(photo.filename)
-        # Create directory if it doesn't exist
-        photo_dir = os.path.join(current_app.root_path, 'static/uploads/passport_photos')
-        os.makedirs(photo_dir, exist_ok=True)
-        photo_path = os.path.join(photo_dir, filename)
-        photo.save(photo_path)
-        return f'uploads/passport_photos/{filename}'
+        # Stored by content, so photos sharing a file name no longer overwrite each other
+        return get_blob_store(db).put(photo)
     return None
 
 def save_profile_photo(photo):
     if photo:
-        filename = secure_filename(photo.filename)
-        # Create directory if it doesn't exist
-        photo_dir = os.path.join(current_app.root_path, 'static/uploads/profile_photos')
-        os.makedirs(photo_dir, exist_ok=True)
-        photo_path = os.path.join(photo_dir, filename)
-        photo.save(photo_path)
-        return f'uploads/profile_photos/{filename}'
+        return get_blob_store(db).put(photo)
     return None
 
 # Cities data
@@ -91,6 +89,14 @@ CITIES = [
     {"City/Town": "Chandigarh", "State": "Chandigarh"}
 ]
 
+# Messages for membership service error codes
+MEMBERSHIP_ERRORS = {
+    'not_found': 'Student not found',
+    'already_assigned': 'Student is already in a toli',
+    'toli_full': 'Toli is already full (4/4 members)',
+    'toli_not_found': 'Toli not found'
+}
+
 # ==================== DASHBOARD & MAIN ROUTES ====================
 
 @admin.route('/data-sync')
@@ -100,11 +106,112 @@ def data_sync_dashboard():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.home'))
     
-    data_sync = DataSync()
-    consistency_check = data_sync.verify_data_consistency()
+    # Render the cached audit result; audits run in the background
+    audit_result = ConsistencyAudit(db).get_last_result()
     
     return render_template('admin/data_sync.html', 
-                         consistency_check=consistency_check)
+                         audit_result=audit_result)
+
+@admin.route('/data-sync/audit', methods=['POST'])
+@login_required
+def run_consistency_audit():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    started = ConsistencyAudit(db).start_background_run()
+    if started:
+        return jsonify({'success': True, 'message': 'Consistency audit started'})
+    return jsonify({'success': False, 'error': 'An audit is already running'}), 409
+
+@admin.route('/api/data-sync/audit')
+@login_required
+def api_consistency_audit():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    result = ConsistencyAudit(db).get_last_result()
+    if not result:
+        return jsonify({'status': 'never_run'})
+    
+    result.pop('_id', None)
+    for key in ('started_at', 'completed_at'):
+        if result.get(key):
+            result[key] = result[key].isoformat()
+    return jsonify(result)
+
+@admin.route('/api/data-sync/audit/<check>')
+@login_required
+def api_consistency_findings(check):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if check not in AUDIT_CHECKS:
+        return jsonify({'error': 'Unknown check'}), 404
+    
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        return jsonify(ConsistencyAudit(db).get_findings(check, page=page, per_page=per_page))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin.route('/api/allocation/preview', methods=['POST'])
+@login_required
+def preview_toli_allocation():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    options = request.get_json(silent=True) or {}
+    try:
+        plan = ToliAllocator(db).preview(
+            created_by=current_user.id,
+            session_year=options.get('session_year') or None,
+            strict_location=bool(options.get('strict_location')),
+            create_new=bool(options.get('create_new'))
+        )
+        if plan is None:
+            return jsonify({'error': 'Database not connected'}), 503
+        return jsonify(plan)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin.route('/api/allocation/<plan_id>/commit', methods=['POST'])
+@login_required
+def commit_toli_allocation(plan_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    result, error = ToliAllocator(db).commit(plan_id, committed_by=current_user.id)
+    if error:
+        return jsonify({'success': False, 'error': error}), 409
+    return jsonify({'success': True, 'result': result})
+
+@admin.route('/api/messages/deliver', methods=['POST'])
+@login_required
+def api_deliver_message():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    content = data.get('content')
+    selector = data.get('selector', 'all')
+    if not content:
+        return jsonify({'error': 'Message content is required'}), 400
+    if selector not in MESSAGE_SELECTORS:
+        return jsonify({'error': f"Selector must be one of: {', '.join(MESSAGE_SELECTORS)}"}), 400
+    
+    try:
+        summary = MessageDelivery(db).send(
+            title=data.get('title', 'Message from Admin'),
+            content=content,
+            sender_id=current_user.id,
+            selector=selector,
+            value=data.get('value')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'success': summary['delivered'] > 0, 'summary': summary})
 
 @admin.route('/sync-toli-members', methods=['POST'])
 @login_required
@@ -148,48 +255,54 @@ def refresh_data():
 
 # Add these helper functions in admin.py
 
-def get_recent_activities():
-    """Get real recent activities from database"""
+def recent_activity_reads():
+    """Independent reads behind the recent activity feed (last 24 hours)"""
+    return {
+        'recent_tolis': lambda: db.get_recent_tolis(hours=24),
+        'recent_students': lambda: db.get_recent_students(hours=24),
+        'recent_programs': lambda: db.get_recent_programs(hours=24)
+    }
+
+def get_recent_activities(recent=None):
+    """
+    Get real recent activities from database
+
+    `recent` holds results already fetched from recent_activity_reads()
+    (the dashboard fetches them with its other queries).
+    """
+    if recent is None:
+        reads = recent_activity_reads()
+        recent = parallel_fetch(reads, fallbacks={name: [] for name in reads})
+
     recent_activities = []
     
-    try:
-        # Get recent toli registrations (last 24 hours)
-        recent_tolis = db.get_recent_tolis(hours=24)
-        for toli in recent_tolis[:3]:
-            recent_activities.append({
-                'type': 'toli',
-                'icon': 'users',
-                'message': f'New toli registration: {toli.get("name", "Unknown")}',
-                'time': get_time_ago(toli.get('created_at'))
-            })
-    except Exception as e:
-        print(f"Error getting recent tolis: {e}")
+    # Recent toli registrations
+    for toli in (recent.get('recent_tolis') or [])[:3]:
+        recent_activities.append({
+            'type': 'toli',
+            'icon': 'users',
+            'message': f'New toli registration: {toli.get("name", "Unknown")}',
+            'time': get_time_ago(toli.get('created_at'))
+        })
     
-    try:
-        # Get recent student registrations
-        recent_students = db.get_recent_students(hours=24)
-        if recent_students:
-            recent_activities.append({
-                'type': 'student',
-                'icon': 'user-plus',
-                'message': f'{len(recent_students)} new students registered',
-                'time': 'Today'
-            })
-    except Exception as e:
-        print(f"Error getting recent students: {e}")
+    # Recent student registrations
+    recent_students = recent.get('recent_students') or []
+    if recent_students:
+        recent_activities.append({
+            'type': 'student',
+            'icon': 'user-plus',
+            'message': f'{len(recent_students)} new students registered',
+            'time': 'Today'
+        })
     
-    try:
-        # Get recent programs
-        recent_programs = db.get_recent_programs(hours=24)
-        for program in recent_programs[:2]:
-            recent_activities.append({
-                'type': 'program',
-                'icon': 'calendar-check',
-                'message': f'Program completed: {program.get("title", "Unknown")}',
-                'time': get_time_ago(program.get('created_at'))
-            })
-    except Exception as e:
-        print(f"Error getting recent programs: {e}")
+    # Recent programs
+    for program in (recent.get('recent_programs') or [])[:2]:
+        recent_activities.append({
+            'type': 'program',
+            'icon': 'calendar-check',
+            'message': f'Program completed: {program.get("title", "Unknown")}',
+            'time': get_time_ago(program.get('created_at'))
+        })
     
     # If no recent activities, show some default ones
     if not recent_activities:
@@ -234,6 +347,21 @@ def get_program_types_distribution():
         # Return empty data on error
         return ['Error Loading Data'], [0]
 
+# Dashboard stat queries slower than this are reported in the server log
+SLOW_STAT_QUERY_MS = 500
+
+def dashboard_stat_reads():
+    """Independent reads behind the dashboard statistics"""
+    return {
+        'total_students': lambda: db.count_users_by_role('student'),
+        'active_students': db.count_active_students,
+        'total_tolis': db.count_tolis,
+        'active_tolis': db.count_active_tolis,
+        'pending_tolis': db.count_pending_tolis,
+        'total_programs': db.count_programs,
+        'total_resources': db.count_resources
+    }
+
 def get_time_ago(timestamp):
     """Convert timestamp to human readable time ago"""
     if not timestamp:
@@ -264,33 +392,24 @@ def dashboard():
         return redirect(url_for('main.home'))
     
     try:
-        # Enhanced statistics
-        total_students = db.count_users_by_role('student')
-        total_tolis = db.count_tolis()
-        active_tolis = db.count_active_tolis()
-        pending_tolis = len([t for t in db.get_all_tolis() if t.get('status') == 'pending'])
-        total_resources = db.count_resources()
-        total_programs = db.count_programs()
-        
-        # Get student login stats
-        students = db.get_all_users('student')
-        active_students = len([s for s in students if s.get('last_login')])
-        
-        stats = {
-            'total_students': total_students,
-            'active_students': active_students,
-            'total_tolis': total_tolis,
-            'active_tolis': active_tolis,
-            'pending_tolis': pending_tolis,
-            'total_programs': total_programs,
-            'total_resources': total_resources
-        }
+        # Statistics, recent activity and the program type chart are
+        # independent queries: run them concurrently
+        stat_reads = dashboard_stat_reads()
+        activity_reads = recent_activity_reads()
+        results = parallel_fetch(
+            dict(stat_reads, **activity_reads, program_types=get_program_types_distribution),
+            fallbacks=dict({name: 0 for name in stat_reads},
+                           **{name: [] for name in activity_reads},
+                           program_types=(['Error Loading Data'], [0]))
+        )
+        
+        stats = {name: results[name] for name in stat_reads}
         
         # Get real recent activities
-        recent_activities = get_recent_activities()
+        recent_activities = get_recent_activities(results)
         
         # Get real program types distribution
-        program_types_labels, program_types_data = get_program_types_distribution()
+        program_types_labels, program_types_data = results['program_types']
         
         return render_template('admin/dashboard.html', 
                              stats=stats,
@@ -372,7 +491,10 @@ def admin_profile():
         # Handle profile photo upload
         profile_photo_path = admin_data.get('profile_photo', '')
         if profile_form.profile_photo.data:
-            profile_photo_path = save_profile_photo(profile_form.profile_photo.data)
+            new_photo = save_profile_photo(profile_form.profile_photo.data)
+            if new_photo:
+                get_blob_store(db).release(profile_photo_path)
+                profile_photo_path = new_photo
         
         # Update admin profile
         update_data = {
@@ -503,17 +625,20 @@ def manage_tolis():
     
     # Get all tolis with their details
     all_tolis_data = db.get_all_tolis()
+    program_counts = db.count_programs_by_toli()
     tolis = []
     
     for toli_data in all_tolis_data:
         toli = Toli(toli_data)
         
-        # Get leader info
+        # Leader info is embedded in the toli document
         leader = None
-        if toli.leader_id:
-            leader_data = db.get_user_by_id(toli.leader_id)
-            if leader_data:
-                leader = User(leader_data)
+        if toli.leader_id and toli_data.get('leader_name'):
+            leader = {
+                'name': toli_data.get('leader_name'),
+                'scholar_no': toli_data.get('leader_scholar_no', ''),
+                'email': toli_data.get('leader_email', '')
+            }
         
         # Get member count from members list (based on your Toli model)
         member_count = len(toli.members) if toli.members else 0
@@ -523,9 +648,6 @@ def manage_tolis():
         city = location.get('city', 'Not assigned') if location else 'Not assigned'
         state = location.get('state', '') if location else ''
         
-        # Get programs for this toli
-        programs = db.get_programs_by_toli(toli.id)
-        
         tolis.append({
             'toli': toli,
             'toli_data': toli_data,
@@ -535,13 +657,12 @@ def manage_tolis():
             'city': city,
             'state': state,
             'session_year': toli_data.get('session_year', '2024'),
-            'programs_completed': len(programs),
+            'programs_completed': program_counts.get(toli.id, 0),
             'status': toli_data.get('status', 'pending')
         })
     
     # Get students without tolis for statistics
-    all_students = db.get_all_users('student')
-    students_without_toli = [s for s in all_students if not s.get('toli_id')]
+    students_without_toli = db.get_students_without_toli({'_id': 1})
     
     return render_template('admin/manage_tolis.html', 
                          tolis=tolis, 
@@ -895,11 +1016,7 @@ def add_members_to_toli(toli_id):
         return redirect(url_for('admin.manage_tolis'))
     
     # Get students without tolis
-    all_students = db.get_all_users('student')
-    available_students = [
-        student for student in all_students 
-        if not student.get('toli_id')  # Students without toli assignment
-    ]
+    available_students = db.get_students_without_toli(MEMBER_PROJECTION)
     
     # Create a simple form for member selection
     class SimpleMemberForm(FlaskForm):
@@ -926,32 +1043,14 @@ def add_members_to_toli(toli_id):
                                  form=form, toli=toli, available_slots=available_slots,
                                  available_students=available_students)
         
-        # Update students with toli_id
-        success_count = 0
-        for student_id in selected_student_ids:
-            # Update student's toli_id
-            student_update = db.update_user(student_id, {'toli_id': toli_id})
-            if student_update:
-                # Add student to toli's members list
-                toli_data = db.get_toli_by_id(toli_id)
-                if toli_data:
-                    toli = Toli(toli_data)
-                    current_members = toli.members.copy() if toli.members else []
-                    
-                    student_data = db.get_user_by_id(student_id)
-                    if student_data:
-                        new_member = {
-                            'name': student_data['name'],
-                            'scholar_no': student_data['scholar_no'],
-                            'course': student_data['course'],
-                            'email': student_data['email'],
-                            'is_leader': False
-                        }
-                        current_members.append(new_member)
-                        
-                        # Update toli with new member
-                        db.update_toli(toli_id, {'members': current_members})
-                        success_count += 1
+        # Add all selected students in a constant number of round trips
+        added, error = db.assign_students_to_toli(toli_id, student_ids=selected_student_ids)
+        success_count = len(added)
+        if error:
+            flash(MEMBERSHIP_ERRORS.get(error, 'Error adding members to toli.'), 'danger')
+            return render_template('admin/add_members_to_toli.html', 
+                                 form=form, toli=toli, available_slots=available_slots,
+                                 available_students=available_students)
         
         if success_count > 0:
             flash(f'Successfully added {success_count} member(s) to {toli.name}!', 'success')
@@ -1008,23 +1107,20 @@ def add_student():
     
     form = AddStudentForm()
     
-    # Get available tolis with less than 4 members
+    # Get available tolis with less than 4 members (indexed, projected query)
     available_tolis = []
-    all_tolis = db.get_all_tolis()
-    for toli_data in all_tolis:
-        toli = Toli(toli_data)
-        member_count = len(toli.members) if toli.members else 0
-        if member_count < 4:
-            location_info = ""
-            if toli.location and toli.location.get('city'):
-                location_info = f" - {toli.location.get('city')}"
-                if toli.location.get('state'):
-                    location_info += f", {toli.location.get('state')}"
-            
-            available_tolis.append({
-                'id': toli.id,
-                'name': f"{toli.name}{location_info} ({member_count} members)"
-            })
+    for toli_data in db.get_open_tolis():
+        location = toli_data.get('location') or {}
+        location_info = ""
+        if location.get('city'):
+            location_info = f" - {location.get('city')}"
+            if location.get('state'):
+                location_info += f", {location.get('state')}"
+        
+        available_tolis.append({
+            'id': str(toli_data['_id']),
+            'name': f"{toli_data.get('name', '')}{location_info} ({toli_data.get('member_count', 0)} members)"
+        })
     
     # Populate toli choices
     form.toli_id.choices = [('', 'Select Toli (Optional)')] + [
@@ -1043,7 +1139,8 @@ def add_student():
                 'dob': datetime.combine(form.dob.data, datetime.min.time()),
                 'course': form.course.data,
                 'contact': form.contact.data,
-                'toli_id': form.toli_id.data if form.toli_id.data else None,
+                # toli_id is set only once the toli has accepted the new member
+                'toli_id': None,
                 'role': 'student',
                 'created_at': datetime.utcnow()
             }
@@ -1051,26 +1148,15 @@ def add_student():
             student = User(student_data)
             student.set_password(form.scholar_no.data)  # Default password
             
-            if db.create_user(student.to_dict()):
+            student_id = db.create_user(student.to_dict())
+            if student_id:
                 # If toli is selected, add student to toli's members list
                 if form.toli_id.data:
-                    toli_data = db.get_toli_by_id(form.toli_id.data)
-                    if toli_data:
-                        toli = Toli(toli_data)
-                        current_members = toli.members.copy() if toli.members else []
-                        
-                        # Add new member to toli
-                        new_member = {
-                            'name': form.name.data,
-                            'scholar_no': form.scholar_no.data,
-                            'course': form.course.data,
-                            'email': form.email.data,
-                            'is_leader': False
-                        }
-                        current_members.append(new_member)
-                        
-                        # Update toli with new member
-                        db.update_toli(form.toli_id.data, {'members': current_members})
+                    new_member = db.build_toli_member(student_data)
+                    if db.add_toli_members(form.toli_id.data, [new_member]):
+                        db.set_users_toli([student_id], form.toli_id.data)
+                    else:
+                        flash('Selected toli is already full; student was added without a toli.', 'warning')
                 
                 flash(f'Student {student.name} added successfully!', 'success')
                 return redirect(url_for('admin.dashboard'))
@@ -1106,11 +1192,15 @@ def upload_resource():
         # Handle file upload
         if form.file.data:
             from app.utils import save_file, get_file_size
-            filename = save_file(form.file.data, 'resources')
+            filename = save_file(form.file.data)
             if filename:
                 resource_data['file_path'] = filename
                 resource_data['file_name'] = form.file.data.filename
                 resource_data['file_size'] = get_file_size(form.file.data)
+                # The blob key is the content hash, so the first download already has its ETag
+                saved_path = get_blob_store(db).absolute_path(filename)
+                resource_data['content_hash'] = BlobStore.digest_of(filename)
+                resource_data['file_mtime'] = int(os.path.getmtime(saved_path))
         
         # Handle external link
         if form.external_link.data:
@@ -1125,6 +1215,194 @@ def upload_resource():
     
     return render_template('admin/upload_resource.html', form=form)
 
+# ==================== CHUNKED UPLOAD API ====================
+
+def get_chunked_upload():
+    return ChunkedUpload(db, staging_dir(current_app), get_blob_store(db))
+
+def upload_response(result, error, success_status=200):
+    """JSON response for a chunked upload call"""
+    if error:
+        message, status = UPLOAD_ERRORS.get(error, ('Upload failed', 400))
+        return jsonify(dict(result or {}, success=False, error=message, code=error)), status
+    return jsonify(dict(result, success=True)), success_status
+
+@admin.route('/api/uploads', methods=['POST'])
+@login_required
+def init_chunked_upload():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    result, error = get_chunked_upload().init(
+        filename=data.get('filename'),
+        size=data.get('size'),
+        resource_type=data.get('resource_type', 'other'),
+        title=data.get('title'),
+        description=data.get('description', ''),
+        created_by=current_user.id,
+        sha256=data.get('sha256')
+    )
+    return upload_response(result, error, success_status=201)
+
+@admin.route('/api/uploads/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_status(upload_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    result, error = get_chunked_upload().status(upload_id)
+    return upload_response(result, error)
+
+@admin.route('/api/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def append_chunked_upload(upload_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Upload-Offset header is required'}), 400
+    
+    # The body is streamed to disk; it is never read into memory as a whole
+    result, error = get_chunked_upload().append(upload_id, offset, request.stream, request.content_length)
+    return upload_response(result, error)
+
+@admin.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(upload_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        result, error = get_chunked_upload().complete(upload_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return upload_response(result, error)
+
+@admin.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def abort_chunked_upload(upload_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    result, error = get_chunked_upload().abort(upload_id)
+    return upload_response(result, error)
+
+# ==================== BULK EXPORTS ====================
+
+def get_export_jobs():
+    return ExportJobs(db, exports_dir(current_app))
+
+def export_response(result, error, success_status=200):
+    """JSON response for an export job call"""
+    if error:
+        message, status = EXPORT_ERRORS.get(error, ('Export failed', 400))
+        return jsonify(dict(result or {}, success=False, error=message, code=error)), status
+    return jsonify(dict(result, success=True)), success_status
+
+@admin.route('/exports')
+@login_required
+def exports():
+    if current_user.role != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    session_years = sorted(str(row['_id']) for row in db.get_tolis_by_session() if row.get('_id'))
+    return render_template('admin/exports.html',
+                         exports=list(EXPORTS),
+                         session_years=session_years,
+                         jobs=get_export_jobs().recent())
+
+@admin.route('/export/<kind>.csv')
+@login_required
+def stream_export_csv(kind):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    if kind not in EXPORTS:
+        return export_response(None, 'unknown_export')
+    if not db.is_connected():
+        return export_response(None, 'not_connected')
+    
+    filters, error = parse_filters(request.args)
+    if error:
+        return export_response(None, error)
+    
+    # Rows are written as the cursor yields them; nothing is buffered whole
+    filename = f"{kind}_{datetime.utcnow().strftime('%Y%m%d_%H%M')}.csv"
+    return Response(stream_with_context(stream_csv(db, kind, filters)),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
+
+@admin.route('/api/exports', methods=['POST'])
+@login_required
+def start_export():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    filters, error = parse_filters(data)
+    if error:
+        return export_response(None, error)
+    
+    result, error = get_export_jobs().start(
+        kind=data.get('export'),
+        fmt=data.get('format', 'xlsx'),
+        filters=filters,
+        created_by=current_user.id
+    )
+    return export_response(result, error, success_status=202)
+
+@admin.route('/api/exports/<job_id>')
+@login_required
+def export_status(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    result, error = get_export_jobs().status(job_id)
+    return export_response(result, error)
+
+@admin.route('/exports/<job_id>/download')
+@login_required
+def download_export(job_id):
+    if current_user.role != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    result, error = get_export_jobs().file(job_id)
+    if error:
+        flash(EXPORT_ERRORS.get(error, ('Export failed', 400))[0], 'warning')
+        return redirect(url_for('admin.exports'))
+    path, name, mimetype = result
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=name)
+
+# ==================== PROGRAM ARCHIVES ====================
+
+@admin.route('/toli/<toli_id>/archive.zip')
+@login_required
+def download_toli_archive(toli_id):
+    if current_user.role != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    archive, error = toli_archive(db, toli_id, os.path.join(current_app.root_path, 'static'),
+                                  get_report_renderer())
+    return send_archive(archive, error, f"toli_{toli_id}.zip",
+                        url_for('admin.view_toli_programs', toli_id=toli_id))
+
+@admin.route('/program/<program_id>/archive.zip')
+@login_required
+def download_program_archive(program_id):
+    if current_user.role != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    archive, error = program_archive(db, program_id, os.path.join(current_app.root_path, 'static'),
+                                     get_report_renderer())
+    return send_archive(archive, error, f"program_{program_id}.zip", url_for('admin.manage_tolis'))
+
 @admin.route('/resources')
 @login_required
 def view_resources():
@@ -1160,21 +1438,29 @@ def send_message():
     
     form = SendMessageForm()
     students = db.get_all_users('student')
-    form.receiver_id.choices = [('all', 'All Students')] + [(str(student['_id']), student['name']) for student in students]
+    courses = sorted({student.get('course') for student in students if student.get('course')})
+    form.receiver_id.choices = [('all', 'All Students')] + \
+        [(f'course:{course}', f'Course: {course}') for course in courses] + \
+        [(str(student['_id']), student['name']) for student in students]
     
     if form.validate_on_submit():
-        message_data = {
-            'title': form.title.data,
-            'content': form.content.data,
-            'sender_id': current_user.id,
-            'receiver_id': None if form.receiver_id.data == 'all' else form.receiver_id.data,
-            'created_at': datetime.utcnow(),
-            'is_read': False
-        }
-        
-        message = Message(message_data)
-        if db.create_message(message.to_dict()):
-            flash('Message sent successfully!', 'success')
+        receiver = form.receiver_id.data
+        if receiver == 'all':
+            selector, value = 'all', None
+        elif receiver.startswith('course:'):
+            selector, value = 'course', receiver.split(':', 1)[1]
+        else:
+            selector, value = 'users', [receiver]
+        
+        summary = MessageDelivery(db).send(
+            title=form.title.data,
+            content=form.content.data,
+            sender_id=current_user.id,
+            selector=selector,
+            value=value
+        )
+        if summary['delivered'] > 0:
+            flash(f"Message sent to {summary['delivered']} student(s)!", 'success')
             return redirect(url_for('admin.dashboard'))
         else:
             flash('Error sending message.', 'danger')
@@ -1185,6 +1471,7 @@ def send_message():
 
 @admin.route('/api/toli-stats')
 @login_required
+@conditional_json('tolis', 'users', 'programs')
 def api_toli_stats():
     if current_user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
@@ -1293,28 +1580,13 @@ def api_dashboard_live_stats():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
-        # Enhanced statistics
-        total_students = db.count_users_by_role('student')
-        total_tolis = db.count_tolis()
-        active_tolis = db.count_active_tolis()
-        pending_tolis = len([t for t in db.get_all_tolis() if t.get('status') == 'pending'])
-        total_resources = db.count_resources()
-        total_programs = db.count_programs()
-        
-        # Get student login stats
-        students = db.get_all_users('student')
-        active_students = len([s for s in students if s.get('last_login')])
+        stat_reads = dashboard_stat_reads()
+        results = parallel_fetch(stat_reads, fallbacks={name: 0 for name in stat_reads})
         
-        stats = {
-            'total_students': total_students,
-            'active_students': active_students,
-            'total_tolis': total_tolis,
-            'active_tolis': active_tolis,
-            'pending_tolis': pending_tolis,
-            'total_programs': total_programs,
-            'total_resources': total_resources,
-            'last_updated': datetime.utcnow().isoformat()
-        }
+        slow = {name: ms for name, ms in results.timings.items() if ms > SLOW_STAT_QUERY_MS}
+        if slow:
+            print(f"⚠️ Slow dashboard stat queries (ms): {slow}")
+        stats = dict(results, last_updated=datetime.utcnow().isoformat())
         
         return jsonify(stats)
     
@@ -1324,6 +1596,7 @@ def api_dashboard_live_stats():
 
 @admin.route('/api/dashboard/program-types')
 @login_required
+@conditional_json('programs')
 def api_program_types():
     """Get real-time program types distribution for chart"""
     if current_user.role != 'admin':
@@ -1351,16 +1624,22 @@ def api_live_stats():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
+        results = parallel_fetch({
+            'tolis': db.get_all_tolis,
+            'students': lambda: db.get_all_users('student'),
+            'programs': db.get_all_programs
+        }, fallbacks={'tolis': [], 'students': [], 'programs': []})
+        
         # Get all tolis
-        all_tolis = db.get_all_tolis()
+        all_tolis = results['tolis']
         
         # Count students
-        all_students = db.get_all_users('student')
+        all_students = results['students']
         students_with_toli = sum(1 for s in all_students if s.get('toli_id'))
         students_without_toli = len(all_students) - students_with_toli
         
         # Count programs
-        all_programs = db.get_all_programs()
+        all_programs = results['programs']
         
         return jsonify({
             'success': True,
@@ -1402,6 +1681,7 @@ def api_recent_activities():
 
 @admin.route('/api/analytics/map-data')
 @login_required
+@conditional_json('tolis', max_age=60)
 def api_map_data():
     if current_user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
@@ -1484,42 +1764,17 @@ def assign_leader(toli_id):
     
     scholar_no = request.json.get('scholar_no')
     
-    # Get toli data
-    toli_data = db.get_toli_by_id(toli_id)
-    if not toli_data:
-        return jsonify({'error': 'Toli not found'}), 404
-    
-    toli = Toli(toli_data)
-    
-    # Update all members to remove leader status and set new leader
-    updated_members = []
-    leader_found = False
-    
-    for member in toli.members:
-        if isinstance(member, dict):
-            updated_member = member.copy()
-            # Remove leader status from all members
-            updated_member['is_leader'] = (member.get('scholar_no') == scholar_no)
-            if updated_member['is_leader']:
-                leader_found = True
-            updated_members.append(updated_member)
-    
-    if not leader_found:
-        return jsonify({'error': 'Member not found in toli'}), 404
-    
     # Find the student and set as leader_id
     student = db.get_user_by_scholar_no(scholar_no)
     leader_id = student['_id'] if student else None
     
-    update_data = {
-        'members': updated_members,
-        'leader_id': leader_id
-    }
-    
-    if db.update_toli(toli_id, update_data):
+    # Flip is_leader on all members in a single update
+    if db.set_toli_leader(toli_id, scholar_no, leader_id, leader=student):
         return jsonify({'success': True, 'message': 'Leader assigned successfully'})
-    else:
-        return jsonify({'error': 'Failed to assign leader'}), 500
+    
+    if not db.get_toli_by_id(toli_id):
+        return jsonify({'error': 'Toli not found'}), 404
+    return jsonify({'error': 'Member not found in toli'}), 404
 
 @admin.route('/toli/<toli_id>/send-message', methods=['POST'])
 @login_required
@@ -1538,32 +1793,23 @@ def send_toli_message(toli_id):
     if not toli_data:
         return jsonify({'error': 'Toli not found'}), 404
     
-    toli = Toli(toli_data)
+    # Deliver to every student in the toli with batched writes
+    summary = MessageDelivery(db).send(
+        title=f"[{toli_data.get('name', '')}] {title}",
+        content=content,
+        sender_id=current_user.id,
+        selector='toli',
+        value=toli_id
+    )
     
-    # Send message to each member
-    success_count = 0
-    if toli.members:
-        for member in toli.members:
-            if isinstance(member, dict):
-                # Find student by email or scholar_no
-                student = db.get_user_by_email(member.get('email')) or db.get_user_by_scholar_no(member.get('scholar_no'))
-                if student:
-                    message_data = {
-                        'title': f"[{toli.name}] {title}",
-                        'content': content,
-                        'sender_id': current_user.id,
-                        'receiver_id': student['_id'],
-                        'created_at': datetime.utcnow(),
-                        'is_read': False
-                    }
-                    
-                    if db.create_message(message_data):
-                        success_count += 1
-    
-    if success_count > 0:
-        return jsonify({'success': True, 'message': f'Message sent to {success_count} members'})
+    if summary['delivered'] > 0:
+        return jsonify({
+            'success': True,
+            'message': f"Message sent to {summary['delivered']} members",
+            'summary': summary
+        })
     else:
-        return jsonify({'error': 'Failed to send message to any members'}), 500
+        return jsonify({'error': 'Failed to send message to any members', 'summary': summary}), 500
 
 @admin.route('/toli/<toli_id>/stats')
 @login_required
@@ -1606,50 +1852,14 @@ def add_student_to_toli(toli_id):
     
     scholar_no = request.json.get('scholar_no')
     
-    # Get student
-    student = db.get_user_by_scholar_no(scholar_no)
-    if not student:
-        return jsonify({'error': 'Student not found'}), 404
-    
-    # Check if student is already in a toli
-    if student.get('toli_id'):
+    added, error = db.assign_students_to_toli(toli_id, scholar_nos=[scholar_no])
+    if error:
+        status = 404 if error in ('not_found', 'toli_not_found') else 400
+        return jsonify({'error': MEMBERSHIP_ERRORS.get(error, 'Failed to add student to toli')}), status
+    if not added:
         return jsonify({'error': 'Student is already in a toli'}), 400
     
-    # Get toli
-    toli_data = db.get_toli_by_id(toli_id)
-    if not toli_data:
-        return jsonify({'error': 'Toli not found'}), 404
-    
-    toli = Toli(toli_data)
-    
-    # Check if toli has space (4 members max)
-    if len(toli.members) >= 4:
-        return jsonify({'error': 'Toli is already full (4/4 members)'}), 400
-    
-    # Update student with toli_id
-    student_update = db.update_user(student['_id'], {'toli_id': toli_id})
-    if not student_update:
-        return jsonify({'error': 'Failed to update student'}), 500
-    
-    # Add student to toli's members list
-    current_members = toli.members.copy() if toli.members else []
-    new_member = {
-        'name': student['name'],
-        'scholar_no': student['scholar_no'],
-        'course': student['course'],
-        'email': student['email'],
-        'is_leader': False
-    }
-    current_members.append(new_member)
-    
-    # Update toli with new member
-    toli_update = db.update_toli(toli_id, {'members': current_members})
-    if toli_update:
-        return jsonify({'success': True, 'message': 'Student added to toli successfully'})
-    else:
-        # Rollback student update if toli update fails
-        db.update_user(student['_id'], {'toli_id': None})
-        return jsonify({'error': 'Failed to add student to toli'}), 500
+    return jsonify({'success': True, 'message': 'Student added to toli successfully'})
 
 @admin.route('/toli/<toli_id>/remove-member', methods=['POST'])
 @login_required
@@ -1659,36 +1869,10 @@ def remove_member_from_toli(toli_id):
     
     scholar_no = request.json.get('scholar_no')
     
-    # Get toli
-    toli_data = db.get_toli_by_id(toli_id)
-    if not toli_data:
-        return jsonify({'error': 'Toli not found'}), 404
-    
-    toli = Toli(toli_data)
-    
-    # Remove member from toli members list
-    updated_members = []
-    member_removed = False
-    
-    for member in toli.members:
-        if isinstance(member, dict) and member.get('scholar_no') != scholar_no:
-            updated_members.append(member)
-        else:
-            member_removed = True
-    
-    if not member_removed:
+    # Pull the member and clear the student's toli_id
+    if not db.remove_toli_member(toli_id, scholar_no):
         return jsonify({'error': 'Member not found in toli'}), 404
     
-    # Update toli members
-    toli_update = db.update_toli(toli_id, {'members': updated_members})
-    if not toli_update:
-        return jsonify({'error': 'Failed to remove member from toli'}), 500
-    
-    # Update student's toli_id to None
-    student = db.get_user_by_scholar_no(scholar_no)
-    if student:
-        db.update_user(student['_id'], {'toli_id': None})
-    
     return jsonify({'success': True, 'message': 'Member removed from toli successfully'})
 
 # ==================== HELPER FUNCTIONS ====================
@@ -2004,6 +2188,7 @@ def calculate_program_analytics(programs):
 
 @admin.route('/api/toli/<toli_id>/programs')
 @login_required
+@conditional_json('programs')
 def get_toli_programs_api(toli_id):
     """Get fresh list of programs for a specific toli (API endpoint)"""
     if current_user.role != 'admin':
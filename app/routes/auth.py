@@ -1,23 +1,18 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import login_user, logout_user, current_user, login_required
 from app.models import User
 from app.forms import LoginForm, StudentSignupForm, StudentLoginForm
 from app.database import MongoDB
+from app.blob_store import get_blob_store
 from datetime import datetime
-import os
-from werkzeug.utils import secure_filename
 
 auth = Blueprint('auth', __name__)
 db = MongoDB()
 
 def save_profile_photo(photo):
     if photo:
-        filename = secure_filename(photo.filename)
-        photo_dir = os.path.join(current_app.root_path, 'static/uploads/profile_photos')
-        os.makedirs(photo_dir, exist_ok=True)
-        photo_path = os.path.join(photo_dir, filename)
-        photo.save(photo_path)
-        return f'uploads/profile_photos/{filename}'
+        # Stored by content, so photos sharing a file name no longer overwrite each other
+        return get_blob_store(db).put(photo)
     return None
 
 @auth.route('/login', methods=['GET', 'POST'])
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, abort
 from app.database import MongoDB
+from app.media import ALLOWED_FORMATS, ALLOWED_WIDTHS, DEFAULT_FORMAT, get_media_cache
 from app.models import Newsletter, Program 
+from app.report_documents import render_document
 
 main = Blueprint('main', __name__)
 db = MongoDB() 
@@ -12,33 +14,21 @@ def home():
     """Home page with recent newsletters and gallery preview"""
     try:
         # Get recent newsletters (last 3)
-        newsletters_data = db.get_all_newsletters()
-        recent_newsletters = [Newsletter(newsletter) for newsletter in newsletters_data[:3]]
+        newsletters_data = db.get_recent_newsletters(limit=3)
+        recent_newsletters = [Newsletter(newsletter) for newsletter in newsletters_data]
         
-        # Get recent gallery images (last 6)
-        all_programs = db.get_all_programs()
+        # Get recent gallery images (last 6); toli names are embedded in programs
         recent_gallery_images = []
         
-        for program_data in all_programs[:6]:
-            program = Program(program_data)
-            images = getattr(program, 'images', [])
-            
-            if images:
-                # Get toli name
-                toli_name = "Unknown Toli"
-                if hasattr(program, 'toli_id') and program.toli_id:
-                    toli_data = db.get_toli_by_id(program.toli_id)
-                    if toli_data:
-                        toli_name = toli_data.get('name', 'Unknown Toli')
-                
-                # Take first image from each program
-                recent_gallery_images.append({
-                    'image_path': images[0],
-                    'program_title': program.title,
-                    'program_type': getattr(program, 'program_type', 'General'),
-                    'location': getattr(program, 'location', 'Unknown Location'),
-                    'toli_name': toli_name
-                })
+        for program_data in db.get_gallery_programs(limit=6):
+            # Take first image from each program
+            recent_gallery_images.append({
+                'image_path': program_data['images'][0],
+                'program_title': program_data.get('title', ''),
+                'program_type': program_data.get('program_type') or 'General',
+                'location': program_data.get('location') or 'Unknown Location',
+                'toli_name': program_data.get('toli_name') or 'Unknown Toli'
+            })
         
         return render_template('main/home.html', 
                              recent_newsletters=recent_newsletters,
@@ -59,36 +49,40 @@ def about():
 def gallery():
     """Display gallery with all program images"""
     try:
-        # Get all programs with images
-        all_programs = db.get_all_programs()
-        
+        # Get all programs with images; toli names are embedded in programs
         gallery_images = []
-        for program_data in all_programs:
-            program = Program(program_data)
-            images = getattr(program, 'images', [])
-            
-            if images:
-                # Get toli name for display
-                toli_name = "Unknown Toli"
-                if hasattr(program, 'toli_id') and program.toli_id:
-                    toli_data = db.get_toli_by_id(program.toli_id)
-                    if toli_data:
-                        toli_name = toli_data.get('name', 'Unknown Toli')
-                
-                for img_path in images:
-                    gallery_images.append({
-                        'image_path': img_path,
-                        'program_title': program.title,
-                        'program_type': getattr(program, 'program_type', 'General'),
-                        'location': getattr(program, 'location', 'Unknown Location'),
-                        'toli_name': toli_name
-                    })
+        for program_data in db.get_gallery_programs():
+            for img_path in program_data['images']:
+                gallery_images.append({
+                    'image_path': img_path,
+                    'program_title': program_data.get('title', ''),
+                    'program_type': program_data.get('program_type') or 'General',
+                    'location': program_data.get('location') or 'Unknown Location',
+                    'toli_name': program_data.get('toli_name') or 'Unknown Toli'
+                })
         
         return render_template('main/gallery.html', gallery_images=gallery_images)
     except Exception as e:
         print(f"Error loading gallery: {e}")
         return render_template('main/gallery.html', gallery_images=[])
 
+@main.route('/media/<path:source>')
+def media(source):
+    """Resized copy of a static image (widths and formats from fixed allow-lists)"""
+    width = request.args.get('w', type=int)
+    fmt = request.args.get('fmt', DEFAULT_FORMAT)
+    if width not in ALLOWED_WIDTHS or fmt not in ALLOWED_FORMATS:
+        abort(400)
+    
+    try:
+        response = get_media_cache().send(source, width, fmt, request.args.get('v'))
+    except Exception as e:
+        print(f"Error resizing {source}: {e}")
+        abort(404)
+    if response is None:
+        abort(404)
+    return response
+
 @main.route('/news')
 def news():
     return render_template('main/news.html')
@@ -114,6 +108,7 @@ def newsletter_detail(newsletter_id):
         return redirect(url_for('main.newsletter'))
     
     newsletter = Newsletter(newsletter_data)
+    newsletter.content = render_document(newsletter_data)
     return render_template('main/newsletter_detail.html', newsletter=newsletter)
 
 @main.route('/contact')
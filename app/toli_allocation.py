@@ -0,0 +1,465 @@
+"""
+Toli Allocation Engine
+Assigns unassigned students to tolis in bulk.
+
+Students and open tolis are loaded with one projected query each, the plan
+is computed in memory with a greedy slot-filling pass and stored for review,
+and a reviewed plan is committed with bulk writes.
+"""
+
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError
+
+from app import denormalization
+from app.database import MAX_TOLI_MEMBERS, OPEN_TOLI_FILTER
+
+PLAN_COLLECTION = 'allocation_plans'
+
+# Write errors kept on a partially applied plan
+MAX_RECORDED_WRITE_ERRORS = 50
+
+STUDENT_PROJECTION = {
+    'name': 1, 'scholar_no': 1, 'course': 1, 'email': 1, 'contact': 1,
+    'session_year': 1, 'preferred_city': 1
+}
+TOLI_PROJECTION = {
+    'name': 1, 'session_year': 1, 'location.city': 1, 'member_count': 1,
+    'members.scholar_no': 1, 'members.course': 1
+}
+
+
+def _normalize(value):
+    """Lower-cased key for matching free text such as city names"""
+    value = (value or '').strip().lower()
+    return value or None
+
+
+class _StudentPool:
+    """Students waiting for a slot, queued per course"""
+
+    def __init__(self):
+        self.by_course = defaultdict(deque)
+        self.size = 0
+
+    def add(self, student):
+        self.by_course[student.get('course') or ''].append(student)
+        self.size += 1
+
+    def take(self, avoid_courses):
+        """
+        Pop a student, preferring the largest course not yet in the toli.
+
+        Drawing from the largest queue keeps the remaining pool balanced, so
+        later tolis still have a mix of courses to choose from.
+        """
+        best = None
+        for course, queue in self.by_course.items():
+            if not queue:
+                continue
+            fresh = course not in avoid_courses
+            rank = (fresh, len(queue))
+            if best is None or rank > best[0]:
+                best = (rank, course)
+        if best is None:
+            return None
+        self.size -= 1
+        return self.by_course[best[1]].popleft()
+
+    def drain(self):
+        while self.size:
+            yield self.take(())
+
+
+class ToliAllocator:
+    """Batch assignment of unassigned students to tolis"""
+
+    def __init__(self, db, max_members=MAX_TOLI_MEMBERS):
+        self.db = db
+        self.max_members = max_members
+
+    # ---------- loading ----------
+
+    def load_students(self, session_year=None):
+        """All students without a toli (optionally for one session year)"""
+        query = {'role': 'student', 'toli_id': {'$in': [None, '']}}
+        if session_year:
+            query['session_year'] = {'$in': [session_year, None, '']}
+        return list(self.db.db.users.find(query, STUDENT_PROJECTION).batch_size(5000))
+
+    def load_open_tolis(self, session_year=None):
+        """Tolis with free slots, fullest first so partial tolis are completed"""
+        query = dict(OPEN_TOLI_FILTER)
+        if session_year:
+            query['session_year'] = session_year
+        tolis = list(self.db.db.tolis.find(query, TOLI_PROJECTION))
+        tolis.sort(key=lambda t: -(t.get('member_count') or len(t.get('members') or [])))
+        return tolis
+
+    # ---------- planning ----------
+
+    def _candidate_keys(self, session, city, pools, strict_location):
+        """Pools a toli may draw from, best match first"""
+        keys = [(session, city), (session, None), (None, city), (None, None)]
+        if not strict_location:
+            keys += [key for key in pools if key[0] in (session, None) and key not in keys]
+        return keys
+
+    def _fill(self, slots, courses, keys, pools):
+        picked = []
+        for key in keys:
+            pool = pools.get(key)
+            while pool and pool.size and len(picked) < slots:
+                student = pool.take(courses)
+                courses.add(student.get('course') or '')
+                picked.append(student)
+            if len(picked) >= slots:
+                break
+        return picked
+
+    def build_plan(self, session_year=None, strict_location=False, create_new=False):
+        """
+        Compute assignments without writing anything.
+
+        Args:
+            session_year: Only allocate within this session year
+            strict_location: Never place a student outside their preferred city
+            create_new: Form new tolis from students left over
+
+        Returns:
+            Plan dictionary (see preview)
+        """
+        started = time.perf_counter()
+        students = self.load_students(session_year)
+        tolis = self.load_open_tolis(session_year)
+
+        pools = defaultdict(_StudentPool)
+        for student in students:
+            session = student.get('session_year') or None
+            pools[(session, _normalize(student.get('preferred_city')))].add(student)
+
+        assignments = []
+        for toli in tolis:
+            members = toli.get('members') or []
+            slots = self.max_members - max(toli.get('member_count') or 0, len(members))
+            if slots <= 0:
+                continue
+            city = _normalize((toli.get('location') or {}).get('city'))
+            keys = self._candidate_keys(toli.get('session_year') or None, city, pools, strict_location)
+            picked = self._fill(slots, {m.get('course') or '' for m in members}, keys, pools)
+            if picked:
+                assignments.append({
+                    'toli_id': str(toli['_id']),
+                    'toli_name': toli.get('name', ''),
+                    'new': False,
+                    'students': picked
+                })
+
+        leftovers = []
+        for key, pool in pools.items():
+            leftovers.extend((key, student) for student in pool.drain())
+
+        if create_new and leftovers:
+            assignments.extend(self._form_new_tolis(leftovers, session_year))
+            leftovers = []
+
+        return {
+            'session_year': session_year,
+            'strict_location': strict_location,
+            'create_new': create_new,
+            'assignments': assignments,
+            'unassigned': [student for _, student in leftovers],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'students_considered': len(students),
+            'tolis_considered': len(tolis)
+        }
+
+    def _form_new_tolis(self, leftovers, session_year):
+        """Group leftover students into new tolis of the same session and city"""
+        grouped = defaultdict(_StudentPool)
+        for key, student in leftovers:
+            grouped[key].add(student)
+
+        new_tolis = []
+        for (session, city), pool in sorted(grouped.items(), key=lambda item: str(item[0])):
+            while pool.size:
+                courses = set()
+                picked = []
+                while pool.size and len(picked) < self.max_members:
+                    student = pool.take(courses)
+                    courses.add(student.get('course') or '')
+                    picked.append(student)
+                new_tolis.append({
+                    'toli_id': str(ObjectId()),
+                    'toli_name': f"Toli {picked[0].get('name', '')}",
+                    'new': True,
+                    'session_year': session or session_year or '',
+                    'city': city or '',
+                    'students': picked
+                })
+        return new_tolis
+
+    # ---------- preview / commit ----------
+
+    @staticmethod
+    def _summarize(plan):
+        assignments = plan['assignments']
+        return {
+            'students_considered': plan['students_considered'],
+            'tolis_considered': plan['tolis_considered'],
+            'students_assigned': sum(len(a['students']) for a in assignments),
+            'tolis_filled': sum(1 for a in assignments if not a['new']),
+            'tolis_created': sum(1 for a in assignments if a['new']),
+            'students_unassigned': len(plan['unassigned']),
+            'elapsed_ms': plan['elapsed_ms']
+        }
+
+    def preview(self, created_by=None, **options):
+        """
+        Build a plan and store it for review.
+
+        Returns:
+            Dictionary with plan_id, summary and the per-toli assignments
+        """
+        if not self.db.is_connected():
+            return None
+
+        plan = self.build_plan(**options)
+        summary = self._summarize(plan)
+        document = {
+            'status': 'preview',
+            'created_at': datetime.utcnow(),
+            'created_by': created_by,
+            'options': options,
+            'summary': summary,
+            'assignments': plan['assignments'],
+            'unassigned': [student['_id'] for student in plan['unassigned']]
+        }
+        plan_id = self.db.db[PLAN_COLLECTION].insert_one(document).inserted_id
+
+        return {
+            'plan_id': str(plan_id),
+            'summary': summary,
+            'assignments': [{
+                'toli_id': a['toli_id'],
+                'toli_name': a['toli_name'],
+                'new': a['new'],
+                'students': [{
+                    'scholar_no': s.get('scholar_no'),
+                    'name': s.get('name'),
+                    'course': s.get('course')
+                } for s in a['students']]
+            } for a in plan['assignments']]
+        }
+
+    def get_plan(self, plan_id):
+        if not self.db.is_connected():
+            return None
+        return self.db.db[PLAN_COLLECTION].find_one({'_id': ObjectId(plan_id)})
+
+    def commit(self, plan_id, committed_by=None):
+        """
+        Apply a previewed plan.
+
+        Toli updates are guarded by member_count and duplicate checks, and
+        students are only claimed while still unassigned, so a plan that has
+        gone stale is applied partially rather than overfilling a toli. If
+        some toli writes fail, the students of the tolis that were written
+        are still claimed and the plan is marked 'partial'.
+
+        Returns:
+            Tuple of (result dictionary, error message or None)
+        """
+        if not self.db.is_connected():
+            return None, 'Database not connected'
+
+        plans = self.db.db[PLAN_COLLECTION]
+        plan = plans.find_one_and_update(
+            {'_id': ObjectId(plan_id), 'status': 'preview'},
+            {'$set': {'status': 'committing', 'commit_started_at': datetime.utcnow()}}
+        )
+        if plan is None:
+            return None, 'Plan not found or already committed'
+
+        try:
+            result, write_error = self._apply(plan)
+        except BulkWriteError as e:
+            result, write_error = None, e
+        except Exception as e:
+            print(f"❌ Error committing allocation plan {plan_id}: {e}")
+            plans.update_one({'_id': plan['_id']}, {'$set': {'status': 'failed', 'error': str(e)}})
+            return None, str(e)
+        self.db.touch_collections('tolis', 'users')
+
+        if write_error is not None:
+            # Some writes landed: record what failed so the plan can be reconciled
+            details = write_error.details or {}
+            print(f"❌ Allocation plan {plan_id} partly applied "
+                  f"({getattr(write_error, 'stage', 'bulk write')}): {write_error}")
+            plans.update_one({'_id': plan['_id']}, {'$set': {
+                'status': 'partial',
+                'error': str(write_error),
+                'failed_stage': getattr(write_error, 'stage', None),
+                'write_result': {key: details.get(key, 0)
+                                 for key in ('nInserted', 'nMatched', 'nModified', 'nUpserted')},
+                'write_errors': [
+                    {'index': err.get('index'), 'code': err.get('code'), 'errmsg': err.get('errmsg')}
+                    for err in details.get('writeErrors', [])[:MAX_RECORDED_WRITE_ERRORS]
+                ],
+                'result': result
+            }})
+            return None, 'Plan was only partly applied; see the plan for the failed writes'
+
+        plans.update_one({'_id': plan['_id']}, {'$set': {
+            'status': 'committed',
+            'committed_at': datetime.utcnow(),
+            'committed_by': committed_by,
+            'result': result
+        }})
+        return result, None
+
+    def _apply(self, plan):
+        """
+        Write a plan's tolis, then claim their students.
+
+        Returns:
+            Tuple of (result dictionary, BulkWriteError of the tolis stage or None)
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        assignments = plan.get('assignments', [])
+
+        # 1. All toli inserts/updates in one unordered bulk_write
+        toli_ops = []
+        for assignment in assignments:
+            if assignment['new']:
+                # The first student leads a new toli, as the creator does in student.create_toli
+                members = [self.db.build_toli_member(student, is_leader=index == 0)
+                           for index, student in enumerate(assignment['students'])]
+            else:
+                members = [self.db.build_toli_member(student) for student in assignment['students']]
+            scholar_nos = [member['scholar_no'] for member in members]
+            if assignment['new']:
+                toli = {
+                    '_id': ObjectId(assignment['toli_id']),
+                    'name': assignment['toli_name'],
+                    'toli_no': '',
+                    'session_year': assignment.get('session_year', ''),
+                    'location': {'city': assignment['city']} if assignment.get('city') else {},
+                    'members': members,
+                    'member_count': len(members),
+                    'leader_id': str(assignment['students'][0]['_id']) if members else '',
+                    'status': 'pending',
+                    'created_by': plan.get('created_by'),
+                    'created_at': now,
+                    'approved_at': None,
+                    'coordinator_name': '',
+                    'coordinator_contact': ''
+                }
+                # Same embedded leader fields as MongoDB.create_toli
+                denormalization.embed_references(self.db.db, 'tolis', toli)
+                toli_ops.append(InsertOne(toli))
+            else:
+                toli_ops.append(UpdateOne(
+                    {
+                        '_id': ObjectId(assignment['toli_id']),
+                        'member_count': {'$lte': self.max_members - len(members)},
+                        'members.scholar_no': {'$nin': scholar_nos}
+                    },
+                    {
+                        '$push': {'members': {'$each': members}},
+                        '$inc': {'member_count': len(members)},
+                        '$set': {'updated_at': now}
+                    }
+                ))
+        if not toli_ops:
+            return {'students_assigned': 0, 'tolis_updated': 0, 'tolis_created': 0,
+                    'skipped_tolis': [], 'elapsed_ms': 0.0}, None
+
+        toli_error = None
+        try:
+            modified = self._bulk_write(self.db.db.tolis, toli_ops, 'tolis').modified_count
+        except BulkWriteError as e:
+            # Unordered: the other writes landed, so their students are still claimed below
+            toli_error = e
+            modified = None
+        # One op per assignment, so an error's index is the assignment's
+        failed = {assignments[err['index']]['toli_id']
+                  for err in (toli_error.details or {}).get('writeErrors', [])} if toli_error else set()
+        applied = {a['toli_id'] for a in assignments if a['new'] and a['toli_id'] not in failed}
+        expected_updates = len([a for a in assignments if not a['new']])
+        if modified == expected_updates:
+            applied |= {a['toli_id'] for a in assignments if not a['new']}
+        else:
+            # Some tolis changed since the preview or failed; find which updates landed
+            planned = {a['toli_id']: {s['scholar_no'] for s in a['students']}
+                       for a in assignments if not a['new']}
+            for toli in self.db.db.tolis.find(
+                {'_id': {'$in': [ObjectId(t) for t in planned]}}, {'members.scholar_no': 1}
+            ):
+                present = {m.get('scholar_no') for m in toli.get('members') or []}
+                if planned[str(toli['_id'])] <= present:
+                    applied.add(str(toli['_id']))
+
+        # 2. Claim students for the tolis that accepted them in one bulk_write
+        user_ops = [
+            UpdateMany(
+                {'_id': {'$in': [s['_id'] for s in a['students']]}, 'toli_id': {'$in': [None, '']}},
+                {'$set': {'toli_id': a['toli_id'], 'updated_at': now}}
+            )
+            for a in assignments if a['toli_id'] in applied
+        ]
+        assigned = 0
+        if user_ops:
+            assigned = self._bulk_write(self.db.db.users, user_ops, 'users').modified_count
+
+        expected_students = sum(len(a['students']) for a in assignments if a['toli_id'] in applied)
+        if assigned < expected_students:
+            self._release_lost_students(assignments, applied)
+
+        return {
+            'students_assigned': assigned,
+            'tolis_updated': len([a for a in assignments if not a['new'] and a['toli_id'] in applied]),
+            'tolis_created': len([a for a in assignments if a['new'] and a['toli_id'] in applied]),
+            'skipped_tolis': [a['toli_id'] for a in assignments if a['toli_id'] not in applied],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }, toli_error
+
+    @staticmethod
+    def _bulk_write(collection, operations, stage):
+        """Unordered bulk_write; a BulkWriteError is tagged with the stage that raised it"""
+        try:
+            return collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            e.stage = stage
+            raise
+
+    def _release_lost_students(self, assignments, applied):
+        """Pull students that were assigned elsewhere while the plan was applied"""
+        student_ids = [s['_id'] for a in assignments if a['toli_id'] in applied for s in a['students']]
+        owners = {
+            user['_id']: user.get('toli_id')
+            for user in self.db.db.users.find({'_id': {'$in': student_ids}}, {'toli_id': 1})
+        }
+        for assignment in assignments:
+            if assignment['toli_id'] not in applied:
+                continue
+            lost = [s['scholar_no'] for s in assignment['students']
+                    if str(owners.get(s['_id'])) != assignment['toli_id']]
+            if lost:
+                self.db.pull_toli_members(assignment['toli_id'], lost)
+            if assignment['new'] and assignment['students'] and assignment['students'][0]['scholar_no'] in lost:
+                # The planned leader went elsewhere; the next claimed student leads
+                kept = [s for s in assignment['students'] if s['scholar_no'] not in lost]
+                if kept:
+                    self.db.set_toli_leader(assignment['toli_id'], kept[0]['scholar_no'],
+                                            str(kept[0]['_id']), leader=kept[0])
+                else:
+                    self.db.db.tolis.update_one(
+                        {'_id': ObjectId(assignment['toli_id'])},
+                        {'$set': dict(denormalization.copied_values('toli_leader', {}), leader_id='')}
+                    )
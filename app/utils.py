@@ -1,6 +1,3 @@
-import os
-from werkzeug.utils import secure_filename
-from flask import current_app
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {
@@ -23,40 +20,18 @@ def allowed_file(filename, resource_type='other'):
     else:
         return ext in ALLOWED_EXTENSIONS['other']
 
-def save_image(file, folder='uploads'):
-    """Save uploaded image file"""
+def save_image(file):
+    """Save uploaded image file in the blob store and return its path under static/"""
     if file and allowed_file(file.filename, 'image'):
-        filename = secure_filename(file.filename)
-        # Create unique filename
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{filename}"
-        
-        # Create directory if it doesn't exist
-        upload_folder = os.path.join(current_app.root_path, 'static', folder)
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        return filename
+        from app.blob_store import get_blob_store
+        return get_blob_store().put(file)
     return None
 
-def save_file(file, folder='resources'):
-    """Save uploaded file and return filename"""
+def save_file(file):
+    """Save uploaded file in the blob store and return its path under static/"""
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        # Create unique filename
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{filename}"
-        
-        # Create directory if it doesn't exist
-        upload_folder = os.path.join(current_app.root_path, 'static', folder)
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        return filename
+        from app.blob_store import get_blob_store
+        return get_blob_store().put(file)
     return None
 
 def get_file_size(file):
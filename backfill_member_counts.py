@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script to backfill the denormalized member_count field on tolis
+and create the partial index used by open-toli queries
+"""
+
+import sys
+
+from app.database import MongoDB
+
+def backfill_member_counts(only_missing=False):
+    """Recompute member_count for every toli from its members list"""
+    db = MongoDB()
+
+    print("=" * 80)
+    print("BACKFILLING TOLI MEMBER COUNTS")
+    print("=" * 80)
+
+    if not db.is_connected():
+        print("❌ Database not connected")
+        return False
+
+    missing = db.db.tolis.count_documents({'member_count': {'$exists': False}})
+    print(f"\n📊 Tolis without member_count: {missing}")
+
+    # Single server-side update, no documents are pulled into Python
+    updated = db.backfill_member_counts(only_missing=only_missing)
+    print(f"✅ Updated member_count on {updated} toli(s)")
+
+    if db.ensure_indexes():
+        print("✅ Partial index 'open_tolis' is in place")
+
+    print("\n" + "=" * 80)
+    print("✅ BACKFILL COMPLETE")
+    print("=" * 80)
+
+    db.close_connection()
+    return True
+
+if __name__ == '__main__':
+    backfill_member_counts(only_missing='--missing-only' in sys.argv)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: render a 1,000-row program list through the format_date filter.
+
+Compares the previous filter (up to three strptime attempts per call plus
+strftime) with app.date_utils (ISO fast path, cached parsing and formatting)
+for rows whose dates are stored as datetimes and as strings.
+
+Usage:
+    python benchmarks/bench_date_render.py [--rows 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from jinja2 import Environment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import date_utils  # noqa: E402
+
+TEMPLATE = """
+{%- for program in programs %}
+<tr><td>{{ program.title }}</td><td>{{ program.date|format_date }}</td>
+<td>{{ program.created_at|format_date('%B %d, %Y') }}</td></tr>
+{%- endfor %}
+"""
+
+
+def legacy_format_date(date_string, fmt=None):
+    """The filter as it was before app.date_utils"""
+    if fmt is None:
+        fmt = '%d %b %Y'
+    if isinstance(date_string, str):
+        for date_format in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y']:
+            try:
+                return datetime.strptime(date_string, date_format).strftime(fmt)
+            except ValueError:
+                continue
+        return date_string
+    elif hasattr(date_string, 'strftime'):
+        return date_string.strftime(fmt)
+    return str(date_string)
+
+
+def make_programs(rows, as_strings):
+    start = datetime(2024, 1, 1)
+    programs = []
+    for i in range(rows):
+        day = start + timedelta(days=random.randint(0, 365))
+        created = day + timedelta(hours=random.randint(0, 48))
+        programs.append({
+            'title': f'Program {i}',
+            'date': day.strftime('%Y-%m-%d') if as_strings else day,
+            'created_at': created.strftime('%Y-%m-%d %H:%M:%S') if as_strings else created
+        })
+    return programs
+
+
+def bench(template, programs, repeat):
+    template.render(programs=programs)  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        template.render(programs=programs)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    for label, as_strings in (('datetime values', False), ('string values', True)):
+        programs = make_programs(args.rows, as_strings)
+        timings = {}
+        for name, func in (('legacy', legacy_format_date), ('date_utils', date_utils.format_date)):
+            env = Environment()
+            env.filters['format_date'] = func
+            timings[name] = bench(env.from_string(TEMPLATE), programs, args.repeat)
+
+        speedup = timings['legacy'] / timings['date_utils'] if timings['date_utils'] else 0
+        print(f"{label:16} {args.rows} rows: legacy {timings['legacy']:.2f} ms, "
+              f"date_utils {timings['date_utils']:.2f} ms ({speedup:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time and peak memory of gallery image processing, full decode vs
+app.ml.decode.
+
+Writes a fixture set (12 MP JPEG, 12 MP JPEG with EXIF orientation 6, 8 MP
+PNG) to a temporary directory and, for each file, stores the original and a
+300px thumbnail two ways:
+
+    legacy   full decode, save at quality 95, copy() + LANCZOS thumbnail
+    decode   copy_jpeg_without_metadata (PNG: one re-encode) for the original,
+             load_scaled (draft/reduce, EXIF applied once) for the thumbnail
+
+Fixtures are written and each run happens in fresh child processes, so the
+peak RSS a run reports belongs to that run alone (Linux carries the peak
+RSS of a parent over into the programs it starts).
+
+Usage:
+    python benchmarks/bench_image_decode.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageOps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml import decode  # noqa: E402
+
+THUMBNAIL_SIZE = (300, 300)
+
+FIXTURES = {
+    'photo.jpg': ((4000, 3000), 1),
+    'rotated.jpg': ((4000, 3000), 6),
+    'scan.png': ((3264, 2448), 1)
+}
+
+
+def synthetic_photo(size, seed):
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, (110, 120, 130))
+    draw = ImageDraw.Draw(img)
+    for _ in range(200):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randint(20, 800), rng.randint(20, 800)
+        draw.ellipse((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return img
+
+
+def write_fixtures(directory):
+    for seed, (name, (size, orientation)) in enumerate(FIXTURES.items()):
+        img = synthetic_photo(size, seed)
+        path = os.path.join(directory, name)
+        if name.endswith('.jpg'):
+            exif = img.getexif()
+            exif[decode.ORIENTATION_TAG] = orientation
+            img.save(path, quality=92, exif=exif)
+        else:
+            img.save(path)
+
+
+def legacy(path, out_dir):
+    with open(path, 'rb') as f:
+        img = Image.open(f)
+        img.save(os.path.join(out_dir, 'original' + os.path.splitext(path)[1]), quality=95)
+        thumb = img.copy()
+        thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        thumb.save(os.path.join(out_dir, 'thumb' + os.path.splitext(path)[1]), quality=85)
+    return thumb.size
+
+
+def fast(path, out_dir):
+    extension = os.path.splitext(path)[1]
+    with open(path, 'rb') as f:
+        img = Image.open(f)
+        orientation = decode.orientation(img)
+        preview = decode.load_scaled(img, THUMBNAIL_SIZE)
+
+        if img.format == 'JPEG':
+            f.seek(0)
+            decode.copy_jpeg_without_metadata(f, os.path.join(out_dir, 'original' + extension), orientation)
+        else:
+            # load_scaled decoded the full image; reuse it for the original
+            ImageOps.exif_transpose(img, in_place=True)
+            img.save(os.path.join(out_dir, 'original' + extension), quality=95)
+
+        preview.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        preview.save(os.path.join(out_dir, 'thumb' + extension), quality=85)
+    return preview.size
+
+
+def child(method, path, repeat):
+    """Run one method on one fixture; print timing and peak RSS as JSON"""
+    func = {'legacy': legacy, 'decode': fast}[method]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            size = func(path, out_dir)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'ms': elapsed, 'peak_mb': (peak - baseline) / 1024, 'thumb': size}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--write-fixtures', metavar='DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.repeat)
+        return
+    if args.write_fixtures:
+        write_fixtures(args.write_fixtures)
+        return
+
+    script = [sys.executable, os.path.abspath(__file__), '--repeat', str(args.repeat)]
+    with tempfile.TemporaryDirectory() as fixtures:
+        subprocess.run(script + ['--write-fixtures', fixtures], check=True)
+        for name in FIXTURES:
+            path = os.path.join(fixtures, name)
+            results = {}
+            for method in ('legacy', 'decode'):
+                output = subprocess.run(script + ['--child', method, path],
+                                        check=True, capture_output=True, text=True).stdout
+                results[method] = json.loads(output.strip().splitlines()[-1])
+
+            old, new = results['legacy'], results['decode']
+            print(f"{name:12} legacy {old['ms']:7.1f} ms {old['peak_mb']:6.1f} MB peak, thumb {old['thumb']} | "
+                  f"decode {new['ms']:7.1f} ms {new['peak_mb']:6.1f} MB peak, thumb {new['thumb']} "
+                  f"({old['ms'] / new['ms']:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-image latency of app.ml.quality on camera-sized JPEGs.
+
+Encodes synthetic 12 MP photos (plus blurred, dark and noisy variants) and
+times assess_file, which decodes a <=512px proxy with JPEG draft mode,
+against measuring a fully decoded image. Prints each variant's score so the
+sharpness and exposure terms can be sanity-checked, and fails if the proxy
+path misses the per-image budget.
+
+Usage:
+    python benchmarks/bench_image_quality.py [--images 20] [--budget-ms 20]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml import quality  # noqa: E402
+
+SIZE = (4000, 3000)
+
+
+def synthetic_photo(seed):
+    rng = random.Random(seed)
+    img = Image.new('RGB', SIZE, (rng.randrange(60, 160),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(300):
+        x, y = rng.randrange(SIZE[0]), rng.randrange(SIZE[1])
+        w, h = rng.randint(10, 600), rng.randint(10, 600)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.rectangle((x, y, x + w, y + h), fill=colour)
+        else:
+            draw.line((x, y, x + w, y + h), fill=colour, width=rng.randint(1, 8))
+    return img
+
+
+def variants(img):
+    noisy = np.asarray(img, dtype=np.int16) + np.random.default_rng(0).normal(0, 18, (SIZE[1], SIZE[0], 3))
+    return {
+        'sharp': img,
+        'blurred': img.filter(ImageFilter.GaussianBlur(12)),
+        'dark': ImageEnhance.Brightness(img).enhance(0.2),
+        'noisy': Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+    }
+
+
+def encode(img):
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def time_per_image(func, payloads):
+    started = time.perf_counter()
+    results = [func(io.BytesIO(payload)) for payload in payloads]
+    return (time.perf_counter() - started) / len(payloads) * 1000, results
+
+
+def full_decode(source):
+    with Image.open(source) as img:
+        img.load()
+        pixels = np.asarray(img.convert('L'))
+    return quality.measure(pixels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    base = synthetic_photo(0)
+    payloads = {name: encode(img) for name, img in variants(base).items()}
+    for name, payload in payloads.items():
+        report = quality.assess_file(io.BytesIO(payload))
+        print(f"{name:8} score {report['score']:3}  sharpness {report['sharpness']:9.1f}  "
+              f"brightness {report['brightness']:6.1f}  contrast {report['contrast']:3}  "
+              f"noise {report['noise']:5.2f}")
+
+    batch = [encode(synthetic_photo(seed)) for seed in range(args.images)]
+    proxy_ms, _ = time_per_image(quality.assess_file, batch)
+    full_ms, _ = time_per_image(full_decode, batch)
+    print(f"\n{SIZE[0]}x{SIZE[1]} JPEG, {args.images} images: proxy {proxy_ms:.1f} ms/image, "
+          f"full decode {full_ms:.1f} ms/image ({full_ms / proxy_ms:.1f}x)")
+
+    started = time.perf_counter()
+    quality.assess_batch([io.BytesIO(payload) for payload in batch])
+    batch_ms = (time.perf_counter() - started) / len(batch) * 1000
+    print(f"assess_batch: {batch_ms:.1f} ms/image")
+
+    if proxy_ms > args.budget_ms:
+        print(f"FAIL: {proxy_ms:.1f} ms/image exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print(f"OK: within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: near-duplicate lookup over 100,000 perceptual hashes.
+
+Indexes random 64-bit hashes in app.ml.perceptual_hash.MultiIndexHash and
+BKTree and times radius searches against a linear Python scan and a
+vectorised NumPy scan (checking that all of them return the same matches).
+Half of the queries are indexed hashes with a few bits flipped
+(near-duplicates), half are random.
+
+Also times ahash/dhash/phash on a synthetic 1920x1080 photo and prints the
+distance between it and a resized, re-encoded JPEG copy.
+
+Usage:
+    python benchmarks/bench_perceptual_hash.py [--hashes 100000] [--queries 500]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.perceptual_hash import BKTree, MultiIndexHash, ahash, dhash, hamming, phash  # noqa: E402
+
+RADII = (2, 4, 6, 8)
+
+# Bits set in each byte value, for NumPy versions without bitwise_count
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def flip_bits(value, count):
+    for bit in random.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def numpy_distances(array, value):
+    xor = array ^ np.uint64(value)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(xor)
+    return POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def bench_index(hash_count, query_count):
+    hashes = [random.getrandbits(64) for _ in range(hash_count)]
+    queries = [flip_bits(random.choice(hashes), random.randint(0, 4)) for _ in range(query_count // 2)]
+    queries += [random.getrandbits(64) for _ in range(query_count - len(queries))]
+
+    indexes = {}
+    for name, index_class in (('multi-index', MultiIndexHash), ('bk-tree', BKTree)):
+        started = time.perf_counter()
+        indexes[name] = index_class((value, i) for i, value in enumerate(hashes))
+        print(f"{name} build: {hash_count} hashes in {time.perf_counter() - started:.2f} s")
+
+    array = np.array(hashes, dtype=np.uint64)
+    for radius in RADII:
+        timings = {}
+
+        results = {}
+        for name, index in indexes.items():
+            started = time.perf_counter()
+            results[name] = [sorted(i for _, i in index.search(q, radius)) for q in queries]
+            timings[name] = time.perf_counter() - started
+        index_results = results['multi-index']
+
+        # Python scan is slow; time it on a sample of the queries
+        sample = queries[:max(1, len(queries) // 10)]
+        started = time.perf_counter()
+        scan_results = [[i for i, value in enumerate(hashes) if hamming(q, value) <= radius] for q in sample]
+        timings['python scan'] = (time.perf_counter() - started) * len(queries) / len(sample)
+
+        started = time.perf_counter()
+        numpy_results = [np.flatnonzero(numpy_distances(array, q) <= radius).tolist() for q in queries]
+        timings['numpy scan'] = time.perf_counter() - started
+
+        assert results['bk-tree'] == index_results, 'BK-tree disagrees with the multi-index'
+        assert scan_results == index_results[:len(sample)], 'Indexes disagree with the linear scan'
+        assert numpy_results == index_results, 'Indexes disagree with the NumPy scan'
+
+        found = sum(1 for result in index_results if result)
+        per_query = ', '.join(f"{name} {seconds / len(queries) * 1000:.3f} ms"
+                              for name, seconds in timings.items())
+        print(f"radius {radius}: {per_query} per query ({found}/{len(queries)} queries matched)")
+
+
+def synthetic_photo(size=(1920, 1080)):
+    img = Image.new('RGB', size, (90, 140, 200))
+    draw = ImageDraw.Draw(img)
+    for _ in range(60):
+        x, y = random.randrange(size[0]), random.randrange(size[1])
+        radius = random.randint(20, 300)
+        colour = tuple(random.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=colour)
+    return img.filter(ImageFilter.GaussianBlur(3))
+
+
+def bench_hashing(repeat=20):
+    original = synthetic_photo()
+    buffer = io.BytesIO()
+    original.resize((960, 540)).save(buffer, 'JPEG', quality=70)
+    copy = Image.open(io.BytesIO(buffer.getvalue()))
+    copy.load()
+
+    for name, func in (('ahash', ahash), ('dhash', dhash), ('phash', phash)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            value = func(original)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f"{name}: {elapsed:.2f} ms per 1920x1080 image, "
+              f"{hamming(value, func(copy))} bits from a resized JPEG copy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hashes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    random.seed(42)
+    bench_index(args.hashes, args.queries)
+    bench_hashing()
+
+
+if __name__ == '__main__':
+    main()
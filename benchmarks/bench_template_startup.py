@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: first-request template cost in a fresh worker.
+
+Each measurement runs in a new interpreter (like a freshly booted or
+recycled gunicorn worker) and times loading the templates the busiest
+pages need, plus loading every template:
+
+    before  - no bytecode cache, every template is compiled from source
+    after   - FileSystemBytecodeCache populated by `flask precompile-templates`
+
+Usage:
+    python benchmarks/bench_template_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT, 'app', 'templates')
+
+# Templates behind the most frequently hit pages
+FIRST_REQUEST_TEMPLATES = ['admin/dashboard.html', 'student/dashboard.html', 'main/home.html']
+
+WORKER = r"""
+import json, sys, time
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+template_dir, cache_dir, first = sys.argv[1], sys.argv[2], sys.argv[3].split(',')
+cache = FileSystemBytecodeCache(cache_dir, pattern='disha_%s.cache') if cache_dir else None
+env = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=cache)
+
+started = time.perf_counter()
+for name in first:
+    env.get_template(name)
+first_ms = (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+for name in env.list_templates(extensions=['html']):
+    env.get_template(name)
+all_ms = (time.perf_counter() - started) * 1000 + first_ms
+print(json.dumps({'first_request_ms': first_ms, 'all_templates_ms': all_ms}))
+"""
+
+
+def run_worker(cache_dir):
+    output = subprocess.check_output(
+        [sys.executable, '-c', WORKER, TEMPLATE_DIR, cache_dir or '', ','.join(FIRST_REQUEST_TEMPLATES)],
+        text=True
+    )
+    return json.loads(output)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='First-request template latency before/after the bytecode cache')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    before = [run_worker(None) for _ in range(args.runs)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run_worker(cache_dir)  # precompile step fills the cache
+        after = [run_worker(cache_dir) for _ in range(args.runs)]
+
+    for key, label in (('first_request_ms', 'first request'), ('all_templates_ms', 'all templates')):
+        b = median([r[key] for r in before])
+        a = median([r[key] for r in after])
+        print(f"{label:14} before {b:8.2f} ms   after {a:8.2f} ms   ({b / a if a else 0:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
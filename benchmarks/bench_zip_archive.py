@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of building a program photo archive, in memory vs
+app.archives.ArchiveStream.
+
+Writes a set of JPEG fixtures (copies of a few synthetic 12 MP photos) to a
+temporary directory and archives the first N of them, with one generated
+report per five photos, two ways:
+
+    memory   ZipFile over io.BytesIO, the archive returned as one bytes object
+    stream   ArchiveStream, each chunk handed to a consumer that only counts it
+
+Each run happens in a fresh child process so its peak RSS is its own. The
+stream run also samples RSS through the progress callback; a flat column
+means memory doesn't grow with the number of photos. The streamed archive is
+written to a file and checked with zipfile afterwards.
+
+Usage:
+    python benchmarks/bench_zip_archive.py [--counts 100 400 800]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.archives import ArchiveEntry, ArchiveStream  # noqa: E402
+
+DISTINCT_PHOTOS = 4
+PHOTO_SIZE = (4000, 3000)
+REPORT_EVERY = 5
+
+
+def synthetic_photo(size, seed):
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, (110, 120, 130))
+    draw = ImageDraw.Draw(img)
+    for _ in range(400):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randint(20, 600), rng.randint(20, 600)
+        draw.ellipse((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return img
+
+
+def write_fixtures(directory, count):
+    sources = []
+    for seed in range(DISTINCT_PHOTOS):
+        path = os.path.join(directory, f"source_{seed}.jpg")
+        synthetic_photo(PHOTO_SIZE, seed).save(path, quality=90)
+        sources.append(path)
+    for index in range(count):
+        shutil.copyfile(sources[index % DISTINCT_PHOTOS], os.path.join(directory, f"photo_{index:04d}.jpg"))
+
+
+def report_html(index):
+    rows = ''.join(f"<p>Activity {line} of program {index}</p>" for line in range(200))
+    return f"<html><body><h1>Program {index}</h1>{rows}</body></html>".encode()
+
+
+def entries(directory, count):
+    result = []
+    for index in range(count):
+        folder = f"toli/program_{index // REPORT_EVERY:03d}"
+        if index % REPORT_EVERY == 0:
+            result.append(ArchiveEntry(f"{folder}/report.html", None, None,
+                                       lambda index=index: report_html(index)))
+        path = os.path.join(directory, f"photo_{index:04d}.jpg")
+        result.append(ArchiveEntry(f"{folder}/photos/{index:04d}.jpg", path, os.path.getsize(path), None))
+    return result
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def in_memory(archive_entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for entry in archive_entries:
+            if entry.build is not None:
+                archive.writestr(entry.name, entry.build(), compress_type=zipfile.ZIP_DEFLATED)
+            else:
+                archive.write(entry.path, entry.name, compress_type=zipfile.ZIP_STORED)
+    return len(buffer.getvalue()), []
+
+
+def streamed(archive_entries, out_path):
+    samples = []
+
+    def progress(stream):
+        if stream.files_written % max(1, len(archive_entries) // 4) == 0:
+            samples.append(round(rss_mb(), 1))
+
+    stream = ArchiveStream(archive_entries, progress=progress)
+    with open(out_path, 'wb') as out:
+        for chunk in stream:
+            out.write(chunk)
+    return stream.bytes_sent, samples
+
+
+def child(method, directory, count):
+    """Archive `count` fixtures one way; print size, time and peak RSS as JSON"""
+    archive_entries = entries(directory, count)
+    baseline = rss_mb()
+    out_path = os.path.join(directory, f"out_{count}.zip")
+    started = time.perf_counter()
+    if method == 'memory':
+        size, samples = in_memory(archive_entries)
+    else:
+        size, samples = streamed(archive_entries, out_path)
+    elapsed = time.perf_counter() - started
+    peak = rss_mb() - baseline
+
+    valid = None
+    if method == 'stream':
+        with zipfile.ZipFile(out_path) as archive:
+            valid = archive.testzip() is None and len(archive.namelist()) == len(archive_entries)
+        os.remove(out_path)
+    print(json.dumps({'s': elapsed, 'peak_mb': peak, 'size_mb': size / 1024 ** 2,
+                      'samples': samples, 'valid': valid}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 400, 800])
+    parser.add_argument('--child', nargs=3, metavar=('METHOD', 'DIR', 'COUNT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    script = [sys.executable, os.path.abspath(__file__)]
+    with tempfile.TemporaryDirectory() as fixtures:
+        write_fixtures(fixtures, max(args.counts))
+        for count in args.counts:
+            results = {}
+            for method in ('memory', 'stream'):
+                output = subprocess.run(script + ['--child', method, fixtures, str(count)],
+                                        check=True, capture_output=True, text=True).stdout
+                results[method] = json.loads(output.strip().splitlines()[-1])
+
+            old, new = results['memory'], results['stream']
+            print(f"{count:4} photos ({new['size_mb']:6.1f} MB zip) | "
+                  f"memory {old['s']:5.2f} s {old['peak_mb']:7.1f} MB peak | "
+                  f"stream {new['s']:5.2f} s {new['peak_mb']:5.1f} MB peak, "
+                  f"RSS samples {new['samples']} MB, valid={new['valid']}")
+
+
+if __name__ == '__main__':
+    main()
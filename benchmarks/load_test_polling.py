@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Load test for the polling endpoints under sync and gevent workers.
+
+Opens N concurrent pollers (threads with keep-alive connections) against
+/admin/api/live-stats and /student/api/dashboard/stats and reports
+requests/sec and latency percentiles. With --compare it starts gunicorn
+once per worker class (using gunicorn_config.py) and prints the results
+side by side; otherwise it targets an already running server.
+
+The endpoints require a login: pass the session cookie of an admin
+(--admin-cookie) and/or a student (--student-cookie). Without cookies the
+pollers still exercise the full request path up to the login redirect.
+
+Usage:
+    python benchmarks/load_test_polling.py --url http://127.0.0.1:8000 --concurrency 200
+    python benchmarks/load_test_polling.py --compare --duration 20 --admin-cookie "session=..."
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    'admin': '/admin/api/live-stats',
+    'student': '/student/api/dashboard/stats'
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def poller(host, port, path, cookie, deadline, interval, results, lock):
+    """Poll one endpoint until the deadline, reusing a single connection"""
+    latencies = []
+    statuses = {}
+    errors = 0
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Cookie': cookie} if cookie else {}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        if interval:
+            time.sleep(interval)
+    conn.close()
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+        for status, count in statuses.items():
+            results['statuses'][status] = results['statuses'].get(status, 0) + count
+
+
+def run_load(url, concurrency, duration, interval, cookies):
+    """Run the pollers against a server and summarise the results"""
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    targets = []
+    for role, path in ENDPOINTS.items():
+        if cookies.get(role) or not any(cookies.values()):
+            targets.append((path, cookies.get(role)))
+
+    results = {'latencies': [], 'errors': 0, 'statuses': {}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = []
+    for i in range(concurrency):
+        path, cookie = targets[i % len(targets)]
+        thread = threading.Thread(
+            target=poller,
+            args=(host, port, path, cookie, deadline, interval, results, lock),
+            daemon=True
+        )
+        threads.append(thread)
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = results['latencies']
+    return {
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'statuses': results['statuses'],
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(max(latencies), 1) if latencies else 0.0
+    }
+
+
+def wait_for_server(host, port, timeout=30):
+    """Wait until the server accepts HTTP requests"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.5)
+    return False
+
+
+def start_gunicorn(worker_class, bind, workers):
+    """Start gunicorn with the project config and the given worker class"""
+    env = dict(os.environ, WORKER_CLASS=worker_class, WORKERS=str(workers), PORT=bind.rsplit(':', 1)[1])
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', '--bind', bind, 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def print_result(label, result):
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['statuses'].items()))
+    print(f"{label:8s} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+          f"p99 {result['p99_ms']:8.1f} ms  max {result['max_ms']:8.1f} ms  "
+          f"errors {result['errors']}  [{statuses}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the polling endpoints')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--interval', type=float, default=0, help='Seconds each poller waits between requests')
+    parser.add_argument('--admin-cookie', default=os.getenv('ADMIN_COOKIE'))
+    parser.add_argument('--student-cookie', default=os.getenv('STUDENT_COOKIE'))
+    parser.add_argument('--compare', action='store_true', help='Start gunicorn in sync and gevent mode')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    cookies = {'admin': args.admin_cookie, 'student': args.student_cookie}
+    print(f"{args.concurrency} pollers for {args.duration:.0f}s against {', '.join(ENDPOINTS.values())}")
+
+    if not args.compare:
+        print_result('server', run_load(args.url, args.concurrency, args.duration, args.interval, cookies))
+        return 0
+
+    parsed = urlparse(args.url)
+    bind = f"{parsed.hostname}:{parsed.port or 8000}"
+    for worker_class in ('sync', 'gevent'):
+        proc = start_gunicorn(worker_class, bind, args.workers)
+        try:
+            if not wait_for_server(parsed.hostname, parsed.port or 8000):
+                print(f"❌ gunicorn ({worker_class}) did not start")
+                return 1
+            result = run_load(args.url, args.concurrency, args.duration, args.interval, cookies)
+            print_result(worker_class, result)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
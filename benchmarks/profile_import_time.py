@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Import-time profile and startup budget check for the WSGI entry point.
+
+Runs `python -X importtime -c "import wsgi"` in a fresh interpreter, prints
+the slowest modules from the importtime report and fails (exit 1) when the
+import takes longer than the budget. MONGODB_URI points at an unroutable
+address by default, so any connection attempt made at import time shows up
+as a blown budget instead of passing silently.
+
+Usage:
+    python benchmarks/profile_import_time.py [--budget-ms 3000] [--top 15] [--module wsgi]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# TEST-NET-1 address: connecting to it hangs until the driver times out
+UNREACHABLE_URI = 'mongodb://192.0.2.1:27017/?serverSelectionTimeoutMS=10000'
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` lines into (self_us, cumulative_us, module) tuples"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+            rows.append((int(self_us), int(cumulative_us), module.rstrip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile import time of the app entry point')
+    parser.add_argument('--module', default='wsgi')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '3000')))
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('MONGODB_URI', UNREACHABLE_URI)
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {args.module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        print(f"❌ import {args.module} failed")
+        return 1
+
+    rows = parse_importtime(proc.stderr)
+    top_level = [row for row in rows if not row[2].startswith(' ')]
+    total_ms = sum(row[1] for row in top_level) / 1000
+
+    print(f"Slowest imports (cumulative) for `import {args.module}`:")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {module.strip()}")
+
+    print(f"\nImport time: {total_ms:.1f} ms, interpreter wall time: {wall_ms:.1f} ms, "
+          f"budget: {args.budget_ms:.0f} ms")
+    if wall_ms > args.budget_ms:
+        print("❌ Startup budget exceeded")
+        return 1
+    print("✅ Within startup budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
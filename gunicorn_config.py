@@ -9,8 +9,18 @@ backlog = 2048
 # Worker processes (optimized for Render's free tier)
 # Use 2 workers for free tier, can increase on paid tiers
 workers = int(os.getenv('WORKERS', '2'))
-worker_class = "sync"
-worker_connections = 1000
+
+# WORKER_CLASS=gevent serves many concurrent (polling) requests per worker;
+# blocking socket I/O, including pymongo, is made cooperative by monkey-patching
+worker_class = os.getenv('WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '1000'))
+
+if worker_class == 'gevent':
+    # One MongoDB pool per worker process, sized to the greenlets it may run
+    os.environ.setdefault(
+        'MONGO_MAX_POOL_SIZE',
+        str(min(worker_connections, int(os.getenv('MONGO_POOL_CAP', '200'))))
+    )
 timeout = 60  # Increased timeout for database operations
 keepalive = 2
 
@@ -32,4 +42,21 @@ tmp_upload_dir = None
 
 # Performance tuning for Render
 max_requests = 1000
-max_requests_jitter = 50
\ No newline at end of file
+max_requests_jitter = 50
+
+# Server hooks
+def post_worker_init(worker):
+    """Compile all templates before the worker accepts requests"""
+    try:
+        from app.templating import warm_templates
+        warm_templates(worker.wsgi)
+    except Exception as e:
+        worker.log.warning(f"Template warm-up skipped: {e}")
+
+    if worker_class == 'gevent':
+        from app.concurrency import verify_cooperative_io
+        for name, (ok, detail) in verify_cooperative_io().items():
+            if ok:
+                worker.log.info(f"gevent check {name}: {detail}")
+            else:
+                worker.log.warning(f"gevent check {name} failed: {detail}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Script to convert reports and newsletters stored as inline HTML ('content')
+into structured documents rendered from templates/reports/
+
+Fields the old HTML showed but the documents didn't store (program number,
+contact, photos, toli city/state, coordinator email) are read from the
+program, toli and student in batched lookups. The HTML is then removed.
+
+Usage:
+    python migrate_report_content.py [--dry-run]
+"""
+
+import sys
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.database import MongoDB
+from app.report_documents import (BASIC_REPORT, NEWSLETTER, PROGRAM_REPORT, REPORT_IMAGE_LIMIT,
+                                  TEMPLATE_VERSIONS)
+
+BATCH_SIZE = 200
+
+# Marker of the full program report layout (the basic report lacks it)
+PROGRAM_REPORT_MARKER = 'PROGRAM COMPLETION REPORT'
+
+TITLE_PREFIXES = ('Program Report: ', 'Report: ', 'Newsletter: ')
+
+
+def _object_id(value):
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(str(value))
+    except Exception:
+        return None
+
+
+def _lookup(collection, ids, projection):
+    """Documents by _id, for the ids that are valid ObjectIds"""
+    object_ids = list({oid for oid in (_object_id(value) for value in ids) if oid})
+    if not object_ids:
+        return {}
+    return {doc['_id']: doc for doc in collection.find({'_id': {'$in': object_ids}}, projection)}
+
+
+def _structured_fields(document, template, programs, tolis, students):
+    """$set for one legacy document"""
+    program = programs.get(_object_id(document.get('program_id'))) or {}
+    toli = tolis.get(_object_id(program.get('toli_id'))) or {}
+    student = students.get(_object_id(document.get('created_by'))) or {}
+    location = toli.get('location') if isinstance(toli.get('location'), dict) else {}
+
+    title = document.get('title') or ''
+    for prefix in TITLE_PREFIXES:
+        if title.startswith(prefix):
+            title = title[len(prefix):]
+            break
+
+    images = program.get('images') or []
+    if template == PROGRAM_REPORT:
+        images = images[:REPORT_IMAGE_LIMIT]
+
+    return {
+        'program_title': program.get('title') or title,
+        'organizer_contact': program.get('organizer_contact') or '',
+        'organizer_email': student.get('email') or '',
+        'program_no': program.get('program_no') or 'N/A',
+        'toli_city': location.get('city', 'N/A'),
+        'toli_state': location.get('state', ''),
+        'images': images,
+        'template': template,
+        'template_version': TEMPLATE_VERSIONS[template]
+    }
+
+
+def _migrate_collection(db, name, dry_run):
+    collection = db.db[name]
+    legacy = {'template': {'$exists': False}, 'content': {'$exists': True}}
+    total = collection.count_documents(legacy)
+    print(f"\n📊 {name}: {total} document(s) with inline HTML")
+
+    converted = 0
+    html_bytes = 0
+    batch = []
+
+    def flush(batch):
+        programs = _lookup(db.db.programs, [doc.get('program_id') for doc in batch],
+                           {'title': 1, 'organizer_contact': 1, 'program_no': 1, 'images': 1, 'toli_id': 1})
+        tolis = _lookup(db.db.tolis, [program.get('toli_id') for program in programs.values()], {'location': 1})
+        students = _lookup(db.db.users, [doc.get('created_by') for doc in batch], {'email': 1})
+
+        operations = []
+        for doc in batch:
+            if name == 'newsletters':
+                template = NEWSLETTER
+            elif PROGRAM_REPORT_MARKER in (doc.get('content') or ''):
+                template = PROGRAM_REPORT
+            else:
+                template = BASIC_REPORT
+            fields = _structured_fields(doc, template, programs, tolis, students)
+            operations.append(UpdateOne({'_id': doc['_id'], 'template': {'$exists': False}},
+                                        {'$set': fields, '$unset': {'content': ''}}))
+        if operations and not dry_run:
+            collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    for doc in collection.find(legacy, batch_size=BATCH_SIZE):
+        html_bytes += len((doc.get('content') or '').encode())
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            converted += flush(batch)
+            batch = []
+            print(f"   ... {converted}/{total}")
+    if batch:
+        converted += flush(batch)
+
+    verb = 'Would convert' if dry_run else 'Converted'
+    print(f"✅ {verb} {converted} {name} document(s), dropping {html_bytes / 1024:.1f} KB of stored HTML")
+    return converted
+
+
+def migrate_report_content(dry_run=False):
+    """Convert legacy HTML reports and newsletters to structured documents"""
+    db = MongoDB()
+
+    print("=" * 80)
+    print("MIGRATING REPORTS AND NEWSLETTERS TO STRUCTURED DOCUMENTS")
+    if dry_run:
+        print("(dry run - nothing is written)")
+    print("=" * 80)
+
+    if not db.is_connected():
+        print("❌ Database not connected")
+        return False
+
+    changed = []
+    for name in ('reports', 'newsletters'):
+        if _migrate_collection(db, name, dry_run):
+            changed.append(name)
+
+    if changed and not dry_run:
+        db.touch_collections(*changed)
+
+    print("\n" + "=" * 80)
+    print("✅ MIGRATION COMPLETE")
+    print("=" * 80)
+
+    db.close_connection()
+    return True
+
+
+if __name__ == '__main__':
+    migrate_report_content(dry_run='--dry-run' in sys.argv)
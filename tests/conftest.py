@@ -0,0 +1,34 @@
+"""
+Shared fixtures.
+
+`mongo` puts an in-memory database (mongomock) behind app.database.MongoDB,
+so the app's own data layer runs unchanged. Tests using it are skipped when
+mongomock isn't installed (pip install -r requirements-dev.txt).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongomock = pytest.importorskip('mongomock')
+    from app.database import MongoDB
+
+    # pymongo >= 4.10 passes sort= to bulk updates, which mongomock predates
+    builder = mongomock.collection.BulkOperationBuilder
+    add_update = builder.add_update
+    monkeypatch.setattr(builder, 'add_update',
+                        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs))
+
+    client = mongomock.MongoClient()
+    db = MongoDB()
+    # checked_at=inf: the cached ping never expires, so is_connected() is always True
+    monkeypatch.setitem(MongoDB._shared, db._key, {
+        'client': client, 'db': client['disha_test'], 'failed_at': None, 'checked_at': float('inf')
+    })
+    return db
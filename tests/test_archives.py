@@ -0,0 +1,35 @@
+import os
+import zipfile
+from io import BytesIO
+
+from app.archives import ArchiveEntry, ArchiveStream
+
+PHOTOS = 300
+
+
+def test_streamed_archive_is_a_valid_zip(tmp_path):
+    entries = []
+    for index in range(PHOTOS):
+        path = tmp_path / f"photo_{index:03d}.jpg"
+        path.write_bytes(os.urandom(2048 + index))
+        entries.append(ArchiveEntry(f"toli/photos/{index:03d}.jpg", str(path), path.stat().st_size, None))
+        if index % 10 == 0:
+            notes = tmp_path / f"notes_{index:03d}.txt"
+            notes.write_text(f"Program {index} achievements\n" * 50)
+            entries.append(ArchiveEntry(f"toli/notes_{index:03d}.txt", str(notes), notes.stat().st_size, None))
+            entries.append(ArchiveEntry(f"toli/report_{index:03d}.html", None, None,
+                                        lambda index=index: f"<h1>Program {index}</h1>".encode() * 40))
+
+    stream = ArchiveStream(entries)
+    data = b''.join(stream)
+
+    assert stream.bytes_sent == len(data)
+    assert stream.files_written == len(entries)
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        infos = archive.infolist()
+        assert len(infos) == len(entries)
+        for info in infos:
+            expected = zipfile.ZIP_STORED if info.filename.endswith('.jpg') else zipfile.ZIP_DEFLATED
+            assert info.compress_type == expected, info.filename
+        assert archive.read('toli/photos/007.jpg') == (tmp_path / 'photo_007.jpg').read_bytes()
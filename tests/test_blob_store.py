@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.blob_store import BlobStore
+
+
+def store_file(store, tmp_path, content):
+    source = tmp_path / 'upload.jpg'
+    source.write_bytes(content)
+    return store.put_file(str(source), 'jpg')
+
+
+def test_photo_embedded_in_toli_survives_release(mongo, tmp_path):
+    store = BlobStore(mongo, str(tmp_path / 'static'))
+    photo = store_file(store, tmp_path, b'old profile photo')
+    mongo.db.users.insert_one({'_id': 'u1', 'profile_photo': photo})
+    mongo.db.tolis.insert_one({'name': 'Toli', 'members': [{'scholar_no': 'S1', 'profile_photo': photo}]})
+
+    # The student replaces their photo; the toli still embeds the old one
+    mongo.db.users.update_one({'_id': 'u1'}, {'$set': {'profile_photo': ''}})
+    store.release(photo)
+
+    result = store.collect_garbage(grace_hours=0)
+    assert result['removed'] == 0
+    assert store.blobs.find_one({'_id': store.digest_of(photo)})['refcount'] == 1
+    assert (tmp_path / 'static' / photo).exists()
+
+    # Once nothing shows it, it's collected after the grace period
+    mongo.db.tolis.update_many({}, {'$set': {'members': []}})
+    store.recount()
+    store.blobs.update_many({}, {'$set': {'referenced_at': datetime.utcnow() - timedelta(hours=2)}})
+    assert store.collect_garbage(grace_hours=1)['removed'] == 1
+    assert not (tmp_path / 'static' / photo).exists()
+
+
+def test_recount_counts_every_reference(mongo, tmp_path):
+    store = BlobStore(mongo, str(tmp_path / 'static'))
+    photo = store_file(store, tmp_path, b'program photo')
+    mongo.db.programs.insert_one({'images': [photo, 'uploads/legacy.jpg']})
+    mongo.db.tolis.insert_one({'members': [{'profile_photo': photo}, {'profile_photo': ''}]})
+
+    assert store.recount() == {store.digest_of(photo): 2}
+
+
+def test_report_photos_survive_program_deletion(mongo, tmp_path):
+    store = BlobStore(mongo, str(tmp_path / 'static'))
+    photo = store_file(store, tmp_path, b'program photo')
+    program_id = mongo.db.programs.insert_one({'images': [photo]}).inserted_id
+    mongo.db.reports.insert_one({'program_id': program_id, 'images': [photo]})
+    mongo.db.newsletters.insert_one({'program_id': program_id, 'images': [photo]})
+
+    mongo.db.programs.delete_one({'_id': program_id})
+
+    assert store.recount() == {store.digest_of(photo): 2}
+    assert store.collect_garbage(grace_hours=0)['removed'] == 0
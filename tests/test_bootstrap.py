@@ -0,0 +1,15 @@
+from app import bootstrap
+
+
+def test_legacy_tolis_are_open_after_bootstrap(mongo):
+    mongo.db.tolis.insert_many([
+        {'name': 'Legacy', 'members': [{'scholar_no': 'S1'}]},
+        {'name': 'Full', 'members': [{'scholar_no': f'S{i}'} for i in range(4)]},
+        {'name': 'Current', 'members': [], 'member_count': 0}
+    ])
+    assert [t['name'] for t in mongo.get_open_tolis()] == ['Current']
+
+    assert bootstrap.backfill_member_counts(mongo)
+
+    assert [t['name'] for t in mongo.get_open_tolis()] == ['Current', 'Legacy']
+    assert mongo.db.tolis.find_one({'name': 'Full'})['member_count'] == 4
@@ -0,0 +1,48 @@
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app import chunked_upload
+from app.chunked_upload import ChunkedUpload
+
+
+def _start(uploads, content):
+    status, error = uploads.init('notes.txt', len(content), 'other', 'Notes')
+    assert error is None
+    return status['upload_id']
+
+
+def test_hasher_cache_is_bounded_and_evicted_hashes_are_rebuilt(mongo, tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'HASHER_CACHE_SIZE', 2)
+    monkeypatch.setattr(chunked_upload, '_hashers', chunked_upload.OrderedDict())
+    uploads = ChunkedUpload(mongo, str(tmp_path), blob_store=None)
+    content = b'first half second half'
+
+    first = _start(uploads, content)
+    uploads.append(first, 0, io.BytesIO(content[:10]), 10)
+    for _ in range(3):
+        _start(uploads, content)
+
+    assert len(chunked_upload._hashers) == 2
+    assert first not in chunked_upload._hashers
+
+    uploads.append(first, 10, io.BytesIO(content[10:]), len(content) - 10)
+    assert uploads._hasher_at(first, len(content)).hexdigest() == hashlib.sha256(content).hexdigest()
+
+
+def test_cleanup_drops_hashes_of_removed_uploads(mongo, tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, '_hashers', chunked_upload.OrderedDict())
+    uploads = ChunkedUpload(mongo, str(tmp_path), blob_store=None)
+    stale = _start(uploads, b'stale')
+    removed_elsewhere = _start(uploads, b'removed')
+    active = _start(uploads, b'active')
+
+    uploads.sessions.update_one({'_id': ObjectId(stale)},
+                                {'$set': {'updated_at': datetime.utcnow() - timedelta(hours=48)}})
+    # Aborted through another worker: this process still has its hash cached
+    uploads.sessions.delete_one({'_id': ObjectId(removed_elsewhere)})
+
+    assert uploads.cleanup_stale(max_age_hours=24) == 1
+    assert list(chunked_upload._hashers) == [active]
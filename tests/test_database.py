@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app.database import VERSION_COLLECTION
+
+
+def test_dashboard_counts(mongo):
+    mongo.db.users.insert_many([
+        {'role': 'student', 'last_login': datetime.utcnow()},
+        {'role': 'student', 'last_login': None},
+        {'role': 'student'},
+        {'role': 'admin', 'last_login': datetime.utcnow()}
+    ])
+    mongo.db.tolis.insert_many([{'status': 'pending'}, {'status': 'pending'}, {'status': 'active'}])
+
+    assert mongo.count_active_students() == 1
+    assert mongo.count_pending_tolis() == 2
+
+
+def _versions(mongo):
+    return {doc['_id']: doc['version'] for doc in mongo.db[VERSION_COLLECTION].find()}
+
+
+def test_update_user_touches_only_collections_it_changed(mongo):
+    user_id = str(mongo.db.users.insert_one({'name': 'Asha', 'password_hash': 'old'}).inserted_id)
+
+    # No embedded copy holds the password, so no list endpoint is invalidated
+    mongo.update_user(user_id, {'password_hash': 'new'})
+    mongo.update_user(user_id, {'password_hash': 'new'})
+    assert _versions(mongo) == {'users': 2}
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from app.date_utils import format_date
+
+
+def test_format_matches_strftime():
+    value = datetime(2024, 3, 5, 14, 7, 9)
+    for fmt in ('%d %b %Y', '%B %d, %Y at %H:%M', '%A %a %I %p', '100%% %j'):
+        assert format_date(value, fmt) == value.strftime(fmt)
+
+
+def test_names_are_english_and_literal_percent_is_kept():
+    assert format_date(datetime(2024, 12, 1), '%A %B %%B') == 'Sunday December %B'
+
+
+def test_strings_and_non_dates():
+    assert format_date('2024-03-05') == '05 Mar 2024'
+    assert format_date('05/03/2024', '%d %B') == '05 March'
+    assert format_date('not a date') == 'not a date'
+    assert format_date(None, default='Date not set') == 'Date not set'
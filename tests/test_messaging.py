@@ -0,0 +1,21 @@
+from bson import ObjectId
+
+from app.messaging import UNREAD_COUNTER
+
+
+def test_counter_is_not_created_by_a_new_message(mongo):
+    user_id = mongo.db.users.insert_one({'name': 'Existing student'}).inserted_id
+    mongo.db.messages.insert_one({'receiver_id': str(user_id), 'is_read': False})
+
+    mongo.create_message({'receiver_id': str(user_id), 'is_read': False})
+
+    assert UNREAD_COUNTER not in mongo.db.users.find_one({'_id': user_id})
+    assert mongo.count_unread_messages(str(user_id)) == 2
+
+
+def test_new_users_start_with_an_exact_counter(mongo):
+    user_id = mongo.create_user({'name': 'New student'})
+    mongo.create_message({'receiver_id': str(user_id), 'is_read': False})
+
+    assert mongo.db.users.find_one({'_id': ObjectId(user_id)})[UNREAD_COUNTER] == 1
+    assert mongo.count_unread_messages(str(user_id)) == 1
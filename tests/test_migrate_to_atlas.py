@@ -0,0 +1,45 @@
+from app.migrate_to_atlas import CollectionCopier
+
+
+def _copier(mongo, batch_size=3):
+    source = mongo.db
+    target = source.client['disha_atlas']
+    return CollectionCopier(source, target, batch_size=batch_size, workers=1, log=lambda message: None)
+
+
+def test_rerun_copies_documents_added_after_a_completed_copy(mongo):
+    copier = _copier(mongo)
+    copier.source_db.users.insert_many([{'_id': i, 'name': f'user {i}'} for i in range(7)])
+
+    assert copier.copy_collection('users')['copied'] == 7
+    assert copier.get_checkpoint('users')['completed']
+
+    copier.source_db.users.insert_many([{'_id': i, 'name': f'user {i}'} for i in range(7, 10)])
+    result = copier.copy_collection('users')
+
+    assert result['copied'] == 3
+    assert copier.get_checkpoint('users')['last_id'] == 9
+    assert copier.verify(['users'])['users']['match']
+
+
+def test_interrupted_copy_resumes_and_checksums_match(mongo):
+    copier = _copier(mongo)
+    copier.source_db.programs.insert_many([{'_id': i, 'title': f'program {i}'} for i in range(8)])
+    # A previous run stopped after the first chunk
+    copier.target_db.programs.insert_many(copier.source_db.programs.find({'_id': {'$lte': 2}}))
+    copier.save_checkpoint('programs', 2, 3)
+
+    assert copier.copy_collection('programs')['copied'] == 5
+    report = copier.verify(['programs'])['programs']
+    assert report['match'] and report['target_count'] == 8
+
+
+def test_fresh_keeps_target_documents(mongo):
+    copier = _copier(mongo)
+    copier.source_db.tolis.insert_many([{'_id': i} for i in range(4)])
+    copier.copy_collection('tolis')
+    copier.target_db.tolis.insert_one({'_id': 'target-only'})
+
+    assert copier.copy_collection('tolis', fresh=True)['copied'] == 0
+    assert copier.target_db.tolis.count_documents({}) == 5
+    assert copier.get_checkpoint('tolis')['completed']
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from app.media import MediaCache
+from app.report_rendering import ReportRenderer
+
+
+def test_new_version_leaves_the_old_file_for_prune(tmp_path):
+    pytest.importorskip('reportlab')
+    renderer = ReportRenderer(MediaCache(str(tmp_path / 'static'), str(tmp_path / 'media')), str(tmp_path))
+    report = {'_id': 'report1', 'title': 'Tree plantation', 'participants_count': 12}
+
+    old = renderer.render(report, [], 'pdf')
+    new = renderer.render(dict(report, title='Tree plantation drive'), [], 'pdf')
+
+    # A download that found the old version can still send it
+    assert new != old and os.path.exists(old) and os.path.exists(new)
+
+    os.utime(old, (0, 0))
+    assert renderer.prune(max_age_days=1)['removed'] == 1
+    assert not os.path.exists(old) and os.path.exists(new)
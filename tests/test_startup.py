@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# TEST-NET-1 address: a connection attempt at import time hangs instead of failing fast
+UNREACHABLE_URI = 'mongodb://192.0.2.1:27017/?serverSelectionTimeoutMS=10000'
+
+# Modules only CLI commands need; a worker must not load them
+COMMAND_ONLY = ('app.bootstrap', 'app.migrate_to_atlas')
+
+# Document and image libraries that views and commands import when they run
+HEAVY_LIBRARIES = ('PIL', 'reportlab', 'docx', 'numpy', 'xlsxwriter')
+
+
+def _env():
+    return dict(os.environ, MONGODB_URI=UNREACHABLE_URI, PYTHONPATH=os.pathsep.join(sys.path))
+
+
+def test_worker_import_skips_command_modules_and_heavy_libraries():
+    pytest.importorskip('flask_wtf')
+    code = "import sys, wsgi; print(' '.join(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True, env=_env()).stdout
+    loaded = set(output.split())
+    assert {'app.cli', 'app.routes.admin', 'app.routes.student'} <= loaded
+    assert not loaded & set(COMMAND_ONLY)
+    assert not loaded & set(HEAVY_LIBRARIES)
+
+
+def test_worker_import_is_within_the_startup_budget():
+    pytest.importorskip('flask_wtf')
+    script = os.path.join(ROOT, 'benchmarks', 'profile_import_time.py')
+    proc = subprocess.run([sys.executable, script, '--module', 'wsgi'], cwd=ROOT,
+                          capture_output=True, text=True, env=_env())
+    assert proc.returncode == 0, proc.stdout
@@ -0,0 +1,69 @@
+from bson import ObjectId
+
+from app.toli_allocation import PLAN_COLLECTION, ToliAllocator
+
+
+def add_students(mongo, count):
+    return mongo.db.users.insert_many([
+        {'role': 'student', 'name': f'Student {i}', 'scholar_no': f'S{i}', 'course': f'C{i % 2}',
+         'email': f's{i}@example.com', 'toli_id': None, 'session_year': '2025'}
+        for i in range(count)
+    ]).inserted_ids
+
+
+def test_new_tolis_get_a_leader_and_embedded_fields(mongo):
+    add_students(mongo, 3)
+    allocator = ToliAllocator(mongo)
+    plan = allocator.preview(create_new=True)
+
+    result, error = allocator.commit(plan['plan_id'])
+
+    assert error is None and result['tolis_created'] == 1
+    toli = mongo.db.tolis.find_one()
+    leader = next(m for m in toli['members'] if m['is_leader'])
+    assert toli['leader_id'] == str(leader['user_id'])
+    assert toli['leader_name'] == leader['name']
+    assert toli['leader_scholar_no'] == leader['scholar_no']
+    assert sum(m['is_leader'] for m in toli['members']) == 1
+
+
+def test_partial_bulk_write_marks_plan_partial(mongo):
+    add_students(mongo, 6)
+    allocator = ToliAllocator(mongo, max_members=3)
+    plan = allocator.preview(create_new=True)
+    stored = mongo.db[PLAN_COLLECTION].find_one({'_id': ObjectId(plan['plan_id'])})
+    # Another writer already created one of the planned tolis
+    mongo.db.tolis.insert_one({'_id': ObjectId(stored['assignments'][0]['toli_id']), 'name': 'Taken'})
+
+    result, error = allocator.commit(plan['plan_id'])
+
+    assert result is None and error
+    stored = mongo.db[PLAN_COLLECTION].find_one({'_id': ObjectId(plan['plan_id'])})
+    assert stored['status'] == 'partial'
+    assert stored['failed_stage'] == 'tolis'
+    assert stored['write_errors'] and stored['write_errors'][0]['index'] == 0
+
+
+def test_students_of_written_tolis_are_claimed_when_another_toli_fails(mongo):
+    add_students(mongo, 6)
+    allocator = ToliAllocator(mongo, max_members=3)
+    plan = allocator.preview(create_new=True)
+    stored = mongo.db[PLAN_COLLECTION].find_one({'_id': ObjectId(plan['plan_id'])})
+    failed, written = stored['assignments']
+    mongo.db.tolis.insert_one({'_id': ObjectId(failed['toli_id']), 'name': 'Taken'})
+
+    allocator.commit(plan['plan_id'])
+
+    stored = mongo.db[PLAN_COLLECTION].find_one({'_id': ObjectId(plan['plan_id'])})
+    assert stored['result']['skipped_tolis'] == [failed['toli_id']]
+    for student in written['students']:
+        assert mongo.db.users.find_one({'_id': student['_id']})['toli_id'] == written['toli_id']
+    for student in failed['students']:
+        assert mongo.db.users.find_one({'_id': student['_id']})['toli_id'] is None
+
+    # A second run only places the students nobody holds
+    second = allocator.preview(create_new=True)
+    result, error = allocator.commit(second['plan_id'])
+    assert error is None and result['students_assigned'] == 3
+    scholar_nos = [m['scholar_no'] for toli in mongo.db.tolis.find() for m in toli.get('members') or []]
+    assert sorted(scholar_nos) == sorted(f'S{i}' for i in range(6))
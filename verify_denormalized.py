@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script to verify (and optionally repair) denormalized copies of user/toli
+fields embedded in tolis, programs and messages
+
+Usage:
+    python verify_denormalized.py            # report drift
+    python verify_denormalized.py --fix      # rebuild drifted copies
+"""
+
+import sys
+
+from app.database import MongoDB
+from app import denormalization
+
+def verify_denormalized(fix=False):
+    """Compare every embedded copy against its source document"""
+    db = MongoDB()
+
+    print("=" * 80)
+    print("VERIFYING DENORMALIZED FIELDS")
+    print("=" * 80)
+
+    if not db.is_connected():
+        print("❌ Database not connected")
+        return False
+
+    report = denormalization.verify(db.db)
+    drifted = sum(item['count'] for item in report.values())
+
+    for name, item in report.items():
+        spec = denormalization.EMBEDDINGS[name]
+        status = "✅" if item['count'] == 0 else "⚠️"
+        print(f"   {status} {name} ({spec['source']} -> {spec['target']}): {item['count']} drifted")
+        for _id in item['sample']:
+            print(f"      - {spec['target']} {_id}")
+
+    if drifted and fix:
+        print("\n🔄 Repairing drifted copies...")
+        report = denormalization.repair(db.db)
+        drifted = sum(item['count'] for item in report.values())
+        print(f"✅ Repair complete, {drifted} document(s) still drifted")
+
+    print("\n" + "=" * 80)
+    print("✅ VERIFICATION COMPLETE" if drifted == 0 else f"⚠️ {drifted} DOCUMENT(S) OUT OF SYNC")
+    print("=" * 80)
+
+    db.close_connection()
+    return drifted == 0
+
+if __name__ == '__main__':
+    ok = verify_denormalized(fix='--fix' in sys.argv)
+    sys.exit(0 if ok else 1)